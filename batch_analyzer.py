@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Batch CPR Video Analyzer
+Runs the compression pipeline over recorded CPR videos without a camera or display,
+as fast as the CPU allows, and writes per-compression and per-second metrics to disk.
+
+Long videos are split into overlapping chunks that are decoded and run through pose
+estimation in separate processes, then merged into one timeline for detection.
+Landmarks are cached, so re-scoring a video after changing detection skips MediaPipe.
+
+Usage:
+    python batch_analyzer.py recordings/ --output-dir analysis_results --workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from landmark_cache import LandmarkCache
+from landmark_stream import LandmarkStream, extract_landmarks, video_info
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+def find_videos(paths: List[str]) -> List[str]:
+    """Expand files and directories into a sorted list of video files"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return sorted(videos)
+
+def plan_chunks(frame_count: int, fps: float, chunk_seconds: float,
+                warmup_seconds: float) -> List[Tuple[int, int, Optional[int]]]:
+    """
+    Split a video into chunks for parallel pose estimation
+    
+    Each chunk starts decoding warmup_seconds early so pose tracking has converged
+    by the first frame it keeps; the warm-up frames are discarded.
+    
+    Returns:
+        List: (decode start, first kept frame, end frame) per chunk; the last chunk
+            runs to the end of the video (end None) in case the frame count is short
+    """
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    warmup_frames = int(warmup_seconds * fps)
+    chunks = []
+    for start in range(0, max(frame_count, 1), chunk_frames):
+        end = start + chunk_frames
+        chunks.append((max(0, start - warmup_frames), start, end if end < frame_count else None))
+    return chunks
+
+def _init_worker():
+    """Keep each worker process to one thread so chunks scale across cores"""
+    import cv2
+    cv2.setNumThreads(1)
+
+def _extract_chunk(video_path: str, decode_start: int, keep_start: int, end: Optional[int],
+                   model_complexity: int, with_hands: bool) -> LandmarkStream:
+    """Run pose estimation over one chunk, dropping its warm-up frames"""
+    stream = extract_landmarks(video_path, decode_start, end, model_complexity, with_hands)
+    return stream.slice(keep_start - decode_start, len(stream))
+
+def extract_landmarks_parallel(video_path: str, executor: Executor, chunk_seconds: float = 30.0,
+                               warmup_seconds: float = 1.0, model_complexity: int = 1,
+                               with_hands: bool = False) -> LandmarkStream:
+    """
+    Extract landmarks from a video in overlapping chunks across a process pool
+    
+    Returns:
+        LandmarkStream: The chunks merged back into one continuous stream
+    """
+    info = video_info(video_path)
+    chunks = plan_chunks(info['frame_count'], info['fps'], chunk_seconds, warmup_seconds)
+    futures = [executor.submit(_extract_chunk, video_path, decode_start, keep_start, end,
+                               model_complexity, with_hands)
+               for decode_start, keep_start, end in chunks]
+    return LandmarkStream.concatenate([future.result() for future in futures])
+
+def create_detector():
+    """Create an assistant for running detection only (no camera, models or windows)"""
+    from compression_log import CompressionLog
+    from improved_cpr_assistant import ImprovedCPRAssistant
+    
+    detector = ImprovedCPRAssistant()
+    detector.wall_clock_offset = 0.0  # Session records keep video time
+    detector.session_data['compressions'] = CompressionLog(spill=False)  # Results are written at the end
+    return detector
+
+def analyze_landmarks(stream: LandmarkStream, detector=None) -> Dict:
+    """
+    Run compression detection over a landmark stream
+    
+    Args:
+        stream: Landmarks extracted from a video
+        detector: Assistant to run detection with (a fresh ImprovedCPRAssistant if None)
+    
+    Returns:
+        Dict: 'compressions' (one row per compression), 'seconds' (one row per
+            second of video) and 'summary' metrics
+    """
+    detector = detector or create_detector()
+    seconds: Dict[int, Dict] = {}
+    
+    for timestamp, landmarks in stream.frames():
+        second = seconds.setdefault(int(timestamp), {
+            'second': int(timestamp), 'frames': 0, 'pose_frames': 0, 'compressions': 0,
+            'depth_total': 0.0, 'placement_total': 0.0
+        })
+        second['frames'] += 1
+        if landmarks is None:
+            continue
+        
+        second['pose_frames'] += 1
+        if detector.update_from_landmarks(landmarks, timestamp):
+            second['compressions'] += 1
+        second['depth_total'] += detector.compression_depth
+        second['placement_total'] += detector.hand_placement_score
+        second['bpm'] = detector.current_bpm
+    
+    second_rows = []
+    for second in sorted(seconds.values(), key=lambda s: s['second']):
+        pose_frames = second['pose_frames']
+        second_rows.append({
+            'second': second['second'],
+            'frames': second['frames'],
+            'pose_frames': pose_frames,
+            'compressions': second['compressions'],
+            'bpm': round(second.get('bpm', 0.0), 2),
+            'depth': round(second['depth_total'] / pose_frames, 4) if pose_frames else 0.0,
+            'hand_placement': round(second['placement_total'] / pose_frames, 4) if pose_frames else 0.0
+        })
+    
+    compressions = [{
+        'index': i + 1,
+        'time': round(c['time'], 4),
+        'bpm': round(c['bpm'], 2),
+        'depth': round(c['depth'], 4),
+        'hand_placement': round(c['hand_placement'], 4)
+    } for i, c in enumerate(detector.session_data['compressions'])]
+    
+    return {
+        'compressions': compressions,
+        'seconds': second_rows,
+        'summary': summarize(stream, compressions)
+    }
+
+def summarize(stream: LandmarkStream, compressions: List[Dict]) -> Dict:
+    """Session-level metrics for one video"""
+    bpms = np.array([c['bpm'] for c in compressions])
+    pose_frames = int(sum(stream.has_pose(i) for i in range(len(stream))))
+    duration = len(stream) / stream.fps if stream.fps else 0.0
+    
+    return {
+        'frames': len(stream),
+        'duration_seconds': round(duration, 2),
+        'pose_coverage': round(pose_frames / len(stream), 4) if len(stream) else 0.0,
+        'compressions': len(compressions),
+        'mean_bpm': round(float(bpms.mean()), 2) if len(bpms) else 0.0,
+        'bpm_in_target': round(float(np.mean((bpms >= 100) & (bpms <= 120))), 4) if len(bpms) else 0.0,
+        'mean_depth': round(float(np.mean([c['depth'] for c in compressions])), 4) if compressions else 0.0,
+        'mean_hand_placement': round(float(np.mean([c['hand_placement'] for c in compressions])), 4) if compressions else 0.0
+    }
+
+def write_csv(path: str, rows: List[Dict]):
+    """Write rows of metrics to a CSV file"""
+    with open(path, 'w', newline='') as f:
+        if not rows:
+            return
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def analyze_video(video_path: str, output_dir: str, model_complexity: int = 1,
+                  with_hands: bool = False, executor: Optional[Executor] = None,
+                  chunk_seconds: float = 30.0, warmup_seconds: float = 1.0,
+                  cache: Optional[LandmarkCache] = None) -> Dict:
+    """
+    Analyze one video and write its metrics
+    
+    Args:
+        video_path: Video file to analyze
+        output_dir: Where to write the metrics
+        model_complexity: MediaPipe pose model complexity
+        with_hands: Also run the hand model
+        executor: Process pool for chunked pose estimation (single process if None)
+        chunk_seconds: Video length handled by each chunk
+        warmup_seconds: Overlap decoded before each chunk so tracking converges
+        cache: Landmark cache to read from and write to (always extract if None)
+    
+    Returns:
+        Dict: The video's summary metrics, including processing times
+    """
+    start = time.perf_counter()
+    stream = cache.load(video_path, model_complexity, with_hands) if cache else None
+    cached = stream is not None
+    if not cached:
+        if executor:
+            stream = extract_landmarks_parallel(video_path, executor, chunk_seconds, warmup_seconds,
+                                                model_complexity, with_hands)
+        else:
+            stream = extract_landmarks(video_path, model_complexity=model_complexity, with_hands=with_hands)
+        if cache:
+            cache.save(video_path, stream, model_complexity, with_hands)
+    extract_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    results = analyze_landmarks(stream)
+    detect_seconds = time.perf_counter() - start
+    
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    write_csv(os.path.join(output_dir, f"{name}_compressions.csv"), results['compressions'])
+    write_csv(os.path.join(output_dir, f"{name}_seconds.csv"), results['seconds'])
+    
+    summary = dict(results['summary'])
+    summary.update({
+        'video': video_path,
+        'cached_landmarks': cached,
+        'extract_seconds': round(extract_seconds, 3),
+        'detect_seconds': round(detect_seconds, 3),
+        'processing_fps': round(len(stream) / (extract_seconds + detect_seconds), 1) if len(stream) else 0.0
+    })
+    return summary
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Score recorded CPR videos without a camera or display")
+    parser.add_argument('inputs', nargs='+', help="Video files or directories of videos")
+    parser.add_argument('--output-dir', default='analysis_results', help="Where to write the metrics")
+    parser.add_argument('--model-complexity', type=int, default=1, choices=[0, 1, 2],
+                        help="MediaPipe pose model complexity")
+    parser.add_argument('--with-hands', action='store_true', help="Also run the hand model")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processes for chunked pose estimation (1 disables chunking)")
+    parser.add_argument('--chunk-seconds', type=float, default=30.0, help="Video length per chunk")
+    parser.add_argument('--warmup-seconds', type=float, default=1.0,
+                        help="Overlap decoded before each chunk so pose tracking converges")
+    parser.add_argument('--cache-dir', default='.landmark_cache', help="Where to cache extracted landmarks")
+    parser.add_argument('--no-cache', action='store_true', help="Always re-run pose estimation")
+    args = parser.parse_args(argv)
+    
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("No videos found")
+        return 1
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    summaries = []
+    failed = []
+    executor = ProcessPoolExecutor(args.workers, initializer=_init_worker) if args.workers > 1 else None
+    cache = None if args.no_cache else LandmarkCache(args.cache_dir)
+    
+    try:
+        for i, video in enumerate(videos, 1):
+            print(f"[{i}/{len(videos)}] {video}")
+            try:
+                summary = analyze_video(video, args.output_dir, args.model_complexity, args.with_hands,
+                                        executor, args.chunk_seconds, args.warmup_seconds, cache)
+            except Exception as e:
+                print(f"  ✗ Failed: {e}")
+                failed.append({'video': video, 'error': str(e)})
+                continue
+            
+            summaries.append(summary)
+            source = "cached landmarks" if summary['cached_landmarks'] else f"{summary['processing_fps']:.0f} frames/s"
+            print(f"  ✓ {summary['compressions']} compressions, mean {summary['mean_bpm']:.1f} BPM ({source})")
+    finally:
+        if executor:
+            executor.shutdown()
+    
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as f:
+        json.dump({'videos': summaries, 'failed': failed}, f, indent=2)
+    
+    print(f"Analyzed {len(summaries)} of {len(videos)} videos, results in {args.output_dir}")
+    return 0 if not failed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+CPR Assistant Benchmarks
+Times the detection, scoring and rendering hot paths on synthetic frames and landmark
+streams, and compares the results with a stored baseline to flag regressions.
+
+Usage:
+    python benchmark_cpr.py --save-baseline          # record a baseline on this machine
+    python benchmark_cpr.py                          # compare against it
+    python benchmark_cpr.py --filter overlay --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from pipeline_harness import create_assistant
+from synthetic_landmarks import generate_session
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+class BenchmarkSkipped(Exception):
+    """A benchmark cannot run on this machine (optional feature or device missing)"""
+
+class Fixtures:
+    """Synthetic inputs and assistants shared by the benchmarks, created on first use"""
+    
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.assistants = {}
+        self._landmarks = None
+        self._frame = None
+    
+    def assistant(self, variant: str):
+        """An assistant of one variant (no camera is opened)"""
+        if variant not in self.assistants:
+            self.assistants[variant] = create_assistant(variant)
+        return self.assistants[variant]
+    
+    @property
+    def landmarks(self) -> List:
+        """Pose landmarks of ten seconds of noisy compressions"""
+        if self._landmarks is None:
+            session = generate_session(duration=10.0, depth=0.4, noise=0.005, seed=self.seed)
+            self._landmarks = [landmarks for _, landmarks in session.stream.frames()]
+        return self._landmarks
+    
+    @property
+    def frame(self) -> np.ndarray:
+        """A 640x480 camera-like frame (smooth gradient plus sensor noise)"""
+        if self._frame is None:
+            rng = np.random.default_rng(self.seed)
+            gradient = np.linspace(40, 200, 640, dtype=np.float32)[None, :, None]
+            noise = rng.normal(0, 8, size=(480, 640, 3))
+            self._frame = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+        return self._frame
+
+def cycle(items: List) -> Callable:
+    """Return the items in turn, forever"""
+    state = {'index': 0}
+    
+    def next_item():
+        item = items[state['index'] % len(items)]
+        state['index'] += 1
+        return item
+    return next_item
+
+# Each benchmark builds the callable to time from the fixtures
+
+def bench_calculate_bpm(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('simple')
+    times = [i * 0.545 for i in range(10)]
+    return lambda: assistant.calculate_bpm(times)
+
+def bench_calculate_improved_bpm(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('improved')
+    times = [i * 0.545 for i in range(10)]
+    return lambda: assistant.calculate_improved_bpm(times)
+
+def bench_detect_improved_compression(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('improved')
+    next_landmarks = cycle(fixtures.landmarks)
+    clock = {'time': 0.0}
+    
+    def detect():
+        clock['time'] += 1 / 30
+        assistant.detect_improved_compression(next_landmarks(), clock['time'])
+    return detect
+
+def bench_detect_hand_placement(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('improved')
+    next_landmarks = cycle(fixtures.landmarks)
+    return lambda: assistant.detect_hand_placement(next_landmarks())
+
+def bench_blur_face(fixtures: Fixtures) -> Callable:
+    if not hasattr(cv2, 'CascadeClassifier'):
+        raise BenchmarkSkipped("OpenCV was built without CascadeClassifier")
+    assistant = fixtures.assistant('improved')
+    frame = fixtures.frame.copy()
+    return lambda: assistant.blur_face(frame)
+
+def bench_improved_overlay(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('improved')
+    assistant.current_bpm, assistant.compression_depth, assistant.hand_placement_score = 112, 0.75, 0.85
+    frame = fixtures.frame.copy()
+    return lambda: assistant.add_visual_overlay(frame, 0.0)
+
+def bench_simple_overlay(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('simple')
+    assistant.current_bpm, assistant.compression_depth, assistant.hand_placement_score = 112, 0.75, 0.85
+    frame = fixtures.frame.copy()
+    return lambda: assistant.add_visual_overlay(frame, 0.0)
+
+def bench_enhanced_overlay(fixtures: Fixtures) -> Callable:
+    assistant = fixtures.assistant('enhanced')
+    assistant.current_bpm, assistant.compression_depth, assistant.hand_placement_score = 112, 0.75, 0.85
+    frame = fixtures.frame.copy()
+    return lambda: assistant.add_enhanced_overlay(frame)
+
+def bench_play_metronome_click(fixtures: Fixtures) -> Callable:
+    # No sound card is needed to time building and queuing the click
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+    assistant = fixtures.assistant('enhanced')
+    try:
+        assistant.subsystems['audio'].get()
+    except pygame.error as e:
+        raise BenchmarkSkipped(f"No audio device: {e}")
+    return assistant._play_metronome_click
+
+def bench_get_compression_feedback(fixtures: Fixtures) -> Callable:
+    from llm_cpr_guide import LLMCPRGuide
+    guide = LLMCPRGuide()
+    next_metrics = cycle([(bpm, depth, placement) for bpm in (0, 85, 104.6, 110, 131)
+                          for depth in (0.5, 0.8) for placement in (0.4, 0.75, 0.9)])
+    return lambda: guide.get_compression_feedback(*next_metrics())
+
+BENCHMARKS = {
+    'calculate_bpm': bench_calculate_bpm,
+    'calculate_improved_bpm': bench_calculate_improved_bpm,
+    'detect_improved_compression': bench_detect_improved_compression,
+    'detect_hand_placement': bench_detect_hand_placement,
+    'blur_face': bench_blur_face,
+    'add_visual_overlay[improved]': bench_improved_overlay,
+    'add_visual_overlay[simple]': bench_simple_overlay,
+    'add_enhanced_overlay': bench_enhanced_overlay,
+    '_play_metronome_click': bench_play_metronome_click,
+    'get_compression_feedback': bench_get_compression_feedback
+}
+
+def time_callable(func: Callable, repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """
+    Time a callable
+    
+    The number of calls per run is chosen so each run takes about min_time seconds.
+    
+    Returns:
+        Dict: Median and best time per call in microseconds, and the calls per run
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'median_us': round(float(np.median(runs)) * 1e6, 3),
+        'best_us': round(min(runs) * 1e6, 3),
+        'calls': number
+    }
+
+def run_benchmarks(names: List[str], repeat: int = 5, min_time: float = 0.2) -> Dict[str, Dict]:
+    """
+    Run benchmarks by name
+    
+    Benchmarks whose dependencies or devices are missing here (ImportError or
+    BenchmarkSkipped) are reported as skipped, any other failure as an error.
+    """
+    fixtures = Fixtures()
+    results = {}
+    for name in names:
+        try:
+            results[name] = time_callable(BENCHMARKS[name](fixtures), repeat, min_time)
+        except (ImportError, BenchmarkSkipped) as e:
+            results[name] = {'skipped': f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+    return results
+
+def environment() -> Dict[str, str]:
+    """Where the numbers were measured"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'recorded': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[Dict]:
+    """
+    Compare median times with a baseline
+    
+    Returns:
+        List: One row per benchmark with its change and a status of 'ok', 'faster',
+            'REGRESSION', 'new', 'skipped' or 'ERROR'
+    """
+    rows = []
+    for name, result in results.items():
+        row = {'name': name, 'median_us': result.get('median_us'), 'baseline_us': None, 'change': None}
+        previous = baseline.get(name, {})
+        if 'skipped' in result:
+            row['status'] = 'skipped'
+        elif 'error' in result:
+            row['status'] = 'ERROR'
+        elif 'median_us' not in previous:
+            row['status'] = 'new'
+        else:
+            row['baseline_us'] = previous['median_us']
+            row['change'] = result['median_us'] / previous['median_us'] - 1
+            if row['change'] > threshold:
+                row['status'] = 'REGRESSION'
+            elif row['change'] < -threshold:
+                row['status'] = 'faster'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+def print_report(rows: List[Dict], results: Dict[str, Dict]):
+    """Print the comparison as a table"""
+    print(f"{'benchmark':<30} {'median':>12} {'baseline':>12} {'change':>8}  status")
+    for row in rows:
+        if row['status'] == 'skipped':
+            print(f"{row['name']:<30} {'':>12} {'':>12} {'':>8}  skipped ({results[row['name']]['skipped']})")
+            continue
+        if row['status'] == 'ERROR':
+            print(f"{row['name']:<30} {'':>12} {'':>12} {'':>8}  ERROR ({results[row['name']]['error']})")
+            continue
+        baseline = f"{row['baseline_us']:.2f} µs" if row['baseline_us'] is not None else ""
+        change = f"{row['change']:+.0%}" if row['change'] is not None else ""
+        print(f"{row['name']:<30} {row['median_us']:>9.2f} µs {baseline:>12} {change:>8}  {row['status']}")
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the CPR Assistant hot paths")
+    parser.add_argument('--filter', nargs='+', help="Only run benchmarks whose name contains one of these")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline file to compare with or save to")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Slowdown (fraction of the baseline median) that counts as a regression")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds per timed run")
+    parser.add_argument('--json', help="Also write the results and comparison to this file")
+    args = parser.parse_args(argv)
+    
+    names = [name for name in BENCHMARKS
+             if not args.filter or any(pattern in name for pattern in args.filter)]
+    results = run_benchmarks(names, args.repeat, args.min_time)
+    
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    rows = compare(results, {} if args.save_baseline else baseline, args.threshold)
+    print_report(rows, results)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'results': results, 'comparison': rows}, f, indent=2)
+    
+    errors = [row['name'] for row in rows if row['status'] == 'ERROR']
+    if errors:
+        print(f"Benchmarks failed: {', '.join(errors)}")
+    
+    if args.save_baseline:
+        # Benchmarks not run this time keep their previous baseline
+        baseline.update({name: result for name, result in results.items() if 'median_us' in result})
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': environment(), 'results': baseline}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 1 if errors else 0
+    
+    if not baseline:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to record one")
+    regressions = [row['name'] for row in rows if row['status'] == 'REGRESSION']
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+    return 1 if regressions or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
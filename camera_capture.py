@@ -0,0 +1,426 @@
+"""
+Camera Capture
+Opens, configures and warms up the webcam on a background thread as soon as the app
+launches, so the camera is ready by the time the user has picked a mode. Once open,
+a grabber thread keeps only the newest frame, stamped with its capture time, so the
+assistants never process frames that sat in a driver queue. ReplayCapture plays a
+recording through the same interface in real time.
+"""
+
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Capture backends to try, most direct first; CAP_ANY lets OpenCV pick as a last resort
+if sys.platform.startswith('win'):
+    CAPTURE_BACKENDS = [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
+elif sys.platform == 'darwin':
+    CAPTURE_BACKENDS = [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
+else:
+    CAPTURE_BACKENDS = [cv2.CAP_V4L2, cv2.CAP_ANY]
+
+# Pixel formats to try. Compressed MJPG usually reaches the full frame rate over USB,
+# uncompressed YUYV often cannot at 640x480 and above.
+PIXEL_FORMATS = ['MJPG', 'YUYV']
+
+class CapturedFrame(NamedTuple):
+    """A camera frame with the monotonic time it was captured"""
+    image: np.ndarray
+    timestamp: float
+    index: int
+
+def fourcc_to_str(fourcc: float) -> str:
+    """Decode a CAP_PROP_FOURCC value"""
+    code = int(fourcc)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+class CameraCapture:
+    def __init__(self, device: int = 0, width: int = 640, height: int = 480, fps: int = 30,
+                 buffer_size: int = 1, fourcc: Optional[str] = None,
+                 backends: Optional[List[int]] = None, max_frame_age: float = 0.1,
+                 warmup_seconds: float = 3.0, warmup_tolerance: float = 1.5,
+                 failure_timeout: float = 5.0):
+        """
+        Initialize the camera settings (call open_async() to start opening it)
+        
+        Args:
+            device: Camera index passed to cv2.VideoCapture
+            width: Requested frame width
+            height: Requested frame height
+            fps: Requested frame rate
+            buffer_size: Frames the driver may queue (small values keep frames fresh)
+            fourcc: Pixel format to use, e.g. 'MJPG' or 'YUYV' (negotiated if None)
+            backends: Capture backends to try in order (CAPTURE_BACKENDS if None)
+            max_frame_age: Frames older than this many seconds when read are dropped
+            warmup_seconds: Longest time to wait for auto-exposure to settle
+            warmup_tolerance: Mean brightness change between frames that counts as settled
+            failure_timeout: Seconds of failed reads after which the camera counts as
+                disconnected and is closed (shorter stalls are waited out)
+        """
+        self.device = device
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.buffer_size = buffer_size
+        self.fourcc = fourcc
+        self.backends = backends or CAPTURE_BACKENDS
+        self.max_frame_age = max_frame_age
+        self.warmup_seconds = warmup_seconds
+        self.warmup_tolerance = warmup_tolerance
+        self.failure_timeout = failure_timeout
+        
+        self.capture = None
+        self.backend_name = None
+        self.error = None
+        self.ready = threading.Event()
+        self.thread = None
+        self.grab_thread = None
+        self.lock = threading.Lock()
+        self.new_frame = threading.Condition(self.lock)
+        self.released = False
+        
+        # Newest frame from the grabber thread and the last one handed out
+        self.latest: Optional[CapturedFrame] = None
+        self.last_read_index = -1
+        self.last_timestamp = None
+        self.last_frame_age = None
+        
+        self.open_seconds = None
+        self.warmup_frames = 0
+        self.stats = {
+            'captured': 0,
+            'delivered': 0,
+            'overwritten': 0,  # Replaced by a newer frame before anyone read them
+            'dropped_stale': 0,  # Older than max_frame_age when read
+            'age_total': 0.0,
+            'age_max': 0.0
+        }
+    
+    def open_async(self):
+        """Open and warm up the camera on a background thread"""
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self._open, name="camera-open")
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def _open(self):
+        """Open, configure and warm up the camera, then start grabbing frames"""
+        start = time.monotonic()
+        try:
+            capture = self._open_backend()
+            self._configure(capture)
+            self._warm_up(capture)
+            
+            with self.lock:
+                if self.released:
+                    capture.release()
+                    return
+                self.capture = capture
+            
+            self.grab_thread = threading.Thread(target=self._grab_loop, name="camera-grab")
+            self.grab_thread.daemon = True
+            self.grab_thread.start()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.open_seconds = time.monotonic() - start
+            self.ready.set()
+    
+    def _open_backend(self) -> cv2.VideoCapture:
+        """Open the device with the first capture backend that works"""
+        for backend in self.backends:
+            capture = cv2.VideoCapture(self.device, backend)
+            if capture.isOpened():
+                self.backend_name = capture.getBackendName()
+                return capture
+            capture.release()
+        raise Exception("Could not open camera")
+    
+    def _configure(self, capture: cv2.VideoCapture):
+        """Apply the requested resolution, frame rate and buffering, and pick a pixel format"""
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        capture.set(cv2.CAP_PROP_FPS, self.fps)
+        # Not every backend supports this; the grabber thread keeps frames fresh regardless
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        
+        if self.fourcc:
+            capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        else:
+            self.fourcc = self._negotiate_format(capture)
+        # The rate the driver settled on (some backends report 0, keep the requested one then)
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or self.fps
+    
+    def _negotiate_format(self, capture: cv2.VideoCapture) -> str:
+        """Pick the supported pixel format with the shortest frame interval"""
+        best_format, best_interval = fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)), None
+        
+        for pixel_format in PIXEL_FORMATS:
+            capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*pixel_format))
+            if fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC)) != pixel_format:
+                continue  # Not supported by this device or backend
+            
+            interval = self._measure_interval(capture)
+            if interval is not None and (best_interval is None or interval < best_interval):
+                best_format, best_interval = pixel_format, interval
+        
+        if best_interval is not None:
+            capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*best_format))
+        return best_format
+    
+    def _measure_interval(self, capture: cv2.VideoCapture, frames: int = 6) -> Optional[float]:
+        """Median time between frames in the current format"""
+        times = []
+        for _ in range(frames):
+            ret, _ = capture.read()
+            if ret:
+                times.append(time.monotonic())
+        if len(times) < 3:
+            return None
+        # The first frames after a format change are often delayed, use the median interval
+        return float(np.median(np.diff(times)))
+    
+    def _warm_up(self, capture: cv2.VideoCapture):
+        """Read frames until auto-exposure settles"""
+        deadline = time.monotonic() + self.warmup_seconds
+        last_brightness = None
+        settled = 0
+        
+        while time.monotonic() < deadline:
+            ret, frame = capture.read()
+            if not ret:
+                continue
+            self.warmup_frames += 1
+            
+            # Exposure has settled once brightness stops changing for a few frames
+            brightness = float(frame[::8, ::8].mean())
+            if last_brightness is not None and abs(brightness - last_brightness) < self.warmup_tolerance:
+                settled += 1
+                if settled >= 3:
+                    break
+            else:
+                settled = 0
+            last_brightness = brightness
+    
+    def _grab_loop(self):
+        """Read frames as fast as the camera delivers them, keeping only the newest"""
+        index = 0
+        failing_since = None
+        while True:
+            with self.lock:
+                capture = self.capture
+            if capture is None:
+                break
+            
+            ret, frame = capture.read()
+            timestamp = time.monotonic()
+            if not ret:
+                failing_since = failing_since or timestamp
+                with self.lock:
+                    if self.capture is None:
+                        break
+                    disconnected = timestamp - failing_since > self.failure_timeout
+                    if disconnected:
+                        self.capture = None
+                if disconnected:
+                    # Unplugged or failed; closing it lets waiting readers return None
+                    print(f"Camera stopped delivering frames for {self.failure_timeout:.0f} s, closing it")
+                    capture.release()
+                    break
+                time.sleep(0.005)
+                continue
+            failing_since = None
+            
+            with self.new_frame:
+                if self.latest is not None and self.latest.index > self.last_read_index:
+                    self.stats['overwritten'] += 1
+                self.latest = CapturedFrame(frame, timestamp, index)
+                self.stats['captured'] += 1
+                self.new_frame.notify_all()
+            index += 1
+        
+        with self.new_frame:
+            self.new_frame.notify_all()
+    
+    def wait_until_open(self, timeout: Optional[float] = None):
+        """
+        Wait for the background open to finish
+        
+        Raises:
+            Exception: If the camera could not be opened
+        """
+        self.open_async()
+        if not self.ready.wait(timeout):
+            raise Exception("Timed out opening camera")
+        if self.error:
+            raise self.error
+    
+    def isOpened(self) -> bool:
+        """Whether the camera is open (like cv2.VideoCapture.isOpened)"""
+        return self.ready.is_set() and self.capture is not None and self.capture.isOpened()
+    
+    def read_frame(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """
+        Get the newest frame not handed out yet, waiting for one if needed
+        
+        Frames older than max_frame_age are dropped in favor of the next one.
+        
+        Args:
+            timeout: Longest time to wait for a fresh frame (None waits through
+                stalls until a frame arrives or the camera is closed)
+        
+        Returns:
+            CapturedFrame: The frame and its capture timestamp, or None if the
+                camera is closed (or a timeout was given and passed)
+        """
+        try:
+            self.wait_until_open()
+        except Exception as e:
+            print(f"Camera error: {e}")
+            return None
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.new_frame:
+            while not self.released:
+                latest = self.latest
+                if latest is not None and latest.index > self.last_read_index:
+                    self.last_read_index = latest.index
+                    age = time.monotonic() - latest.timestamp
+                    if age <= self.max_frame_age:
+                        self._record_age(age)
+                        self.last_timestamp = latest.timestamp
+                        return latest
+                    self.stats['dropped_stale'] += 1
+                
+                if self.capture is None:
+                    return None
+                if deadline is None:
+                    self.new_frame.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.new_frame.wait(remaining)
+        return None
+    
+    def _record_age(self, age: float):
+        """Track how old frames are when processing starts"""
+        self.last_frame_age = age
+        self.stats['delivered'] += 1
+        self.stats['age_total'] += age
+        self.stats['age_max'] = max(self.stats['age_max'], age)
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next fresh frame (like cv2.VideoCapture.read); its capture time is in last_timestamp"""
+        captured = self.read_frame()
+        if captured is None:
+            return False, None
+        return True, captured.image
+    
+    def get_stats(self) -> Dict:
+        """Capture settings and frame age statistics"""
+        with self.lock:
+            stats = dict(self.stats)
+        delivered = stats['delivered']
+        stats['age_mean'] = stats.pop('age_total') / delivered if delivered else 0.0
+        stats['backend'] = self.backend_name
+        stats['fourcc'] = self.fourcc
+        stats['open_seconds'] = self.open_seconds
+        return stats
+    
+    def release(self):
+        """Close the camera"""
+        with self.lock:
+            self.released = True
+            capture, self.capture = self.capture, None
+            self.new_frame.notify_all()
+        
+        grab_thread = self.grab_thread
+        if grab_thread and grab_thread is not threading.current_thread():
+            grab_thread.join(timeout=1.0)
+        if capture is not None:
+            capture.release()
+
+class ReplayCapture(CameraCapture):
+    def __init__(self, video_path: str, max_frame_age: float = 0.1,
+                 on_start: Optional[Callable[[float], None]] = None):
+        """
+        Play a recorded video in real time through the CameraCapture interface
+        
+        Playback starts with the first read_frame() call. Each frame is stamped with
+        the moment it would have been captured live (start time + video time), so
+        latency measured against a replay matches a real camera.
+        
+        Args:
+            video_path: Recording to replay
+            max_frame_age: Frames older than this many seconds when read are dropped
+            on_start: Called with the monotonic time of video time 0 when playback starts
+        """
+        super().__init__(device=video_path, backends=[cv2.CAP_ANY], max_frame_age=max_frame_age)
+        self.on_start = on_start
+        self.playing = threading.Event()
+        self.start_time = None
+    
+    def _configure(self, capture: cv2.VideoCapture):
+        """Use the recording's own frame rate and format"""
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.fourcc = fourcc_to_str(capture.get(cv2.CAP_PROP_FOURCC))
+    
+    def _warm_up(self, capture: cv2.VideoCapture):
+        """A recording has no exposure to settle"""
+    
+    def _grab_loop(self):
+        """Decode frames at the recording's frame rate, keeping only the newest"""
+        self.playing.wait()
+        if self.released:
+            return
+        
+        self.start_time = time.monotonic()
+        if self.on_start:
+            self.on_start(self.start_time)
+        
+        index = 0
+        while True:
+            due = self.start_time + index / self.fps
+            time.sleep(max(0.0, due - time.monotonic()))
+            
+            with self.lock:
+                capture = self.capture
+            if capture is None:
+                break
+            ret, frame = capture.read()
+            if not ret:
+                break  # End of the recording
+            
+            with self.new_frame:
+                if self.latest is not None and self.latest.index > self.last_read_index:
+                    self.stats['overwritten'] += 1
+                self.latest = CapturedFrame(frame, due, index)
+                self.stats['captured'] += 1
+                self.new_frame.notify_all()
+            index += 1
+        
+        # Close the recording so readers get None once the last frame has been taken
+        with self.lock:
+            capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.release()
+        with self.new_frame:
+            self.new_frame.notify_all()
+    
+    def read_frame(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """Start playback if needed, then get the newest frame not handed out yet"""
+        self.playing.set()
+        return super().read_frame(timeout)
+    
+    def release(self):
+        """Stop playback and close the recording"""
+        with self.lock:
+            self.released = True
+        self.playing.set()
+        super().release()
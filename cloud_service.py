@@ -10,6 +10,8 @@ import base64
 from datetime import datetime
 from typing import Dict, List, Optional
 import threading
+from compression_log import CompressionLog
+from frame_spool import FrameSpool
 
 class CPRCloudService:
     def __init__(self, api_endpoint: str = "https://api.cpr-assistant.com"):
@@ -179,29 +181,29 @@ class CPRDataCollector:
     """Collects and processes CPR data for cloud upload"""
     
     def __init__(self):
-        self.session_data = {
+        self.session_data = self._new_session_data()
+    
+    @staticmethod
+    def _new_session_data() -> Dict:
+        """Empty session data; compressions are compact numpy rows spilled to disk, frames are spooled as JPEGs"""
+        return {
             'start_time': datetime.now().isoformat(),
-            'compressions': [],
-            'frames': [],
+            'compressions': CompressionLog(time_field='timestamp'),
+            'frames': FrameSpool(),
             'performance_history': []
         }
     
     def add_compression_data(self, bpm: float, depth: float, hand_placement: float, timestamp: float):
         """Add compression data point"""
-        self.session_data['compressions'].append({
-            'timestamp': timestamp,
-            'bpm': bpm,
-            'depth': depth,
-            'hand_placement': hand_placement
-        })
+        self.session_data['compressions'].append(timestamp, bpm, depth, hand_placement)
     
-    def add_frame_data(self, frame_data: str, timestamp: float):
-        """Add frame data (blurred for privacy)"""
-        self.session_data['frames'].append({
-            'timestamp': timestamp,
-            'frame_data': frame_data,  # Base64 encoded, blurred frame
-            'privacy_compliant': True
-        })
+    def add_frame_data(self, frame_data: str, timestamp: float) -> bool:
+        """Add frame data (base64 encoded JPEG, blurred for privacy), written straight to the spool; False if skipped"""
+        return self.session_data['frames'].add_encoded(base64.b64decode(frame_data), timestamp)
+    
+    def add_frame(self, frame, timestamp: float) -> bool:
+        """Add a blurred BGR frame, JPEG encoded in the background; False if the spool dropped it"""
+        return self.session_data['frames'].add_frame(frame, timestamp)
     
     def get_session_summary(self) -> Dict:
         """Get session summary for upload"""
@@ -211,19 +213,17 @@ class CPRDataCollector:
             return self.session_data
         
         # Calculate performance metrics
-        avg_bpm = sum(c['bpm'] for c in compressions) / len(compressions)
-        avg_depth = sum(c['depth'] for c in compressions) / len(compressions)
-        avg_hand_placement = sum(c['hand_placement'] for c in compressions) / len(compressions)
+        metrics = compressions.summary()
         
         return {
             'session_id': f"cpr_session_{int(time.time())}",
             'start_time': self.session_data['start_time'],
             'end_time': datetime.now().isoformat(),
-            'total_compressions': len(compressions),
-            'avg_bpm': avg_bpm,
-            'avg_depth': avg_depth,
-            'avg_hand_placement': avg_hand_placement,
-            'compressions': compressions,
+            'total_compressions': metrics['total_compressions'],
+            'avg_bpm': metrics['avg_bpm'],
+            'avg_depth': metrics['avg_depth'],
+            'avg_hand_placement': metrics['avg_hand_placement'],
+            'compressions': compressions.to_list(),
             'frames': self.session_data['frames'],
             'device_info': {
                 'platform': 'CPR Assistant App',
@@ -234,9 +234,10 @@ class CPRDataCollector:
     
     def clear_session(self):
         """Clear current session data"""
-        self.session_data = {
-            'start_time': datetime.now().isoformat(),
-            'compressions': [],
-            'frames': [],
-            'performance_history': []
-        }
+        self.close()
+        self.session_data = self._new_session_data()
+    
+    def close(self):
+        """Stop the frame spool and remove the temporary compression and frame files"""
+        self.session_data['compressions'].close()
+        self.session_data['frames'].close()
@@ -0,0 +1,262 @@
+"""
+Compression Log
+Stores a session's compressions as rows of a growable numpy structured array (40 bytes
+each instead of a dict of several hundred), with zero-copy column views for analysis,
+keeps running session aggregates updated in O(1) per compression so summaries,
+overlays and uploads never rescan the log, and spills the rows to a session store
+file in small batches so a crash loses at most the last batch. When spilling, only
+the most recent rows stay in memory; older ones are read back from the spill file.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from feedback_rules import DEPTH_TARGET_BANDS, quantize_state
+from session_store import SessionStore, compression_fields
+
+# Bits of the flags column: which metrics were in their target band for the compression
+FLAG_RATE_OK = 1
+FLAG_DEPTH_OK = 2
+FLAG_PLACEMENT_OK = 4
+
+# Histogram bins of the session aggregates: 10 BPM wide up to 200 BPM, 10% depth up to 150%
+BPM_BIN_WIDTH, BPM_BINS = 10.0, 20
+DEPTH_BIN_WIDTH, DEPTH_BINS = 0.1, 15
+
+# Compressions written to the spill file at a time (about 15 seconds of CPR)
+SPILL_BATCH = 30
+
+# Most recent compressions kept in memory when spilling (about 8 minutes of CPR)
+WINDOW = 1000
+
+def compression_dtype(time_field: str = 'time', metric_format: str = '<f8') -> np.dtype:
+    """Row layout: capture time, metrics (float64, so uploads carry the measured values) and flag bits"""
+    return np.dtype([
+        (time_field, '<f8'),
+        ('bpm', metric_format),
+        ('depth', metric_format),
+        ('hand_placement', metric_format),
+        ('flags', '<u1')
+    ], align=True)
+
+def quality_flags(bpm: float, depth: float, hand_placement: float) -> int:
+    """Flag bits for the metrics that are in their target band"""
+    rate, depth_band, placement = quantize_state(bpm, depth, hand_placement)
+    return ((FLAG_RATE_OK if rate == 'good' else 0) |
+            (FLAG_DEPTH_OK if depth_band in DEPTH_TARGET_BANDS else 0) |
+            (FLAG_PLACEMENT_OK if placement == 'good' else 0))
+
+class RunningStats:
+    """Count, mean, variance (Welford's method), min and max of a stream of values"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+    
+    def add(self, value: float):
+        """Include one value"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    
+    @property
+    def variance(self) -> float:
+        """Population variance"""
+        return self.m2 / self.count if self.count else 0.0
+    
+    @property
+    def std(self) -> float:
+        return self.variance ** 0.5
+
+class SessionAggregates:
+    def __init__(self):
+        """Running per-metric statistics, target band counts and histograms of a session's compressions"""
+        self.bpm = RunningStats()
+        self.depth = RunningStats()
+        self.hand_placement = RunningStats()
+        self.flag_counts = {FLAG_RATE_OK: 0, FLAG_DEPTH_OK: 0, FLAG_PLACEMENT_OK: 0}
+        self.bpm_histogram = [0] * BPM_BINS
+        self.depth_histogram = [0] * DEPTH_BINS
+    
+    @staticmethod
+    def _bin(value: float, width: float, bins: int) -> int:
+        """Histogram bin of a value (the outer bins also count values beyond the range)"""
+        return min(max(int(value // width), 0), bins - 1)
+    
+    def add(self, bpm: float, depth: float, hand_placement: float, flags: int):
+        """Include one compression"""
+        self.bpm.add(bpm)
+        self.depth.add(depth)
+        self.hand_placement.add(hand_placement)
+        for flag in self.flag_counts:
+            if flags & flag:
+                self.flag_counts[flag] += 1
+        self.bpm_histogram[self._bin(bpm, BPM_BIN_WIDTH, BPM_BINS)] += 1
+        self.depth_histogram[self._bin(depth, DEPTH_BIN_WIDTH, DEPTH_BINS)] += 1
+    
+    @property
+    def count(self) -> int:
+        return self.bpm.count
+    
+    def in_range(self, flag: int) -> float:
+        """Share of compressions with a flag set (e.g. FLAG_RATE_OK)"""
+        return self.flag_counts[flag] / self.count if self.count else 0.0
+
+class CompressionLog:
+    def __init__(self, capacity: int = 1024, time_field: str = 'time', spill: bool = True,
+                 spill_path: Optional[str] = None, spill_batch: int = SPILL_BATCH, window: int = WINDOW):
+        """
+        An append-only compression log
+        
+        Args:
+            capacity: Rows allocated up front (doubled whenever the log fills)
+            time_field: Name of the time column (and key of the records iteration yields)
+            spill: Also write the compressions to a session store file, readable with
+                session_store.read_records() after a crash
+            spill_path: Spill file to keep (None for a temporary file deleted on close)
+            spill_batch: Compressions written to the spill file at a time
+            window: Most recent compressions kept in memory when spilling (every
+                compression is kept without a spill file)
+        """
+        self.time_field = time_field
+        self.data = np.zeros(capacity, dtype=compression_dtype(time_field))
+        self.count = 0
+        self.first = 0  # Compressions evicted from memory (still in the spill file)
+        self.window = max(1, window)
+        self.aggregates = SessionAggregates()
+        self.spill_path = spill_path
+        self.spill_batch = spill_batch
+        self.store = self._new_store() if spill else None
+    
+    def _new_store(self) -> SessionStore:
+        """Spill store the whole session is written to"""
+        return SessionStore(compression_fields(self.time_field), self.spill_path, spill_batch=self.spill_batch)
+    
+    def _make_room(self):
+        """Evict all but the last window of rows when spilling and the array is large enough, else grow it"""
+        filled = self.count - self.first
+        if self.store is not None and filled >= 2 * self.window:
+            self.data[:self.window] = self.data[filled - self.window:filled]
+            self.first += filled - self.window
+            return
+        grown = np.zeros(max(2 * len(self.data), 16), dtype=self.data.dtype)
+        grown[:filled] = self.data
+        self.data = grown
+    
+    def append(self, time: float, bpm: float, depth: float, hand_placement: float):
+        """Add a compression"""
+        if self.count - self.first == len(self.data):
+            self._make_room()
+        flags = quality_flags(bpm, depth, hand_placement)
+        self.data[self.count - self.first] = (time, bpm, depth, hand_placement, flags)
+        self.count += 1
+        self.aggregates.add(bpm, depth, hand_placement, flags)
+        if self.store is not None:
+            self.store.append({self.time_field: time, 'bpm': bpm, 'depth': depth, 'hand_placement': hand_placement})
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __bool__(self) -> bool:
+        return self.count > 0
+    
+    @property
+    def rows(self) -> np.ndarray:
+        """View of the rows in memory, the most recent window or more (invalidated when the log grows)"""
+        return self.data[:self.count - self.first]
+    
+    def column(self, name: str) -> np.ndarray:
+        """View of one column of the rows in memory"""
+        return self.data[name][:self.count - self.first]
+    
+    @property
+    def times(self) -> np.ndarray:
+        return self.column(self.time_field)
+    
+    @property
+    def bpm(self) -> np.ndarray:
+        return self.column('bpm')
+    
+    @property
+    def depth(self) -> np.ndarray:
+        return self.column('depth')
+    
+    @property
+    def hand_placement(self) -> np.ndarray:
+        return self.column('hand_placement')
+    
+    @property
+    def flags(self) -> np.ndarray:
+        return self.column('flags')
+    
+    def __iter__(self) -> Iterator[Dict]:
+        """Each compression as a dict, like the records this log replaces"""
+        if self.first:
+            # Older compressions were evicted from memory, the spill file has them all
+            yield from self.store
+            return
+        names = [name for name in self.data.dtype.names if name != 'flags']
+        for row in self.rows.tolist():
+            yield dict(zip(names, row))
+    
+    def to_list(self) -> List[Dict]:
+        """All compressions as dicts (e.g. to serialize for upload)"""
+        return list(self)
+    
+    def summary(self) -> Dict:
+        """
+        Session statistics, read from the running aggregates
+        
+        Returns:
+            Dict: Compression count, mean BPM/depth/placement, BPM spread and range,
+                the share of compressions with each metric in its target band and
+                BPM and depth histograms
+        """
+        aggregates = self.aggregates
+        if not aggregates.count:
+            return {'total_compressions': 0, 'avg_bpm': 0.0, 'avg_depth': 0.0, 'avg_hand_placement': 0.0,
+                    'bpm_std': 0.0, 'bpm_min': 0.0, 'bpm_max': 0.0, 'rate_ok': 0.0, 'depth_ok': 0.0,
+                    'placement_ok': 0.0, 'bpm_histogram': list(aggregates.bpm_histogram),
+                    'depth_histogram': list(aggregates.depth_histogram)}
+        return {
+            'total_compressions': aggregates.count,
+            'avg_bpm': aggregates.bpm.mean,
+            'avg_depth': aggregates.depth.mean,
+            'avg_hand_placement': aggregates.hand_placement.mean,
+            'bpm_std': aggregates.bpm.std,
+            'bpm_min': aggregates.bpm.min,
+            'bpm_max': aggregates.bpm.max,
+            'rate_ok': aggregates.in_range(FLAG_RATE_OK),
+            'depth_ok': aggregates.in_range(FLAG_DEPTH_OK),
+            'placement_ok': aggregates.in_range(FLAG_PLACEMENT_OK),
+            'bpm_histogram': list(aggregates.bpm_histogram),
+            'depth_histogram': list(aggregates.depth_histogram)
+        }
+    
+    def clear(self):
+        """Remove every compression (keeping the allocated rows) and start a new spill file"""
+        self.count = 0
+        self.first = 0
+        self.aggregates = SessionAggregates()
+        if self.store is not None:
+            self.store.close()
+            self.store = self._new_store()
+    
+    def close(self, keep: bool = False):
+        """
+        Close the spill file
+        
+        Args:
+            keep: Write the remaining compressions to the spill file and keep it
+        """
+        if self.store is not None:
+            self.store.close(keep)
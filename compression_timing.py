@@ -0,0 +1,79 @@
+"""
+Compression Timing Statistics
+Tracks how steady the frame and compression timestamps are. Compressions are timed
+by frame capture time, so processing latency no longer shows up in the BPM; the
+processing delay is still measured here to show how much jitter it would add.
+"""
+
+import collections
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+class TimingStats:
+    def __init__(self, window: int = 120):
+        """Keep the last `window` frame and compression timings"""
+        self.frame_intervals = collections.deque(maxlen=window)
+        self.processing_delays = collections.deque(maxlen=window)
+        self.compression_intervals = collections.deque(maxlen=window)
+        self.last_frame_time = None
+        self.last_compression_time = None
+    
+    def observe_frame(self, capture_time: float, processed_time: Optional[float] = None):
+        """
+        Record a processed frame
+        
+        Args:
+            capture_time: Monotonic time the frame was captured
+            processed_time: Monotonic time processing finished (defaults to now)
+        """
+        if processed_time is None:
+            processed_time = time.monotonic()
+        if self.last_frame_time is not None:
+            self.frame_intervals.append(capture_time - self.last_frame_time)
+        self.last_frame_time = capture_time
+        self.processing_delays.append(processed_time - capture_time)
+    
+    def observe_compression(self, capture_time: float):
+        """Record the capture time of the frame a compression was detected in"""
+        if self.last_compression_time is not None:
+            self.compression_intervals.append(capture_time - self.last_compression_time)
+        self.last_compression_time = capture_time
+    
+    @staticmethod
+    def _describe(values) -> Dict[str, float]:
+        """Mean, standard deviation and successive-difference jitter in milliseconds"""
+        if not values:
+            return {'mean_ms': 0.0, 'std_ms': 0.0, 'jitter_ms': 0.0, 'max_ms': 0.0}
+        samples = np.asarray(values) * 1000
+        jitter = float(np.mean(np.abs(np.diff(samples)))) if len(samples) > 1 else 0.0
+        return {
+            'mean_ms': float(samples.mean()),
+            'std_ms': float(samples.std()),
+            'jitter_ms': jitter,
+            'max_ms': float(samples.max())
+        }
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the timing statistics
+        
+        Returns:
+            Dict: Statistics for frame intervals, processing delays (the jitter
+                post-processing timestamps would have added to every interval)
+                and compression intervals
+        """
+        return {
+            'frame_interval': self._describe(self.frame_intervals),
+            'processing_delay': self._describe(self.processing_delays),
+            'compression_interval': self._describe(self.compression_intervals)
+        }
+    
+    def format_summary(self) -> str:
+        """One-line summary for the console"""
+        stats = self.summary()
+        frame, delay, compression = stats['frame_interval'], stats['processing_delay'], stats['compression_interval']
+        return (f"Timing: frame interval {frame['mean_ms']:.1f} ms (jitter {frame['jitter_ms']:.1f} ms), "
+                f"processing delay {delay['mean_ms']:.1f} ± {delay['std_ms']:.1f} ms, "
+                f"compression interval {compression['mean_ms']:.0f} ± {compression['std_ms']:.0f} ms")
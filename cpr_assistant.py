@@ -16,6 +16,10 @@ import pyttsx3
 from typing import Optional, Tuple, List
 import queue
 import json
+from camera_capture import CameraCapture
+from compression_timing import TimingStats
+from stage_timing import StageTimer, latency_report_requested
+from feedback_rules import FeedbackTracker, feedback_color
 
 class CPRAssistant:
     def __init__(self):
@@ -53,6 +57,9 @@ class CPRAssistant:
         self.hand_placement_score = 0
         self.last_compression_time = 0
         self.compression_times = []
+        self.timing_stats = TimingStats()  # Compressions are timed by frame capture time
+        self.stage_timer = StageTimer()  # Per-stage frame latency, 'L' toggles the HUD
+        self.latency_report_path = None  # Only written when asked for (--latency-report), see the launchers
         self.metronome_active = False
         self.mode = None  # 'walkthrough' or 'feedback'
         
@@ -76,17 +83,15 @@ class CPRAssistant:
         # Audio feedback queue
         self.audio_queue = queue.Queue()
         
-    def initialize_camera(self):
-        """Initialize camera capture"""
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
-            raise Exception("Could not open camera")
-        
-        # Set camera properties for better performance
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.camera.set(cv2.CAP_PROP_FPS, 30)
+        # Feedback state: rules are only re-evaluated when the quantized metrics change
+        self.feedback_tracker = FeedbackTracker()
+        self.last_spoken_feedback = {}
         
+    def initialize_camera(self):
+        """Start opening and warming up the camera in the background"""
+        self.camera = CameraCapture(device=0, width=640, height=480, fps=30)
+        self.camera.open_async()
+    
     def calculate_bpm(self, compression_times):
         """Calculate BPM from compression timing"""
         if len(compression_times) < 2:
@@ -166,10 +171,13 @@ class CPRAssistant:
         """Metronome audio loop"""
         interval = 60.0 / self.target_bpm
         
+        # Beats are scheduled on the monotonic clock so click time does not accumulate drift
+        next_beat = time.monotonic()
         while self.metronome_active:
             # Generate metronome click sound
             self._play_metronome_click()
-            time.sleep(interval)
+            next_beat += interval
+            time.sleep(max(0.0, next_beat - time.monotonic()))
     
     def _play_metronome_click(self):
         """Play metronome click sound"""
@@ -200,35 +208,39 @@ class CPRAssistant:
     
     def get_feedback_color(self, bpm):
         """Get color based on BPM feedback"""
-        if 100 <= bpm <= 120:
-            return (0, 255, 0)  # Green - good pace
-        elif bpm < 100:
-            return (0, 0, 255)  # Red - too slow
-        else:
-            return (0, 165, 255)  # Orange - too fast
+        return feedback_color(bpm)
+    
+    def get_jitter_stats(self):
+        """Frame, processing and compression timing statistics"""
+        return self.timing_stats.summary()
     
     def process_frame(self, frame):
         """Process a single frame for CPR feedback"""
         # Convert BGR to RGB
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.stage_timer.lap('convert')
         
         # Process pose
         pose_results = self.pose.process(rgb_frame)
+        self.stage_timer.lap('pose')
         
         # Process hands
         hands_results = self.hands.process(rgb_frame)
+        self.stage_timer.lap('hands')
         
         # Draw pose landmarks
         if pose_results.pose_landmarks:
             self.mp_drawing.draw_landmarks(
                 frame, pose_results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS
             )
+            self.stage_timer.lap('draw')
             
             # Analyze hand placement
             self.hand_placement_score = self.detect_hand_placement(pose_results.pose_landmarks)
             
             # Analyze compression depth
             self.compression_depth = self.detect_compression_depth(pose_results.pose_landmarks)
+            self.stage_timer.lap('detect')
         
         # Draw hand landmarks
         if hands_results.multi_hand_landmarks:
@@ -236,9 +248,52 @@ class CPRAssistant:
                 self.mp_drawing.draw_landmarks(
                     frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
                 )
+            self.stage_timer.lap('draw')
         
         return frame, pose_results, hands_results
     
+    def update_from_landmarks(self, landmarks, capture_time):
+        """
+        Update placement, depth, compression count and rate from one frame's pose landmarks
+        
+        This is what the feedback loop does after pose estimation, so recorded or
+        synthetic landmarks can be run through the same detection without a camera.
+        
+        Args:
+            landmarks: Pose landmarks (anything exposing .landmark[i].x/.y), or None
+                if no pose was found (the last placement and depth are kept)
+            capture_time: Capture time of the frame in seconds
+        
+        Returns:
+            bool: Whether a compression was counted in this frame
+        """
+        if landmarks:
+            self.hand_placement_score = self.detect_hand_placement(landmarks)
+            self.compression_depth = self.detect_compression_depth(landmarks)
+        return self.update_compression_timing(capture_time)
+    
+    def update_compression_timing(self, capture_time):
+        """Count a compression from the current depth and update the rate from capture timestamps"""
+        counted = False
+        if self.compression_depth > 0.5:  # Detected compression
+            if self.last_compression_time > 0:
+                interval = capture_time - self.last_compression_time
+                if 0.3 < interval < 1.0:  # Reasonable compression interval
+                    self.compression_times.append(capture_time)
+                    self.timing_stats.observe_compression(capture_time)
+                    self.compression_count += 1
+                    counted = True
+                    
+                    # Keep only recent compression times
+                    if len(self.compression_times) > 10:
+                        self.compression_times.pop(0)
+                    
+                    # Calculate BPM
+                    self.current_bpm = self.calculate_bpm(self.compression_times)
+            
+            self.last_compression_time = capture_time
+        return counted
+    
     def add_overlay_info(self, frame):
         """Add CPR feedback overlay to frame"""
         height, width = frame.shape[:2]
@@ -246,8 +301,11 @@ class CPRAssistant:
         # Background for text
         overlay = frame.copy()
         
+        feedback = self.feedback_tracker.update(self.current_bpm, self.compression_depth,
+                                                self.hand_placement_score)
+        
         # Current BPM
-        bpm_color = self.get_feedback_color(self.current_bpm)
+        bpm_color = feedback.bpm_color
         cv2.rectangle(overlay, (10, 10), (200, 80), (0, 0, 0), -1)
         cv2.putText(frame, f"BPM: {int(self.current_bpm)}", (20, 40), 
                    cv2.FONT_HERSHEY_SIMPLEX, 1, bpm_color, 2)
@@ -258,7 +316,7 @@ class CPRAssistant:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # Hand placement score
-        placement_color = (0, 255, 0) if self.hand_placement_score > 0.7 else (0, 0, 255)
+        placement_color = feedback.placement_color
         cv2.rectangle(overlay, (10, 140), (200, 180), (0, 0, 0), -1)
         cv2.putText(frame, f"Hands: {int(self.hand_placement_score*100)}%", (20, 170), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, placement_color, 2)
@@ -285,12 +343,16 @@ class CPRAssistant:
         self.speak(self.walkthrough_steps[self.current_step])
         
         while self.running and self.current_step < len(self.walkthrough_steps):
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
+            frame = captured.image
             
             # Process frame
             processed_frame, pose_results, hands_results = self.process_frame(frame)
+            self.timing_stats.observe_frame(captured.timestamp)
             
             # Add overlay
             frame_with_overlay = self.add_overlay_info(processed_frame)
@@ -305,12 +367,19 @@ class CPRAssistant:
             cv2.putText(frame_with_overlay, "Skip to Compressions", (width-190, height-45), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
             
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
+            
             cv2.imshow('CPR Assistant - Walkthrough Mode', frame_with_overlay)
             
             # Handle key presses
             key = cv2.waitKey(1) & 0xFF
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
             elif key == ord('n'):  # Next step
                 self.current_step += 1
                 if self.current_step < len(self.walkthrough_steps):
@@ -325,55 +394,47 @@ class CPRAssistant:
         self.start_metronome()
         
         while self.running:
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
+            frame = captured.image
             
             # Process frame
             processed_frame, pose_results, hands_results = self.process_frame(frame)
+            self.timing_stats.observe_frame(captured.timestamp)
             
-            # Update BPM calculation
-            current_time = time.time()
-            if self.compression_depth > 0.5:  # Detected compression
-                if self.last_compression_time > 0:
-                    interval = current_time - self.last_compression_time
-                    if 0.3 < interval < 1.0:  # Reasonable compression interval
-                        self.compression_times.append(current_time)
-                        self.compression_count += 1
-                        
-                        # Keep only recent compression times
-                        if len(self.compression_times) > 10:
-                            self.compression_times.pop(0)
-                        
-                        # Calculate BPM
-                        self.current_bpm = self.calculate_bpm(self.compression_times)
-                
-                self.last_compression_time = current_time
+            # Update BPM calculation from the frame's capture time, so processing latency does not skew the rate
+            current_time = captured.timestamp
+            self.update_compression_timing(current_time)
+            self.stage_timer.lap('detect')
             
             # Add overlay
             frame_with_overlay = self.add_overlay_info(processed_frame)
             
-            # Provide audio feedback
-            if self.current_bpm > 0:
-                if self.current_bpm < 100:
-                    if not hasattr(self, '_last_slow_warning') or current_time - self._last_slow_warning > 3:
-                        self.speak("Go faster")
-                        self._last_slow_warning = current_time
-                elif self.current_bpm > 120:
-                    if not hasattr(self, '_last_fast_warning') or current_time - self._last_fast_warning > 3:
-                        self.speak("Go slower")
-                        self._last_fast_warning = current_time
-                else:
-                    if not hasattr(self, '_last_good_pace') or current_time - self._last_good_pace > 5:
-                        self.speak("Good pace, keep going!")
-                        self._last_good_pace = current_time
+            # Provide audio feedback, repeating each prompt at most every few seconds
+            feedback = self.feedback_tracker.update(self.current_bpm, self.compression_depth,
+                                                    self.hand_placement_score)
+            if feedback.prompt:
+                repeat_interval = feedback.speech[1]
+                if current_time - self.last_spoken_feedback.get(feedback.prompt, 0) > repeat_interval:
+                    self.speak(feedback.prompt)
+                    self.last_spoken_feedback[feedback.prompt] = current_time
+            
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
             
             cv2.imshow('CPR Assistant - Feedback Mode', frame_with_overlay)
             
             # Handle key presses
             key = cv2.waitKey(1) & 0xFF
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
     
     def run(self):
         """Main application loop"""
@@ -431,6 +492,14 @@ class CPRAssistant:
         self.mode = mode
         root.destroy()
         
+        # The camera has been warming up while the mode selection window was open
+        try:
+            self.camera.wait_until_open()
+        except Exception as e:
+            print(f"Error: {e}")
+            messagebox.showerror("Error", f"Failed to initialize: {e}")
+            return
+        
         if mode == "walkthrough":
             self.run_walkthrough_mode()
         else:
@@ -441,10 +510,17 @@ class CPRAssistant:
         self.running = False
         self.stop_metronome()
         
+        if self.timing_stats.frame_intervals:
+            print(self.timing_stats.format_summary())
+        report = self.stage_timer.dump_json(self.latency_report_path)
+        if report:
+            print(f"Frame stage latency written to {report}")
+        
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     app = CPRAssistant()
+    app.latency_report_path = latency_report_requested()
     app.run()
@@ -4,55 +4,45 @@ Comprehensive CPR guidance with real-time feedback and AI-powered Q&A
 """
 
 import cv2
-import mediapipe as mp
 import numpy as np
-import pygame
 import threading
 import time
 import math
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import speech_recognition as sr
-import pyttsx3
 from typing import Optional, Tuple, List, Dict
 import queue
 import json
-from llm_cpr_guide import LLMCPRGuide
+from llm_cpr_guide import LLMCPRGuide, QUICK_QUESTIONS, normalize_question
+from guidance_prefetcher import GuidancePrefetcher
+from camera_capture import CameraCapture, ReplayCapture
+from compression_timing import TimingStats
+from stage_timing import StageTimer, latency_report_requested
+from glass_to_glass import LatencyProbe
+from feedback_rules import FeedbackTracker, feedback_color
+from lazy_resource import LazyResource
 
 class EnhancedCPRAssistant:
     def __init__(self):
-        # Initialize MediaPipe
-        self.mp_pose = mp.solutions.pose
-        self.mp_hands = mp.solutions.hands
-        self.mp_drawing = mp.solutions.drawing_utils
-        
-        # Initialize pose and hands
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Initialize audio
-        pygame.mixer.init()
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 150)
-        
-        # Initialize LLM guide
-        self.llm_guide = LLMCPRGuide()
-        
-        # Initialize speech recognition
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        # Heavy subsystems are built on first use (and pre-warmed while the mode
+        # selection window is up) so the first window appears without a stall
+        self.subsystems = {
+            'mediapipe': LazyResource(self._load_mediapipe, 'mediapipe'),
+            'pose': LazyResource(self._create_pose, 'pose'),
+            'hands': LazyResource(self._create_hands, 'hands'),
+            'audio': LazyResource(self._init_audio, 'audio'),
+            'tts': LazyResource(self._create_tts_engine, 'tts'),
+            'llm_guide': LazyResource(LLMCPRGuide, 'llm_guide'),
+            'prefetcher': LazyResource(lambda: GuidancePrefetcher(self.llm_guide), 'prefetcher'),
+            # One calibrated microphone stream, opened only when voice is first used
+            'voice_stream': LazyResource(self._create_voice_stream, 'voice_stream'),
+            'voice_commands': LazyResource(self._create_voice_commands, 'voice_commands')
+        }
+        
+        # Speech worker: a single thread owns the TTS engine and speaks queued text in order
+        self.speech_queue = queue.Queue()
+        self.speech_thread = None
+        self.speech_lock = threading.Lock()
         
         # CPR tracking variables
         self.compression_count = 0
@@ -62,6 +52,10 @@ class EnhancedCPRAssistant:
         self.hand_placement_score = 0
         self.last_compression_time = 0
         self.compression_times = []
+        self.timing_stats = TimingStats()  # Compressions are timed by frame capture time
+        self.stage_timer = StageTimer()  # Per-stage frame latency, 'L' toggles the HUD
+        self.latency_report_path = None  # Only written when asked for (--latency-report), see the launchers
+        self.startup_profiler = None  # Set by the launcher for --profile-startup
         self.metronome_active = False
         self.mode = None
         
@@ -71,6 +65,17 @@ class EnhancedCPRAssistant:
         self.current_step = 0
         self.step_timer = 0
         self.qa_window = None
+        self.pending_answer = None
+        self.spoken_question = None  # Only the answer to the latest question is spoken
+        
+        # Feedback state: rules are only re-evaluated when the quantized metrics change
+        self.feedback_tracker = FeedbackTracker()
+        self.last_spoken_feedback = {}
+        
+        # Glass-to-glass latency measurement, off unless enable_latency_measurement() is called
+        self.latency_probe = None
+        self.replay_path = None
+        self.latency_probe_report_path = 'glass_to_glass.json'
         
         # Walkthrough steps
         self.walkthrough_steps = [
@@ -86,18 +91,130 @@ class EnhancedCPRAssistant:
         # Performance tracking
         self.performance_history = []
         self.session_start_time = time.time()
+    
+    # Optional and heavy dependencies are imported by the factories below, so
+    # importing this module (and showing the first window) stays fast
+    
+    def _load_mediapipe(self):
+        """Import MediaPipe, which takes seconds on a cold start"""
+        import mediapipe as mp
+        return mp.solutions
+    
+    def _create_pose(self):
+        """Build the MediaPipe pose graph"""
+        return self.mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=1,
+            enable_segmentation=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+    
+    def _create_hands(self):
+        """Build the MediaPipe hands graph"""
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+    
+    def _init_audio(self):
+        """Import pygame and open the audio mixer"""
+        import pygame
+        pygame.mixer.init()
+        return pygame
+    
+    def _create_tts_engine(self):
+        """Create the text-to-speech engine"""
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 150)
+        return engine
+    
+    def _create_voice_stream(self):
+        """Create the shared background microphone stream"""
+        from voice_input import StreamingVoiceInput
+        return StreamingVoiceInput()
+    
+    def _create_voice_commands(self):
+        """Spoken commands on the shared microphone stream, when speech support is installed"""
+        try:
+            from voice_commands import VOICE_COMMANDS, VoiceCommandChannel
+            voice_stream = self.voice_stream
+        except ImportError:
+            return None  # Voice commands need speech_recognition and an offline spotter
+        # There is no session upload here, so "upload" is not listened for
+        commands = {word: key for word, key in VOICE_COMMANDS.items() if key != 'u'}
+        return VoiceCommandChannel(voice_stream, commands=commands)
+    
+    @property
+    def mp_pose(self):
+        return self.subsystems['mediapipe'].get().pose
+    
+    @property
+    def mp_hands(self):
+        return self.subsystems['mediapipe'].get().hands
+    
+    @property
+    def mp_drawing(self):
+        return self.subsystems['mediapipe'].get().drawing_utils
+    
+    @property
+    def pose(self):
+        return self.subsystems['pose'].get()
+    
+    @property
+    def hands(self):
+        return self.subsystems['hands'].get()
+    
+    @property
+    def engine(self):
+        return self.subsystems['tts'].get()
+    
+    @property
+    def llm_guide(self):
+        return self.subsystems['llm_guide'].get()
+    
+    @property
+    def prefetcher(self):
+        return self.subsystems['prefetcher'].get()
+    
+    @property
+    def voice_stream(self):
+        return self.subsystems['voice_stream'].get()
+    
+    @property
+    def voice_commands(self):
+        return self.subsystems['voice_commands'].get()
+    
+    def prewarm_subsystems(self):
+        """Build every heavy subsystem in the background before it is needed"""
+        for name, resource in self.subsystems.items():
+            # The TTS engine is created on the speech worker thread that uses it
+            if name != 'tts':
+                resource.prewarm()
+        self._start_speech_worker()
+        
+    def enable_latency_measurement(self, replay_path=None, event_times=None):
+        """
+        Measure glass-to-glass latency for the session
         
+        Args:
+            replay_path: Recording to replay in real time instead of using the camera
+            event_times: Known compression times in the recording, in seconds of video time
+        """
+        self.latency_probe = LatencyProbe(event_times)
+        self.replay_path = replay_path
+    
     def initialize_camera(self):
-        """Initialize camera capture"""
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
-            raise Exception("Could not open camera")
-        
-        # Set camera properties for better performance
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.camera.set(cv2.CAP_PROP_FPS, 30)
-        
+        """Start opening and warming up the camera (or the replayed recording) in the background"""
+        if self.replay_path:
+            self.camera = ReplayCapture(self.replay_path, on_start=self.latency_probe.start_events)
+        else:
+            self.camera = CameraCapture(device=0, width=640, height=480, fps=30)
+        self.camera.open_async()
+    
     def calculate_bpm(self, compression_times):
         """Calculate BPM from compression timing"""
         if len(compression_times) < 2:
@@ -170,10 +287,21 @@ class EnhancedCPRAssistant:
     def _metronome_loop(self):
         """Metronome audio loop"""
         interval = 60.0 / self.target_bpm
+        try:
+            self.subsystems['audio'].get()
+        except Exception as e:
+            print(f"Metronome disabled: {e}")
+            self.metronome_active = False
+            return
         
+        # Beats are scheduled on the monotonic clock so click time does not accumulate drift
+        next_beat = time.monotonic()
         while self.metronome_active:
             self._play_metronome_click()
-            time.sleep(interval)
+            if self.latency_probe:
+                self.latency_probe.metronome_click(next_beat)
+            next_beat += interval
+            time.sleep(max(0.0, next_beat - time.monotonic()))
     
     def _play_metronome_click(self):
         """Play metronome click sound"""
@@ -188,43 +316,71 @@ class EnhancedCPRAssistant:
             arr[i][0] = np.sin(2 * np.pi * frequency * i / sample_rate) * 0.1
             arr[i][1] = arr[i][0]
         
+        pygame = self.subsystems['audio'].get()
         sound = pygame.sndarray.make_sound(arr.astype(np.int16))
         sound.play()
     
-    def speak(self, text):
-        """Convert text to speech"""
-        def _speak():
-            self.engine.say(text)
-            self.engine.runAndWait()
-        
-        speech_thread = threading.Thread(target=_speak)
-        speech_thread.daemon = True
-        speech_thread.start()
+    def speak(self, text, capture_time=None):
+        """Queue text to be spoken by the speech worker (capture_time is the frame that prompted it, if any)"""
+        self._start_speech_worker()
+        self.speech_queue.put((text, capture_time))
+    
+    def _start_speech_worker(self):
+        """Start the speech worker if it is not running yet"""
+        with self.speech_lock:
+            if self.speech_thread is None:
+                self.speech_thread = threading.Thread(target=self._speech_loop)
+                self.speech_thread.daemon = True
+                self.speech_thread.start()
+    
+    def _speech_loop(self):
+        """Speak queued text one utterance at a time"""
+        try:
+            engine = self.engine
+        except Exception as e:
+            print(f"Speech disabled: {e}")
+            engine = None
+        
+        while True:
+            text, capture_time = self.speech_queue.get()
+            if engine is None:
+                continue
+            if self.latency_probe and capture_time is not None:
+                self.latency_probe.speech_emitted(capture_time)
+            try:
+                engine.say(text)
+                engine.runAndWait()
+            except Exception as e:
+                print(f"Speech error: {e}")
     
     def get_feedback_color(self, bpm):
         """Get color based on BPM feedback"""
-        if 100 <= bpm <= 120:
-            return (0, 255, 0)  # Green
-        elif bpm < 100:
-            return (0, 0, 255)  # Red
-        else:
-            return (0, 165, 255)  # Orange
+        return feedback_color(bpm)
+    
+    def get_jitter_stats(self):
+        """Frame, processing and compression timing statistics"""
+        return self.timing_stats.summary()
     
     def process_frame(self, frame):
         """Process a single frame for CPR feedback"""
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.stage_timer.lap('convert')
         
         pose_results = self.pose.process(rgb_frame)
+        self.stage_timer.lap('pose')
         hands_results = self.hands.process(rgb_frame)
+        self.stage_timer.lap('hands')
         
         # Draw pose landmarks
         if pose_results.pose_landmarks:
             self.mp_drawing.draw_landmarks(
                 frame, pose_results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS
             )
+            self.stage_timer.lap('draw')
             
             self.hand_placement_score = self.detect_hand_placement(pose_results.pose_landmarks)
             self.compression_depth = self.detect_compression_depth(pose_results.pose_landmarks)
+            self.stage_timer.lap('detect')
         
         # Draw hand landmarks
         if hands_results.multi_hand_landmarks:
@@ -232,9 +388,50 @@ class EnhancedCPRAssistant:
                 self.mp_drawing.draw_landmarks(
                     frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
                 )
+            self.stage_timer.lap('draw')
         
         return frame, pose_results, hands_results
     
+    def update_from_landmarks(self, landmarks, capture_time):
+        """
+        Update placement, depth, compression count and rate from one frame's pose landmarks
+        
+        This is what the feedback loop does after pose estimation, so recorded or
+        synthetic landmarks can be run through the same detection without a camera.
+        
+        Args:
+            landmarks: Pose landmarks (anything exposing .landmark[i].x/.y), or None
+                if no pose was found (the last placement and depth are kept)
+            capture_time: Capture time of the frame in seconds
+        
+        Returns:
+            bool: Whether a compression was counted in this frame
+        """
+        if landmarks:
+            self.hand_placement_score = self.detect_hand_placement(landmarks)
+            self.compression_depth = self.detect_compression_depth(landmarks)
+        return self.update_compression_timing(capture_time)
+    
+    def update_compression_timing(self, capture_time):
+        """Count a compression from the current depth and update the rate from capture timestamps"""
+        counted = False
+        if self.compression_depth > 0.5:
+            if self.last_compression_time > 0:
+                interval = capture_time - self.last_compression_time
+                if 0.3 < interval < 1.0:
+                    self.compression_times.append(capture_time)
+                    self.timing_stats.observe_compression(capture_time)
+                    self.compression_count += 1
+                    counted = True
+                    
+                    if len(self.compression_times) > 10:
+                        self.compression_times.pop(0)
+                    
+                    self.current_bpm = self.calculate_bpm(self.compression_times)
+            
+            self.last_compression_time = capture_time
+        return counted
+    
     def add_enhanced_overlay(self, frame):
         """Add enhanced CPR feedback overlay"""
         height, width = frame.shape[:2]
@@ -242,8 +439,11 @@ class EnhancedCPRAssistant:
         # Background for text areas
         overlay = frame.copy()
         
+        feedback = self.feedback_tracker.update(self.current_bpm, self.compression_depth,
+                                                self.hand_placement_score)
+        
         # Current BPM with color coding
-        bpm_color = self.get_feedback_color(self.current_bpm)
+        bpm_color = feedback.bpm_color
         cv2.rectangle(overlay, (10, 10), (250, 80), (0, 0, 0), -1)
         cv2.putText(frame, f"BPM: {int(self.current_bpm)}", (20, 40), 
                    cv2.FONT_HERSHEY_SIMPLEX, 1, bpm_color, 2)
@@ -254,13 +454,13 @@ class EnhancedCPRAssistant:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # Hand placement score
-        placement_color = (0, 255, 0) if self.hand_placement_score > 0.7 else (0, 0, 255)
+        placement_color = feedback.placement_color
         cv2.rectangle(overlay, (10, 140), (250, 180), (0, 0, 0), -1)
         cv2.putText(frame, f"Hands: {int(self.hand_placement_score*100)}%", (20, 170), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, placement_color, 2)
         
         # Compression depth
-        depth_color = (0, 255, 0) if self.compression_depth > 0.7 else (0, 0, 255)
+        depth_color = feedback.depth_color
         cv2.rectangle(overlay, (10, 190), (250, 230), (0, 0, 0), -1)
         cv2.putText(frame, f"Depth: {int(self.compression_depth*100)}%", (20, 220), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, depth_color, 2)
@@ -321,7 +521,7 @@ class EnhancedCPRAssistant:
         
         # Voice input button
         voice_btn = tk.Button(question_frame, text="🎤 Voice Input", 
-                            command=lambda: self.voice_input(question_entry),
+                            command=lambda: self.voice_input(question_entry, response_text),
                             bg='#3498db', fg='white', font=('Arial', 10))
         voice_btn.pack(pady=5)
         
@@ -344,10 +544,7 @@ class EnhancedCPRAssistant:
         def ask_question():
             question = question_entry.get().strip()
             if question:
-                response = self.llm_guide.ask_cpr_question(question)
-                response_text.delete(1.0, tk.END)
-                response_text.insert(tk.END, response)
-                self.speak(response)
+                self.request_answer(question, response_text)
         
         ask_btn = tk.Button(button_frame, text="Ask Question", 
                            command=ask_question,
@@ -366,15 +563,7 @@ class EnhancedCPRAssistant:
         tk.Label(quick_frame, text="Quick Questions:", 
                 font=('Arial', 10, 'bold'), fg='white', bg='#2c3e50').pack(anchor='w')
         
-        quick_questions = [
-            "What's the correct compression rate?",
-            "How deep should I compress?",
-            "Where do I place my hands?",
-            "When do I give rescue breaths?",
-            "What if I'm alone?"
-        ]
-        
-        for i, q in enumerate(quick_questions):
+        for i, q in enumerate(QUICK_QUESTIONS):
             btn = tk.Button(quick_frame, text=q, 
                            command=lambda q=q: self.ask_quick_question(q, question_entry, response_text),
                            bg='#34495e', fg='white', font=('Arial', 9),
@@ -384,35 +573,107 @@ class EnhancedCPRAssistant:
         # Bind Enter key
         question_entry.bind('<Return>', lambda e: ask_question())
     
-    def voice_input(self, entry_widget):
-        """Handle voice input for questions"""
-        def _voice_input():
-            try:
-                with self.microphone as source:
-                    self.recognizer.adjust_for_ambient_noise(source)
-                    audio = self.recognizer.listen(source, timeout=5)
-                    text = self.recognizer.recognize_google(audio)
-                    entry_widget.delete(0, tk.END)
-                    entry_widget.insert(0, text)
-            except sr.WaitTimeoutError:
-                messagebox.showwarning("Timeout", "No speech detected. Please try again.")
-            except sr.UnknownValueError:
-                messagebox.showwarning("Error", "Could not understand speech. Please try again.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Voice input error: {e}")
+    def voice_input(self, entry_widget, response_widget=None):
+        """Handle voice input for questions, asking the question as soon as it is recognized"""
+        try:
+            future = self.voice_stream.listen_once(timeout=5)
+        except Exception as e:
+            messagebox.showerror("Error", f"Voice input error: {e}")
+            return
         
-        voice_thread = threading.Thread(target=_voice_input)
-        voice_thread.daemon = True
-        voice_thread.start()
+        self._fill_entry_when_heard(future, entry_widget, response_widget)
+    
+    def _fill_entry_when_heard(self, future, entry_widget, response_widget):
+        """Poll a voice recognition request from the Tk event loop"""
+        if not entry_widget.winfo_exists():
+            return
+        
+        if not future.done():
+            entry_widget.after(50, self._fill_entry_when_heard, future, entry_widget, response_widget)
+            return
+        
+        import speech_recognition as sr  # Already loaded by the voice stream
+        try:
+            text = future.result()
+        except sr.WaitTimeoutError:
+            messagebox.showwarning("Timeout", "No speech detected. Please try again.")
+            return
+        except sr.UnknownValueError:
+            messagebox.showwarning("Error", "Could not understand speech. Please try again.")
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Voice input error: {e}")
+            return
+        
+        entry_widget.delete(0, tk.END)
+        entry_widget.insert(0, text)
+        if response_widget is not None:
+            self.request_answer(text, response_widget)
     
     def ask_quick_question(self, question, entry_widget, response_widget):
         """Ask a quick question"""
         entry_widget.delete(0, tk.END)
         entry_widget.insert(0, question)
-        response = self.llm_guide.ask_cpr_question(question)
+        self.request_answer(question, response_widget)
+    
+    def request_answer(self, question, response_widget):
+        """Ask the LLM without blocking the UI, speaking each sentence as it streams in"""
+        sentences = []
+        key = normalize_question(question)
+        
+        def on_sentence(sentence):
+            sentences.append(sentence)
+            if key == self.spoken_question:  # Else a newer question superseded this one
+                self.speak(sentence)
+        
+        self.spoken_question = key
+        future = self.llm_guide.ask_cpr_question_async(question, on_sentence=on_sentence)
+        
+        # Repeated clicks on the same question share the in-flight request,
+        # so only the first one needs to display and speak the answer
+        if future is self.pending_answer:
+            return
+        
+        self.pending_answer = future
         response_widget.delete(1.0, tk.END)
-        response_widget.insert(tk.END, response)
-        self.speak(response)
+        response_widget.insert(tk.END, "Thinking...")
+        self._show_answer_when_ready(future, question, response_widget, sentences, 0)
+    
+    def _show_answer_when_ready(self, future, question, response_widget, sentences, shown):
+        """Poll an in-flight answer from the Tk event loop, showing sentences as they arrive"""
+        if future is not self.pending_answer or not response_widget.winfo_exists():
+            return
+        
+        if future.done():
+            self.pending_answer = None
+            try:
+                response = future.result()
+            except Exception as e:
+                print(f"LLM request failed: {e}")
+                response = self.llm_guide.fallback_response(question)
+                sentences = []
+            response_widget.delete(1.0, tk.END)
+            response_widget.insert(tk.END, response)
+            
+            # Joined a request that was already in flight (e.g. a prefetch), so nothing was streamed
+            if not sentences:
+                self.speak(response)
+            return
+        
+        if len(sentences) > shown:
+            if shown == 0:
+                response_widget.delete(1.0, tk.END)
+            response_widget.insert(tk.END, " ".join(sentences[shown:]) + " ")
+            shown = len(sentences)
+        
+        response_widget.after(50, self._show_answer_when_ready, future, question, response_widget, sentences, shown)
+    
+    def read_key(self):
+        """Get the next key press, or the key for a spoken command"""
+        key = cv2.waitKey(1) & 0xFF
+        if key == 0xFF and self.voice_commands:
+            key = self.voice_commands.poll_key()
+        return key
     
     def run_walkthrough_mode(self):
         """Run step-by-step CPR walkthrough"""
@@ -422,11 +683,17 @@ class EnhancedCPRAssistant:
         self.speak(self.walkthrough_steps[self.current_step])
         
         while self.running and self.current_step < len(self.walkthrough_steps):
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
+            frame = captured.image
             
             processed_frame, pose_results, hands_results = self.process_frame(frame)
+            self.timing_stats.observe_frame(captured.timestamp)
+            self.prefetcher.observe(self.current_bpm, self.compression_depth,
+                                    self.hand_placement_score, self.current_step)
             frame_with_overlay = self.add_enhanced_overlay(processed_frame)
             
             # Show current step
@@ -440,11 +707,20 @@ class EnhancedCPRAssistant:
             cv2.putText(frame_with_overlay, "Skip to Compressions", (width-190, height-45), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
             
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
+            
             cv2.imshow('CPR Assistant - Walkthrough Mode', frame_with_overlay)
             
-            key = cv2.waitKey(1) & 0xFF
+            key = self.read_key()
+            if self.latency_probe:
+                self.latency_probe.frame_displayed(captured.timestamp, self.compression_count)
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
             elif key == ord('n'):
                 self.current_step += 1
                 if self.current_step < len(self.walkthrough_steps):
@@ -461,52 +737,48 @@ class EnhancedCPRAssistant:
         self.start_metronome()
         
         while self.running:
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
+            frame = captured.image
             
             processed_frame, pose_results, hands_results = self.process_frame(frame)
+            self.timing_stats.observe_frame(captured.timestamp)
             
-            # Update BPM calculation
-            current_time = time.time()
-            if self.compression_depth > 0.5:
-                if self.last_compression_time > 0:
-                    interval = current_time - self.last_compression_time
-                    if 0.3 < interval < 1.0:
-                        self.compression_times.append(current_time)
-                        self.compression_count += 1
-                        
-                        if len(self.compression_times) > 10:
-                            self.compression_times.pop(0)
-                        
-                        self.current_bpm = self.calculate_bpm(self.compression_times)
-                
-                self.last_compression_time = current_time
+            # Update BPM calculation from the frame's capture time, so processing latency does not skew the rate
+            current_time = captured.timestamp
+            self.update_compression_timing(current_time)
+            self.stage_timer.lap('detect')
             
+            self.prefetcher.observe(self.current_bpm, self.compression_depth, self.hand_placement_score)
             frame_with_overlay = self.add_enhanced_overlay(processed_frame)
             
-            # Provide intelligent feedback
-            if self.current_bpm > 0:
-                feedback = self.get_llm_feedback()
-                
-                if self.current_bpm < 100:
-                    if not hasattr(self, '_last_slow_warning') or current_time - self._last_slow_warning > 3:
-                        self.speak(feedback["bpm_feedback"])
-                        self._last_slow_warning = current_time
-                elif self.current_bpm > 120:
-                    if not hasattr(self, '_last_fast_warning') or current_time - self._last_fast_warning > 3:
-                        self.speak(feedback["bpm_feedback"])
-                        self._last_fast_warning = current_time
-                else:
-                    if not hasattr(self, '_last_good_pace') or current_time - self._last_good_pace > 5:
-                        self.speak(feedback["overall_feedback"])
-                        self._last_good_pace = current_time
+            # Provide intelligent feedback, repeating each kind of prompt at most every few seconds
+            feedback = self.feedback_tracker.update(self.current_bpm, self.compression_depth,
+                                                    self.hand_placement_score)
+            if feedback.speech:
+                message_key, repeat_interval = feedback.speech
+                rate_band = feedback.state[0]
+                if current_time - self.last_spoken_feedback.get(rate_band, 0) > repeat_interval:
+                    self.speak(getattr(feedback, message_key), current_time)
+                    self.last_spoken_feedback[rate_band] = current_time
+            
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
             
             cv2.imshow('CPR Assistant - Feedback Mode', frame_with_overlay)
             
-            key = cv2.waitKey(1) & 0xFF
+            key = self.read_key()
+            if self.latency_probe:
+                self.latency_probe.frame_displayed(captured.timestamp, self.compression_count)
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
             elif key == ord('a'):  # Ask Q&A
                 self.show_qa_window()
     
@@ -558,11 +830,16 @@ class EnhancedCPRAssistant:
         
         # Instructions
         instructions = tk.Label(root, 
-                               text="Press 'A' during CPR to ask questions\nPress 'Q' to quit", 
+                               text="Press 'A' during CPR to ask questions\nPress 'Q' to quit\nPress 'L' for latency HUD", 
                                font=('Arial', 10), 
                                fg='white', bg='#2c3e50')
         instructions.pack(pady=10)
         
+        # Get the models, audio and LLM client ready while the user picks a mode
+        self.prewarm_subsystems()
+        
+        if self.startup_profiler:
+            self.startup_profiler.finish_when_shown(root)
         root.mainloop()
     
     def start_mode(self, mode, root):
@@ -570,6 +847,16 @@ class EnhancedCPRAssistant:
         self.mode = mode
         root.destroy()
         
+        # The camera has been warming up while the mode selection window was open
+        try:
+            self.camera.wait_until_open()
+        except Exception as e:
+            print(f"Error: {e}")
+            messagebox.showerror("Error", f"Failed to initialize: {e}")
+            return
+        if self.voice_commands:
+            self.voice_commands.start()
+        
         if mode == "walkthrough":
             self.run_walkthrough_mode()
         else:
@@ -592,6 +879,17 @@ class EnhancedCPRAssistant:
         """Cleanup resources"""
         self.running = False
         self.stop_metronome()
+        if self.subsystems['voice_stream'].created:
+            self.voice_stream.stop()
+        
+        if self.timing_stats.frame_intervals:
+            print(self.timing_stats.format_summary())
+        report = self.stage_timer.dump_json(self.latency_report_path)
+        if report:
+            print(f"Frame stage latency written to {report}")
+        if self.latency_probe:
+            print(self.latency_probe.format_summary())
+            self.latency_probe.dump_json(self.latency_probe_report_path)
         
         if self.camera:
             self.camera.release()
@@ -599,4 +897,5 @@ class EnhancedCPRAssistant:
 
 if __name__ == "__main__":
     app = EnhancedCPRAssistant()
+    app.latency_report_path = latency_report_requested()
     app.run()
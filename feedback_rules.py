@@ -0,0 +1,238 @@
+"""
+CPR Feedback Rules
+Declarative feedback thresholds and messages shared by every CPR Assistant variant.
+The rule set is compiled once into a lookup over quantized (rate, depth, placement)
+states, so per-frame feedback is a table lookup rather than a chain of comparisons
+and string formatting.
+"""
+
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# BGR colors used by the OpenCV overlays
+GREEN = (0, 255, 0)
+RED = (0, 0, 255)
+ORANGE = (0, 165, 255)
+
+# Bands for each metric: (band, upper bound, bound is inclusive), checked in order
+RATE_BANDS = [
+    ('none', 0, True),
+    ('slow', 100, False),
+    ('good', 120, True),
+    ('fast', float('inf'), True)
+]
+
+# The coaching text counts a depth of exactly 0.7 as deep enough, while the overlays
+# only turn green above 0.7, hence the one-value 'minimum' band
+DEPTH_BANDS = [
+    ('shallow', 0.7, False),
+    ('minimum', 0.7, True),
+    ('good', float('inf'), True)
+]
+
+# Overlays turn green above 0.7 placement, the coaching text changes at 0.6 and 0.8
+PLACEMENT_BANDS = [
+    ('off', 0.6, False),
+    ('close', 0.7, True),
+    ('near', 0.8, False),
+    ('good', float('inf'), True)
+]
+
+# Depth bands that meet the target depth
+DEPTH_TARGET_BANDS = ('minimum', 'good')
+
+# Messages and colors per band. '{bpm}' in coaching text is filled with the rounded rate.
+RATE_RULES = {
+    'none': {
+        'color': RED,
+        'coaching': "Too slow at {bpm} BPM. Speed up to 100-120 BPM.",
+        'visual': ("⚠ Too slow - speed up!", ORANGE),
+        'status': None,
+        'prompt': None,
+        'speech': None
+    },
+    'slow': {
+        'color': RED,
+        'coaching': "Too slow at {bpm} BPM. Speed up to 100-120 BPM.",
+        'visual': ("⚠ Too slow - speed up!", ORANGE),
+        'status': ("Too slow - speed up!", RED),
+        'prompt': "Go faster",
+        'speech': ('bpm_feedback', 3.0)
+    },
+    'good': {
+        'color': GREEN,
+        'coaching': "Excellent rhythm! Keep going at this pace.",
+        'visual': ("✓ Good rhythm!", GREEN),
+        'status': ("Good rhythm!", GREEN),
+        'prompt': "Good pace, keep going!",
+        'speech': ('overall_feedback', 5.0)
+    },
+    'fast': {
+        'color': ORANGE,
+        'coaching': "Too fast at {bpm} BPM. Slow down to 100-120 BPM.",
+        'visual': ("⚠ Too fast - slow down!", ORANGE),
+        'status': ("Too fast - slow down!", ORANGE),
+        'prompt': "Go slower",
+        'speech': ('bpm_feedback', 3.0)
+    }
+}
+
+DEPTH_RULES = {
+    'shallow': {
+        'color': RED,
+        'coaching': "Push harder! Compress at least 2 inches deep.",
+        'visual': ("⚠ Push harder!", ORANGE)
+    },
+    'minimum': {
+        'color': RED,
+        'coaching': "Good compression depth!",
+        'visual': ("✓ Good depth!", GREEN)
+    },
+    'good': {
+        'color': GREEN,
+        'coaching': "Good compression depth!",
+        'visual': ("✓ Good depth!", GREEN)
+    }
+}
+
+PLACEMENT_RULES = {
+    'off': {
+        'color': RED,
+        'coaching': "Move hands to center of chest, between nipples.",
+        'visual': ("⚠ Move hands to chest center", ORANGE)
+    },
+    'close': {
+        'color': RED,
+        'coaching': "Good placement, try to center hands more.",
+        'visual': ("⚠ Center hands more", ORANGE)
+    },
+    'near': {
+        'color': GREEN,
+        'coaching': "Good placement, try to center hands more.",
+        'visual': ("⚠ Center hands more", ORANGE)
+    },
+    'good': {
+        'color': GREEN,
+        'coaching': "Perfect hand placement!",
+        'visual': ("✓ Perfect hand placement!", GREEN)
+    }
+}
+
+# Overall verdicts, first match wins: (rate bands, depth bands, placement bands, message)
+OVERALL_RULES = [
+    (('good',), DEPTH_TARGET_BANDS, ('good',), "Excellent CPR technique! Keep it up!"),
+    (('none', 'slow'), None, None, "Focus on: proper hand placement, adequate depth, and correct rhythm."),
+    (None, ('shallow',), None, "Focus on: proper hand placement, adequate depth, and correct rhythm."),
+    (None, None, ('off',), "Focus on: proper hand placement, adequate depth, and correct rhythm."),
+    (None, None, None, "Good effort! Continue with minor adjustments.")
+]
+
+class Feedback(NamedTuple):
+    """Everything the assistants show or say for one quantized performance state"""
+    state: Tuple[str, str, str]
+    bpm_color: Tuple[int, int, int]
+    depth_color: Tuple[int, int, int]
+    placement_color: Tuple[int, int, int]
+    bpm_feedback: str
+    depth_feedback: str
+    placement_feedback: str
+    overall_feedback: str
+    visual_messages: Tuple[Tuple[str, Tuple[int, int, int]], ...]
+    rate_status: Optional[Tuple[str, Tuple[int, int, int]]]
+    prompt: Optional[str]
+    speech: Optional[Tuple[str, float]]
+    
+    def as_dict(self) -> Dict[str, str]:
+        """Coaching messages in the format returned by LLMCPRGuide.get_compression_feedback"""
+        return {
+            "bpm_feedback": self.bpm_feedback,
+            "depth_feedback": self.depth_feedback,
+            "placement_feedback": self.placement_feedback,
+            "overall_feedback": self.overall_feedback
+        }
+
+def _quantize(value: float, bands) -> str:
+    """Find the band a value falls in"""
+    for band, bound, inclusive in bands:
+        if value < bound or (inclusive and value == bound):
+            return band
+    return bands[-1][0]
+
+def quantize_state(bpm: float, depth: float, hand_placement: float) -> Tuple[str, str, str]:
+    """Quantize raw metrics into a (rate, depth, placement) band state"""
+    return (_quantize(bpm, RATE_BANDS),
+            _quantize(depth, DEPTH_BANDS),
+            _quantize(hand_placement, PLACEMENT_BANDS))
+
+def _overall_message(rate: str, depth: str, placement: str) -> str:
+    """Apply the overall verdict rules to a state"""
+    for rates, depths, placements, message in OVERALL_RULES:
+        if ((rates is None or rate in rates) and
+                (depths is None or depth in depths) and
+                (placements is None or placement in placements)):
+            return message
+    return OVERALL_RULES[-1][3]
+
+def _compile_rules() -> Dict[Tuple[str, str, str], Feedback]:
+    """Precompute the feedback for every quantized state"""
+    compiled = {}
+    for rate, rate_rule in RATE_RULES.items():
+        for depth, depth_rule in DEPTH_RULES.items():
+            for placement, placement_rule in PLACEMENT_RULES.items():
+                state = (rate, depth, placement)
+                compiled[state] = Feedback(
+                    state=state,
+                    bpm_color=rate_rule['color'],
+                    depth_color=depth_rule['color'],
+                    placement_color=placement_rule['color'],
+                    bpm_feedback=rate_rule['coaching'],
+                    depth_feedback=depth_rule['coaching'],
+                    placement_feedback=placement_rule['coaching'],
+                    overall_feedback=_overall_message(rate, depth, placement),
+                    visual_messages=(rate_rule['visual'], depth_rule['visual'], placement_rule['visual']),
+                    rate_status=rate_rule['status'],
+                    prompt=rate_rule['prompt'],
+                    speech=rate_rule['speech']
+                )
+    return compiled
+
+COMPILED_RULES = _compile_rules()
+
+@lru_cache(maxsize=512)
+def _feedback_for(state: Tuple[str, str, str], rounded_bpm: int) -> Feedback:
+    """Fill the rate into a compiled state's coaching text (memoized)"""
+    feedback = COMPILED_RULES[state]
+    if '{bpm}' not in feedback.bpm_feedback:
+        return feedback
+    return feedback._replace(bpm_feedback=feedback.bpm_feedback.format(bpm=rounded_bpm))
+
+# Rate bands whose coaching text depends on the exact (rounded) rate
+RATE_BANDS_WITH_BPM = {band for band, rule in RATE_RULES.items() if '{bpm}' in rule['coaching']}
+
+def _state_key(bpm: float, depth: float, hand_placement: float) -> Tuple[Tuple[str, str, str], int]:
+    """Quantized state plus the rounded rate when the messages need it"""
+    state = quantize_state(bpm, depth, hand_placement)
+    return state, (round(bpm) if state[0] in RATE_BANDS_WITH_BPM else 0)
+
+def evaluate_feedback(bpm: float, depth: float, hand_placement: float) -> Feedback:
+    """Get the feedback for a set of raw metrics"""
+    return _feedback_for(*_state_key(bpm, depth, hand_placement))
+
+def feedback_color(bpm: float) -> Tuple[int, int, int]:
+    """Get the overlay color for a compression rate"""
+    return RATE_RULES[_quantize(bpm, RATE_BANDS)]['color']
+
+class FeedbackTracker:
+    """Re-evaluates feedback only when the quantized performance state changes"""
+    
+    def __init__(self):
+        self.key = None
+        self.feedback = evaluate_feedback(0, 0, 0)
+    
+    def update(self, bpm: float, depth: float, hand_placement: float) -> Feedback:
+        """Get the feedback for the latest metrics"""
+        key = _state_key(bpm, depth, hand_placement)
+        if key != self.key:
+            self.key = key
+            self.feedback = _feedback_for(*key)
+        return self.feedback
@@ -0,0 +1,278 @@
+"""
+Frame Spool
+Streams recorded training frames to disk through a background JPEG encoder instead of
+keeping base64 strings in memory. Frames are appended to chunk files of concatenated
+JPEGs with a CSV index of timestamps and byte ranges, so any frame can be read back
+directly. A small bounded queue (frames beyond it are dropped and counted) and an
+optional minimum interval between frames bound the memory and CPU recording costs.
+Frames that arrive already encoded skip the queue and are written straight away.
+"""
+
+import array
+import csv
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, Optional
+
+import cv2
+import numpy as np
+
+INDEX_FILE = 'index.csv'
+INDEX_COLUMNS = ['timestamp', 'chunk', 'offset', 'length']
+
+def chunk_name(chunk: int) -> str:
+    """File name of a chunk of concatenated JPEGs"""
+    return f"frames_{chunk:05d}.jpgs"
+
+def _remove_directory(directory: str):
+    """Delete a temporary spool directory"""
+    shutil.rmtree(directory, ignore_errors=True)
+
+def _encode_loop(spool_ref, frames: queue.Queue):
+    """
+    Encode and write queued frames until close() queues None
+    
+    The thread only holds a weak reference to the spool, so a spool that is dropped
+    without close() can still be garbage collected (and its temporary directory removed).
+    """
+    while True:
+        try:
+            item = frames.get(timeout=1.0)
+        except queue.Empty:
+            if spool_ref() is None:
+                break
+            continue
+        spool = spool_ref()
+        if item is None or spool is None:
+            break
+        spool._encode(*item)
+        del spool
+
+class FrameSpool:
+    def __init__(self, directory: Optional[str] = None, quality: int = 80, min_interval: float = 0.0,
+                 chunk_frames: int = 1000, max_queue: int = 8):
+        """
+        A spool of JPEG frames on disk, created on the first frame
+        
+        Args:
+            directory: Spool directory (None for a temporary one removed on close, when
+                the spool is garbage collected or when Python exits)
+            quality: JPEG quality for frames encoded here
+            min_interval: Seconds (by frame timestamp) to skip after each accepted frame
+                (0 keeps every frame)
+            chunk_frames: Frames per chunk file
+            max_queue: Raw frames waiting for the encoder before new ones are dropped
+        """
+        self.directory = directory
+        self.temporary = directory is None
+        self.quality = quality
+        self.min_interval = min_interval
+        self.chunk_frames = chunk_frames
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()  # Encoded frames are written from the caller's thread too
+        self.thread = None
+        self.chunk_file = None
+        self.index_file = None
+        self.index_writer = None
+        self.last_accepted = None
+        self.closed = False
+        self.finished = False
+        self.dropped = 0
+        self.encode_seconds = 0.0
+        self._finalizer = None
+        
+        # Index of the written frames, in compact arrays
+        self.timestamps = array.array('d')
+        self.chunks = array.array('l')
+        self.offsets = array.array('q')
+        self.lengths = array.array('l')
+    
+    def _open(self):
+        """Create the spool directory and index on the first write (caller holds write_lock)"""
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='cpr_frames_')
+            self._finalizer = weakref.finalize(self, _remove_directory, self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_file = open(os.path.join(self.directory, INDEX_FILE), 'w', newline='')
+        self.index_writer = csv.writer(self.index_file)
+        self.index_writer.writerow(INDEX_COLUMNS)
+    
+    def _start(self):
+        """Start the encoder thread"""
+        self.thread = threading.Thread(target=_encode_loop, args=(weakref.ref(self), self.queue), daemon=True)
+        self.thread.start()
+    
+    def _accept(self, timestamp: float) -> bool:
+        """Whether a frame at this timestamp is kept under the minimum interval"""
+        if self.closed:
+            return False
+        if self.min_interval <= 0:
+            return True
+        if self.last_accepted is not None and timestamp - self.last_accepted < self.min_interval:
+            return False
+        self.last_accepted = timestamp
+        return True
+    
+    def _enqueue(self, item) -> bool:
+        """Hand a frame to the encoder, dropping it if the encoder is behind"""
+        if self.thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+    
+    def add_frame(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        Queue a BGR frame to be JPEG encoded and spooled (a copy is queued)
+        
+        Returns:
+            bool: Whether the frame was queued (False if skipped or dropped)
+        """
+        if not self._accept(timestamp):
+            return False
+        return self._enqueue((timestamp, frame.copy(), None))
+    
+    def add_encoded(self, jpeg: bytes, timestamp: float) -> bool:
+        """
+        Spool an already JPEG encoded frame as is, written straight away since there is
+        nothing to encode (so it is never dropped for a busy encoder)
+        
+        Returns:
+            bool: Whether the frame was written (False if skipped under min_interval)
+        """
+        if not self._accept(timestamp):
+            return False
+        return self._write(timestamp, jpeg)
+    
+    def _encode(self, timestamp: float, frame: Optional[np.ndarray], jpeg: Optional[bytes]):
+        """Encode a queued frame (unless it already is) and write it"""
+        if jpeg is None:
+            start = time.perf_counter()
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            self.encode_seconds += time.perf_counter() - start
+            if not ok:
+                self.dropped += 1
+                return
+            jpeg = encoded.tobytes()
+        self._write(timestamp, jpeg)
+    
+    def _write(self, timestamp: float, jpeg: bytes) -> bool:
+        """Append a JPEG to the current chunk and index it (False once the spool is closed)"""
+        with self.write_lock:
+            if self.finished:
+                return False
+            if self.index_file is None:
+                self._open()
+            count = len(self.timestamps)
+            chunk = count // self.chunk_frames
+            if count % self.chunk_frames == 0:
+                if self.chunk_file:
+                    self.chunk_file.close()
+                self.chunk_file = open(os.path.join(self.directory, chunk_name(chunk)), 'wb')
+            offset = self.chunk_file.tell()
+            self.chunk_file.write(jpeg)
+            self.chunk_file.flush()
+            self.index_writer.writerow([repr(timestamp), chunk, offset, len(jpeg)])
+            self.index_file.flush()
+            with self.lock:
+                self.timestamps.append(timestamp)
+                self.chunks.append(chunk)
+                self.offsets.append(offset)
+                self.lengths.append(len(jpeg))
+        return True
+    
+    def __len__(self) -> int:
+        """Frames written so far (not counting queued ones)"""
+        return len(self.timestamps)
+    
+    def __bool__(self) -> bool:
+        return len(self) > 0
+    
+    def encoded(self, index: int) -> bytes:
+        """The JPEG bytes of a written frame"""
+        with self.lock:
+            chunk, offset, length = self.chunks[index], self.offsets[index], self.lengths[index]
+        with open(os.path.join(self.directory, chunk_name(chunk)), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        """Written frames as {'timestamp', 'jpeg', 'privacy_compliant'}, read from disk one at a time"""
+        for index in range(len(self)):
+            yield {'timestamp': self.timestamps[index], 'jpeg': self.encoded(index), 'privacy_compliant': True}
+    
+    def stats(self) -> Dict:
+        """Frames written, queued and dropped, and the time spent encoding"""
+        return {
+            'written': len(self),
+            'queued': self.queue.qsize(),
+            'dropped': self.dropped,
+            'encode_seconds': round(self.encode_seconds, 3)
+        }
+    
+    def close(self, keep: Optional[bool] = None):
+        """
+        Finish writing the queued frames and close the spool
+        
+        Args:
+            keep: Keep the spool directory (defaults to keeping it unless it is temporary)
+        """
+        self.closed = True
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        with self.write_lock:
+            self.finished = True
+            if self.chunk_file:
+                self.chunk_file.close()
+                self.chunk_file = None
+            if self.index_file:
+                self.index_file.close()
+                self.index_file = None
+        if keep is None:
+            keep = not self.temporary
+        if self._finalizer is not None and not keep:
+            self._finalizer()
+        elif self._finalizer is not None:
+            self._finalizer.detach()
+        elif not keep and self.directory and os.path.isdir(self.directory):
+            _remove_directory(self.directory)
+        self._finalizer = None
+
+class FrameSpoolReader:
+    def __init__(self, directory: str):
+        """Open a spool directory written by FrameSpool (only the index is read)"""
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE), newline='') as f:
+            rows = [row for row in csv.DictReader(f)]
+        self.timestamps = np.array([float(row['timestamp']) for row in rows])
+        self.chunks = np.array([int(row['chunk']) for row in rows], dtype=np.int64)
+        self.offsets = np.array([int(row['offset']) for row in rows], dtype=np.int64)
+        self.lengths = np.array([int(row['length']) for row in rows], dtype=np.int64)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def encoded(self, index: int) -> bytes:
+        """The JPEG bytes of a frame"""
+        with open(os.path.join(self.directory, chunk_name(int(self.chunks[index]))), 'rb') as f:
+            f.seek(int(self.offsets[index]))
+            return f.read(int(self.lengths[index]))
+    
+    def frame(self, index: int) -> np.ndarray:
+        """A decoded BGR frame"""
+        return cv2.imdecode(np.frombuffer(self.encoded(index), dtype=np.uint8), cv2.IMREAD_COLOR)
+    
+    def index_at(self, timestamp: float) -> int:
+        """Index of the first frame at or after timestamp"""
+        return int(np.searchsorted(self.timestamps, timestamp))
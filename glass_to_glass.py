@@ -0,0 +1,160 @@
+"""
+Glass-to-Glass Latency
+Measures how long after a frame is captured its overlay reaches the screen, how long
+after a real compression the count and BPM on screen update, and how late speech
+prompts and metronome clicks are emitted. Replaying a recording with known
+compression times (see camera_capture.ReplayCapture) makes the measurement repeatable.
+"""
+
+import collections
+import json
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from stage_timing import LatencyHistogram
+
+class LatencyProbe:
+    def __init__(self, event_times: Optional[Sequence[float]] = None, match_window: float = 0.5):
+        """
+        Collect end-to-end latency samples
+        
+        Args:
+            event_times: Known compression times in the replayed recording, in seconds
+                of video time (placed on the capture clock by start_events)
+            match_window: Longest gap between a true compression and the frame it was
+                detected in for the two to be matched
+        """
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, LatencyHistogram] = collections.defaultdict(LatencyHistogram)
+        self.match_window = match_window
+        self.video_events = sorted(event_times or [])
+        self.events: List[float] = []
+        self.next_event = 0
+        self.matched = 0
+        self.missed = 0
+        self.false_detections = 0
+        self.last_count = None
+        self.last_capture_time = None
+    
+    def start_events(self, origin: float):
+        """Place the known compression times on the capture clock (origin is when video time 0 was captured)"""
+        with self.lock:
+            self.events = [origin + t for t in self.video_events]
+            self.next_event = 0
+    
+    def frame_displayed(self, capture_time: float, compression_count: int):
+        """
+        Record that a frame's overlay was just shown
+        
+        Args:
+            capture_time: Monotonic capture time of the frame
+            compression_count: Compression count shown in the overlay
+        """
+        shown = time.monotonic()
+        with self.lock:
+            self.histograms['overlay'].record(shown - capture_time)
+            if self.last_count is not None:
+                for _ in range(compression_count - self.last_count):
+                    self.histograms['compression_overlay'].record(shown - capture_time)
+                    self._match_event(capture_time, shown)
+            self.last_count = compression_count
+            self.last_capture_time = capture_time
+    
+    def _match_event(self, detected: float, shown: float):
+        """Pair a detected compression with the next known one and record the time until it was shown"""
+        if not self.events:
+            return
+        # Known compressions too long before this detection were never detected
+        while self.next_event < len(self.events) and self.events[self.next_event] < detected - self.match_window:
+            self.missed += 1
+            self.next_event += 1
+        if self.next_event < len(self.events) and self.events[self.next_event] <= detected + self.match_window:
+            self.histograms['event_to_overlay'].record(shown - self.events[self.next_event])
+            self.matched += 1
+            self.next_event += 1
+        else:
+            self.false_detections += 1
+    
+    def speech_emitted(self, capture_time: float):
+        """Record that a prompt triggered by the frame captured at capture_time was handed to text-to-speech"""
+        with self.lock:
+            self.histograms['speech'].record(time.monotonic() - capture_time)
+    
+    def metronome_click(self, scheduled_time: float):
+        """Record how late a metronome click was emitted"""
+        with self.lock:
+            self.histograms['metronome'].record(max(0.0, time.monotonic() - scheduled_time))
+    
+    def summary(self) -> Dict:
+        """Latency percentiles per path and, when replaying, compression matching counts"""
+        with self.lock:
+            summary = {'latency': {name: histogram.summary() for name, histogram in self.histograms.items()}}
+            if self.events:
+                # Known compressions old enough to have been detected by the last frame count as missed
+                missed = self.missed
+                if self.last_capture_time is not None:
+                    missed += sum(1 for t in self.events[self.next_event:]
+                                  if t < self.last_capture_time - self.match_window)
+                summary['events'] = {
+                    'known': len(self.events),
+                    'matched': self.matched,
+                    'missed': missed,
+                    'false_detections': self.false_detections
+                }
+        return summary
+    
+    def format_summary(self) -> str:
+        """Console summary, one line per latency path"""
+        summary = self.summary()
+        lines = ["Glass-to-glass latency:"]
+        for name, stats in summary['latency'].items():
+            lines.append(f"  {name:<20} p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  "
+                         f"p99 {stats['p99_ms']:7.1f} ms  ({stats['count']} samples)")
+        if 'events' in summary:
+            events = summary['events']
+            lines.append(f"  Compressions: {events['matched']}/{events['known']} matched, "
+                         f"{events['missed']} missed, {events['false_detections']} false detections")
+        return "\n".join(lines)
+    
+    def dump_json(self, path: str) -> str:
+        """Write the summary to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+def load_event_times(path: str) -> List[float]:
+    """
+    Read known compression times for a recording
+    
+    The file is JSON, either a list of times in seconds or {"compressions": [...]}.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data['compressions']
+    return [float(t) for t in data]
+
+def measurement_requested(argv=None) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Latency measurement options from the command line
+    
+    --glass-to-glass turns measurement on, --replay VIDEO replays a recording instead
+    of the camera and --events FILE gives its known compression times.
+    
+    Returns:
+        Dict: 'replay' and 'events' paths (None if not given), or None if no
+            measurement was requested
+    """
+    argv = sys.argv if argv is None else argv
+    
+    def value(flag):
+        if flag in argv and argv.index(flag) + 1 < len(argv):
+            return argv[argv.index(flag) + 1]
+        return None
+    
+    options = {'replay': value('--replay'), 'events': value('--events')}
+    if '--glass-to-glass' not in argv and not options['replay']:
+        return None
+    return options
@@ -0,0 +1,83 @@
+"""
+Speculative Guidance Prefetching
+Watches live CPR metrics and prefetches the answers a rescuer is likely to ask for next
+"""
+
+import time
+from typing import Dict, Optional
+
+from feedback_rules import DEPTH_TARGET_BANDS, quantize_state
+from llm_cpr_guide import LLMCPRGuide, QUICK_QUESTIONS
+
+RATE_QUESTION, DEPTH_QUESTION, PLACEMENT_QUESTION, BREATHS_QUESTION, ALONE_QUESTION = QUICK_QUESTIONS
+
+# Questions worth having ready as soon as a walkthrough step is shown
+STEP_QUESTIONS = {
+    0: [ALONE_QUESTION],
+    1: [PLACEMENT_QUESTION],
+    2: [PLACEMENT_QUESTION],
+    3: [RATE_QUESTION, DEPTH_QUESTION],
+    4: [DEPTH_QUESTION, BREATHS_QUESTION],
+    5: [BREATHS_QUESTION],
+    6: [RATE_QUESTION]
+}
+
+class GuidancePrefetcher:
+    def __init__(self, llm_guide: LLMCPRGuide, sustain_seconds: float = 3.0, cooldown_seconds: float = 60.0):
+        """Initialize the predictor for an LLM guide's answer cache"""
+        self.llm_guide = llm_guide
+        self.sustain_seconds = sustain_seconds  # How long a problem must persist before prefetching
+        self.cooldown_seconds = cooldown_seconds  # Minimum time between prefetches of one question
+        
+        self.condition_since: Dict[str, float] = {}
+        self.last_prefetch: Dict[str, float] = {}
+        self.last_step = None
+    
+    def observe(self, bpm: float, depth: float, hand_placement: float,
+                step: Optional[int] = None, now: Optional[float] = None):
+        """
+        Update the predictor with the latest live metrics
+        
+        Cheap enough to call on every frame; requests are only started when a
+        problem has persisted for sustain_seconds or a new walkthrough step begins.
+        
+        Args:
+            bpm: Current compression rate (0 if not compressing)
+            depth: Normalized compression depth
+            hand_placement: Hand placement score (0-1)
+            step: Current walkthrough step, or None outside walkthrough mode
+            now: Current time in seconds (defaults to time.monotonic())
+        """
+        if now is None:
+            now = time.monotonic()
+        
+        # The same bands as the spoken feedback, so prefetches match what the rescuer hears
+        rate, depth_band, placement = quantize_state(bpm, depth, hand_placement)
+        compressing = rate != 'none'
+        conditions = {
+            RATE_QUESTION: compressing and rate != 'good',
+            DEPTH_QUESTION: compressing and depth_band not in DEPTH_TARGET_BANDS,
+            PLACEMENT_QUESTION: compressing and placement == 'off'
+        }
+        
+        for question, active in conditions.items():
+            if not active:
+                self.condition_since.pop(question, None)
+                continue
+            
+            since = self.condition_since.setdefault(question, now)
+            if now - since >= self.sustain_seconds:
+                self._prefetch(question, now)
+        
+        if step is not None and step != self.last_step:
+            self.last_step = step
+            for question in STEP_QUESTIONS.get(step, []):
+                self._prefetch(question, now)
+    
+    def _prefetch(self, question: str, now: float):
+        """Prefetch a question unless it was prefetched recently"""
+        if now - self.last_prefetch.get(question, float('-inf')) < self.cooldown_seconds:
+            return
+        
+        self.last_prefetch[question] = now
+        self.llm_guide.prefetch(question)
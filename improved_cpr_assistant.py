@@ -7,8 +7,6 @@ Improved CPR Assistant App
 """
 
 import cv2
-import mediapipe as mp
-import numpy as np
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
@@ -18,31 +16,27 @@ import json
 import base64
 from datetime import datetime
 from typing import Optional, Tuple, List
-import requests
 import os
+from camera_capture import CameraCapture
+from compression_timing import TimingStats
+from stage_timing import StageTimer, latency_report_requested
+from feedback_rules import FeedbackTracker, feedback_color
+from lazy_resource import LazyResource
+from frame_spool import FrameSpool
+from compression_log import FLAG_RATE_OK, CompressionLog
+from session_recording import SessionRecorder
+from landmark_stream import LEFT_SHOULDER, LEFT_WRIST, RIGHT_SHOULDER, RIGHT_WRIST
 
 class ImprovedCPRAssistant:
     def __init__(self):
-        # Initialize MediaPipe
-        self.mp_pose = mp.solutions.pose
-        self.mp_hands = mp.solutions.hands
-        self.mp_drawing = mp.solutions.drawing_utils
-        
-        # Initialize pose and hands
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # MediaPipe (imported too), its graphs and voice commands are built on first use, so
+        # the assistant can also be created cheaply for headless analysis of recorded landmarks
+        self.subsystems = {
+            'mediapipe': LazyResource(self._load_mediapipe, 'mediapipe'),
+            'pose': LazyResource(self._create_pose, 'pose'),
+            'hands': LazyResource(self._create_hands, 'hands'),
+            'voice_commands': LazyResource(self._create_voice_commands, 'voice_commands')
+        }
         
         # CPR tracking variables
         self.compression_count = 0
@@ -58,6 +52,11 @@ class ImprovedCPRAssistant:
         # Improved compression detection
         self.compression_history = []  # Track compression depth over time
         self.depth_threshold = 0.3  # Minimum depth change to register compression
+        self.min_compression_duration = 0.2  # Seconds from compression start to release
+        self.depth_return_threshold = 0.1  # Depth drop from the peak that completes a compression
+        self.compression_history_seconds = 2.0
+        self.compression_interval_window = None  # (min, max) seconds between compressions, e.g. (0.3, 1.0)
+        self.bpm_smoothing = 0.7  # Weight of the newest BPM against the previous one
         self.last_depth = 0
         self.compression_detected = False
         self.compression_start_time = 0
@@ -78,30 +77,93 @@ class ImprovedCPRAssistant:
             "Resume compressions"
         ]
         
-        # Session data for cloud upload
+        # Session data for cloud upload; compressions are compact numpy rows (also spilled
+        # to disk in small batches), frames are spooled to disk as JPEGs
         self.session_data = {
             'start_time': datetime.now().isoformat(),
-            'compressions': [],
+            'compressions': CompressionLog(),
             'bpm_history': [],
             'hand_placement_history': [],
             'depth_history': [],
-            'frames': []  # Will store blurred frames
+            'frames': FrameSpool()  # Will store blurred frames
         }
         
         self.flash_timer = 0
         self.upload_in_progress = False
-        
+        self.recorder = None  # SessionRecorder while recording landmarks (see start_recording)
+        
+        # Compressions are timed by frame capture time (monotonic); session records
+        # are converted back to wall-clock time for upload
+        self.timing_stats = TimingStats()
+        self.wall_clock_offset = time.time() - time.monotonic()
+        self.stage_timer = StageTimer()  # Per-stage frame latency, 'L' toggles the HUD
+        self.latency_report_path = None  # Only written when asked for (--latency-report), see the launchers
+        self.startup_profiler = None  # Set by the launcher for --profile-startup
+        
+        # Feedback state: rules are only re-evaluated when the quantized metrics change
+        self.feedback_tracker = FeedbackTracker()
+    
+    def _load_mediapipe(self):
+        """Import MediaPipe, which takes seconds on a cold start"""
+        import mediapipe as mp
+        return mp.solutions
+    
+    def _create_pose(self):
+        """Build the MediaPipe pose graph"""
+        return self.mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=1,
+            enable_segmentation=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+    
+    def _create_hands(self):
+        """Build the MediaPipe hands graph"""
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+    
+    def _create_voice_commands(self):
+        """Hands-free commands ("next", "skip", "upload", "quit") when speech support is installed"""
+        try:
+            from voice_commands import VoiceCommandChannel
+        except ImportError:
+            return None  # Voice commands need speech_recognition and an offline spotter
+        return VoiceCommandChannel()
+    
+    @property
+    def mp_pose(self):
+        return self.subsystems['mediapipe'].get().pose
+    
+    @property
+    def mp_hands(self):
+        return self.subsystems['mediapipe'].get().hands
+    
+    @property
+    def mp_drawing(self):
+        return self.subsystems['mediapipe'].get().drawing_utils
+    
+    @property
+    def pose(self):
+        return self.subsystems['pose'].get()
+    
+    @property
+    def hands(self):
+        return self.subsystems['hands'].get()
+    
+    @property
+    def voice_commands(self):
+        return self.subsystems['voice_commands'].get()
+    
     def initialize_camera(self):
-        """Initialize camera capture"""
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
-            raise Exception("Could not open camera")
-        
-        # Set camera properties
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.camera.set(cv2.CAP_PROP_FPS, 30)
-        
+        """Start opening and warming up the camera in the background"""
+        self.camera = CameraCapture(device=0, width=640, height=480, fps=30)
+        self.camera.open_async()
+    
     def calculate_improved_bpm(self, compression_times):
         """Calculate BPM using last 4 beats for better accuracy"""
         if len(compression_times) < 2:
@@ -128,8 +190,8 @@ class ImprovedCPRAssistant:
         
         # Smooth the BPM calculation to reduce noise
         if hasattr(self, 'previous_bpm'):
-            # Weighted average: 70% new, 30% previous
-            bpm = 0.7 * bpm + 0.3 * self.previous_bpm
+            # Weighted average: 70% new, 30% previous by default
+            bpm = self.bpm_smoothing * bpm + (1 - self.bpm_smoothing) * self.previous_bpm
         
         self.previous_bpm = bpm
         return min(max(bpm, 0), 200)  # Clamp between 0-200 BPM
@@ -148,8 +210,8 @@ class ImprovedCPRAssistant:
             'depth': current_depth
         })
         
-        # Keep only recent history (last 2 seconds)
-        cutoff_time = current_time - 2.0
+        # Keep only recent history (last 2 seconds by default)
+        cutoff_time = current_time - self.compression_history_seconds
         self.compression_history = [h for h in self.compression_history if h['time'] > cutoff_time]
         
         if len(self.compression_history) < 3:
@@ -168,8 +230,8 @@ class ImprovedCPRAssistant:
                 return False
             else:
                 # Check if compression is complete (depth returning to normal)
-                if current_time - self.compression_start_time > 0.2:  # Minimum compression duration
-                    if current_depth < max(recent_depths) - 0.1:  # Depth decreasing
+                if current_time - self.compression_start_time > self.min_compression_duration:
+                    if current_depth < max(recent_depths) - self.depth_return_threshold:  # Depth decreasing
                         self.compression_detected = False
                         return True
         else:
@@ -182,10 +244,10 @@ class ImprovedCPRAssistant:
         if not landmarks:
             return 0
         
-        left_wrist = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_WRIST]
-        right_wrist = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_WRIST]
-        left_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-        right_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
+        left_wrist = landmarks.landmark[LEFT_WRIST]
+        right_wrist = landmarks.landmark[RIGHT_WRIST]
+        left_shoulder = landmarks.landmark[LEFT_SHOULDER]
+        right_shoulder = landmarks.landmark[RIGHT_SHOULDER]
         
         chest_center_x = (left_shoulder.x + right_shoulder.x) / 2
         chest_center_y = (left_shoulder.y + right_shoulder.y) / 2
@@ -203,8 +265,8 @@ class ImprovedCPRAssistant:
         if not landmarks:
             return 0
         
-        left_wrist = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_WRIST]
-        right_wrist = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_WRIST]
+        left_wrist = landmarks.landmark[LEFT_WRIST]
+        right_wrist = landmarks.landmark[RIGHT_WRIST]
         
         hand_y = (left_wrist.y + right_wrist.y) / 2
         depth = 1 - hand_y
@@ -233,49 +295,30 @@ class ImprovedCPRAssistant:
     
     def get_feedback_color(self, bpm):
         """Get color based on BPM feedback"""
-        if 100 <= bpm <= 120:
-            return (0, 255, 0)  # Green
-        elif bpm < 100:
-            return (0, 0, 255)  # Red
-        else:
-            return (0, 165, 255)  # Orange
+        return feedback_color(bpm)
     
-    def process_frame(self, frame):
-        """Process a single frame for CPR feedback"""
+    def process_frame(self, frame, capture_time=None):
+        """Process a single frame for CPR feedback (capture_time is the frame's monotonic capture time)"""
+        if capture_time is None:
+            capture_time = time.monotonic()
+        
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.stage_timer.lap('convert')
         
         pose_results = self.pose.process(rgb_frame)
+        self.stage_timer.lap('pose')
         hands_results = self.hands.process(rgb_frame)
+        self.stage_timer.lap('hands')
         
         # Draw pose landmarks
         if pose_results.pose_landmarks:
             self.mp_drawing.draw_landmarks(
                 frame, pose_results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS
             )
+            self.stage_timer.lap('draw')
             
-            self.hand_placement_score = self.detect_hand_placement(pose_results.pose_landmarks)
-            self.compression_depth = self.detect_compression_depth(pose_results.pose_landmarks)
-            
-            # Improved compression detection
-            current_time = time.time()
-            if self.detect_improved_compression(pose_results.pose_landmarks, current_time):
-                self.compression_times.append(current_time)
-                self.compression_count += 1
-                
-                # Keep only recent compression times (last 10)
-                if len(self.compression_times) > 10:
-                    self.compression_times.pop(0)
-                
-                # Calculate improved BPM
-                self.current_bpm = self.calculate_improved_bpm(self.compression_times)
-                
-                # Record session data
-                self.session_data['compressions'].append({
-                    'time': current_time,
-                    'bpm': self.current_bpm,
-                    'depth': self.compression_depth,
-                    'hand_placement': self.hand_placement_score
-                })
+            self.update_from_landmarks(pose_results.pose_landmarks, capture_time)
+            self.stage_timer.lap('detect')
         
         # Draw hand landmarks
         if hands_results.multi_hand_landmarks:
@@ -283,15 +326,94 @@ class ImprovedCPRAssistant:
                 self.mp_drawing.draw_landmarks(
                     frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
                 )
+            self.stage_timer.lap('draw')
+        
+        if self.recorder:
+            self.recorder.add_frame(capture_time, pose_results.pose_landmarks, hands_results.multi_hand_landmarks)
+            self.stage_timer.lap('record')
         
         return frame, pose_results, hands_results
     
-    def add_visual_overlay(self, frame):
+    def update_from_landmarks(self, landmarks, capture_time):
+        """
+        Update placement, depth, compression count and rate from one frame's pose landmarks
+        
+        This is everything process_frame does after pose estimation, so recorded or
+        synthetic landmarks can be run through the same detection without a camera.
+        
+        Args:
+            landmarks: Pose landmarks (anything exposing .landmark[i].x/.y), or None
+                if no pose was found (the last placement and depth are kept)
+            capture_time: Capture time of the frame in seconds
+        
+        Returns:
+            bool: Whether a compression was completed in this frame
+        """
+        if not landmarks:
+            return False
+        
+        self.hand_placement_score = self.detect_hand_placement(landmarks)
+        self.compression_depth = self.detect_compression_depth(landmarks)
+        return self.update_compression_timing(landmarks, capture_time)
+    
+    def update_compression_timing(self, landmarks, capture_time):
+        """Detect a compression in a frame and update the rate from capture timestamps"""
+        if not self.detect_improved_compression(landmarks, capture_time):
+            return False
+        
+        # Optionally ignore detections implausibly close to or far from the previous one
+        previous_time, self.last_compression_time = self.last_compression_time, capture_time
+        if self.compression_interval_window and previous_time:
+            min_interval, max_interval = self.compression_interval_window
+            if not min_interval < capture_time - previous_time < max_interval:
+                return False
+        
+        self.compression_times.append(capture_time)
+        self.compression_count += 1
+        self.timing_stats.observe_compression(capture_time)
+        
+        # Keep only recent compression times (last 10)
+        if len(self.compression_times) > 10:
+            self.compression_times.pop(0)
+        
+        # Calculate improved BPM
+        self.current_bpm = self.calculate_improved_bpm(self.compression_times)
+        
+        # Record session data
+        self.session_data['compressions'].append(capture_time + self.wall_clock_offset, self.current_bpm,
+                                                 self.compression_depth, self.hand_placement_score)
+        if self.recorder:
+            self.recorder.add_event(capture_time, self.current_bpm, self.compression_depth,
+                                    self.hand_placement_score)
+        return True
+    
+    def start_recording(self, path, with_hands=False):
+        """
+        Record every frame's landmarks and every compression to a session recording
+        
+        Can be called before the camera has opened; the negotiated frame rate is
+        written to the recording once it has.
+        
+        Args:
+            path: Recording file (see session_recording.SessionRecording to read it)
+            with_hands: Also record hand landmarks
+        """
+        fps = self.camera.fps if self.camera else 30.0
+        self.recorder = SessionRecorder(path, fps=fps, clock_offset=self.wall_clock_offset, with_hands=with_hands)
+    
+    def get_jitter_stats(self):
+        """Frame, processing and compression timing statistics"""
+        return self.timing_stats.summary()
+    
+    def add_visual_overlay(self, frame, capture_time=None):
         """Add visual CPR feedback overlay"""
         height, width = frame.shape[:2]
         
+        feedback = self.feedback_tracker.update(self.current_bpm, self.compression_depth,
+                                                self.hand_placement_score)
+        
         # Current BPM with color coding
-        bpm_color = self.get_feedback_color(self.current_bpm)
+        bpm_color = feedback.bpm_color
         cv2.rectangle(frame, (10, 10), (250, 80), (0, 0, 0), -1)
         cv2.putText(frame, f"BPM: {int(self.current_bpm)}", (20, 40), 
                    cv2.FONT_HERSHEY_SIMPLEX, 1, bpm_color, 2)
@@ -302,17 +424,24 @@ class ImprovedCPRAssistant:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # Hand placement score
-        placement_color = (0, 255, 0) if self.hand_placement_score > 0.7 else (0, 0, 255)
+        placement_color = feedback.placement_color
         cv2.rectangle(frame, (10, 140), (250, 180), (0, 0, 0), -1)
         cv2.putText(frame, f"Hands: {int(self.hand_placement_score*100)}%", (20, 170), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, placement_color, 2)
         
         # Compression depth
-        depth_color = (0, 255, 0) if self.compression_depth > 0.7 else (0, 0, 255)
+        depth_color = feedback.depth_color
         cv2.rectangle(frame, (10, 190), (250, 230), (0, 0, 0), -1)
         cv2.putText(frame, f"Depth: {int(self.compression_depth*100)}%", (20, 220), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, depth_color, 2)
         
+        # Session averages (running aggregates, so this costs the same at any session length)
+        aggregates = self.session_data['compressions'].aggregates
+        if aggregates.count:
+            cv2.putText(frame, f"Session: avg {int(aggregates.bpm.mean)} BPM, "
+                               f"{int(aggregates.in_range(FLAG_RATE_OK) * 100)}% on rate", (20, 252),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        
         # Emergency info
         cv2.rectangle(frame, (width-200, 10), (width-10, 50), (0, 0, 255), -1)
         cv2.putText(frame, "CALL 911!", (width-190, 35), 
@@ -332,20 +461,14 @@ class ImprovedCPRAssistant:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
         
         # Visual feedback messages
-        if self.current_bpm > 0:
-            if 100 <= self.current_bpm <= 120:
-                cv2.putText(frame, "Good rhythm!", (20, 280), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-            elif self.current_bpm < 100:
-                cv2.putText(frame, "Too slow - speed up!", (20, 280), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-            else:
-                cv2.putText(frame, "Too fast - slow down!", (20, 280), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+        if feedback.rate_status:
+            status_text, status_color = feedback.rate_status
+            cv2.putText(frame, status_text, (20, 280), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, status_color, 2)
         
         # Visual metronome (flashing)
         if self.metronome_active and self.current_bpm > 0:
-            current_time = time.time()
+            current_time = capture_time if capture_time is not None else time.monotonic()
             interval = 60.0 / self.target_bpm
             if (current_time - self.flash_timer) % interval < 0.1:
                 cv2.rectangle(frame, (0, 0), (width, height), (0, 255, 0), 5)
@@ -369,8 +492,8 @@ class ImprovedCPRAssistant:
                     'start_time': self.session_data['start_time'],
                     'end_time': datetime.now().isoformat(),
                     'total_compressions': self.compression_count,
-                    'avg_bpm': np.mean([c['bpm'] for c in self.session_data['compressions']]) if self.session_data['compressions'] else 0,
-                    'compressions': self.session_data['compressions'],
+                    'avg_bpm': self.session_data['compressions'].summary()['avg_bpm'],
+                    'compressions': self.session_data['compressions'].to_list(),
                     'device_info': {
                         'platform': 'CPR Assistant App',
                         'version': '1.0'
@@ -398,21 +521,32 @@ class ImprovedCPRAssistant:
         upload_thread.daemon = True
         upload_thread.start()
     
+    def read_key(self):
+        """Get the next key press, or the key for a spoken command"""
+        key = cv2.waitKey(1) & 0xFF
+        if key == 0xFF and self.voice_commands:
+            key = self.voice_commands.poll_key()
+        return key
+    
     def run_walkthrough_mode(self):
         """Run step-by-step CPR walkthrough"""
         self.mode = "walkthrough"
         self.current_step = 0
         
         while self.running and self.current_step < len(self.walkthrough_steps):
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
             
             # Blur faces for privacy
-            frame = self.blur_face(frame)
+            frame = self.blur_face(captured.image)
+            self.stage_timer.lap('blur_face')
             
-            processed_frame, pose_results, hands_results = self.process_frame(frame)
-            frame_with_overlay = self.add_visual_overlay(processed_frame)
+            processed_frame, pose_results, hands_results = self.process_frame(frame, captured.timestamp)
+            frame_with_overlay = self.add_visual_overlay(processed_frame, captured.timestamp)
+            self.timing_stats.observe_frame(captured.timestamp)
             
             # Show current step
             height, width = frame_with_overlay.shape[:2]
@@ -425,11 +559,18 @@ class ImprovedCPRAssistant:
             cv2.putText(frame_with_overlay, "Skip to Compressions", (width-190, height-45), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
             
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
+            
             cv2.imshow('Improved CPR Assistant - Walkthrough Mode', frame_with_overlay)
             
-            key = cv2.waitKey(1) & 0xFF
+            key = self.read_key()
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
             elif key == ord('n'):
                 self.current_step += 1
                 if self.current_step >= len(self.walkthrough_steps):
@@ -444,24 +585,35 @@ class ImprovedCPRAssistant:
         """Run real-time feedback mode"""
         self.mode = "feedback"
         self.metronome_active = True
-        self.flash_timer = time.time()
+        self.flash_timer = time.monotonic()
         
         while self.running:
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
             
             # Blur faces for privacy
-            frame = self.blur_face(frame)
+            frame = self.blur_face(captured.image)
+            self.stage_timer.lap('blur_face')
             
-            processed_frame, pose_results, hands_results = self.process_frame(frame)
-            frame_with_overlay = self.add_visual_overlay(processed_frame)
+            processed_frame, pose_results, hands_results = self.process_frame(frame, captured.timestamp)
+            frame_with_overlay = self.add_visual_overlay(processed_frame, captured.timestamp)
+            self.timing_stats.observe_frame(captured.timestamp)
+            
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
             
             cv2.imshow('Improved CPR Assistant - Feedback Mode', frame_with_overlay)
             
-            key = cv2.waitKey(1) & 0xFF
+            key = self.read_key()
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
             elif key == ord('u'):  # Upload session
                 self.upload_session_to_cloud()
     
@@ -506,11 +658,17 @@ class ImprovedCPRAssistant:
         feedback_btn.pack(pady=10)
         
         instructions = tk.Label(root, 
-                               text="Controls:\n• 'Q' to quit\n• 'N' for next step (Walkthrough)\n• 'S' to skip to compressions\n• 'U' to upload session", 
+                               text="Controls:\n• 'Q' to quit\n• 'N' for next step (Walkthrough)\n• 'S' to skip to compressions\n• 'U' to upload session\n• 'L' for latency HUD", 
                                font=('Arial', 10), 
                                fg='white', bg='#2c3e50')
         instructions.pack(pady=10)
         
+        # Build the pose and hand models while the user picks a mode
+        for resource in self.subsystems.values():
+            resource.prewarm()
+        
+        if self.startup_profiler:
+            self.startup_profiler.finish_when_shown(root)
         root.mainloop()
     
     def start_mode(self, mode, root):
@@ -518,6 +676,18 @@ class ImprovedCPRAssistant:
         self.mode = mode
         root.destroy()
         
+        # The camera has been warming up while the mode selection window was open
+        try:
+            self.camera.wait_until_open()
+        except Exception as e:
+            print(f"Error: {e}")
+            messagebox.showerror("Error", f"Failed to initialize: {e}")
+            return
+        if self.recorder:
+            self.recorder.set_fps(self.camera.fps)
+        if self.voice_commands:
+            self.voice_commands.start()
+        
         if mode == "walkthrough":
             self.run_walkthrough_mode()
         else:
@@ -525,25 +695,51 @@ class ImprovedCPRAssistant:
     
     def run(self):
         """Main application loop"""
+        clean_exit = False
         try:
             self.initialize_camera()
             self.running = True
             self.show_mode_selection()
+            clean_exit = True
             
         except Exception as e:
             print(f"Error: {e}")
             messagebox.showerror("Error", f"Failed to initialize: {e}")
         finally:
-            self.cleanup()
+            self.cleanup(keep_spill=not clean_exit)
     
-    def cleanup(self):
-        """Cleanup resources"""
+    def cleanup(self, keep_spill: bool = False):
+        """
+        Cleanup resources
+        
+        Args:
+            keep_spill: Keep the compression spill file (e.g. after an error), so the
+                session can be recovered with session_store.read_records()
+        """
         self.running = False
         
+        if self.timing_stats.frame_intervals:
+            print(self.timing_stats.format_summary())
+        report = self.stage_timer.dump_json(self.latency_report_path)
+        if report:
+            print(f"Frame stage latency written to {report}")
+        
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
+        
+        compressions = self.session_data['compressions']
+        spill_path = compressions.store.path if compressions.store else None
+        compressions.close(keep=keep_spill)
+        if keep_spill and spill_path:
+            print(f"Compressions kept in {spill_path}")
+        self.session_data['frames'].close()
+        if self.recorder:
+            self.recorder.close()
+            print(f"Session recorded to {self.recorder.path} ({self.recorder.frame_count} frames, "
+                  f"{self.recorder.event_count} compressions)")
 
 if __name__ == "__main__":
     app = ImprovedCPRAssistant()
+    app.latency_report_path = latency_report_requested()
     app.run()
@@ -0,0 +1,134 @@
+"""
+Landmark Cache
+Persists landmarks extracted from recorded videos, keyed by the video's content hash,
+frame index and pose model configuration, so detection and scoring can be re-run
+without running MediaPipe again.
+"""
+
+import hashlib
+import json
+import os
+from importlib import metadata
+from typing import Optional
+
+import numpy as np
+
+from landmark_stream import LandmarkStream
+
+CACHE_VERSION = 1
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Content hash of a file, so renamed or copied recordings still hit the cache"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def model_config(model_complexity: int = 1, with_hands: bool = False) -> str:
+    """Identify the models that produced a set of landmarks"""
+    try:
+        mediapipe_version = metadata.version('mediapipe')
+    except metadata.PackageNotFoundError:
+        mediapipe_version = 'unknown'
+    hands = '-hands' if with_hands else ''
+    return f"mp{mediapipe_version}-pose{model_complexity}{hands}"
+
+class LandmarkCache:
+    def __init__(self, cache_dir: str = '.landmark_cache'):
+        """Initialize a cache in a directory (created on first save)"""
+        self.cache_dir = cache_dir
+        self.hashes = {}  # (path, size, mtime) -> content hash
+    
+    def _video_hash(self, video_path: str) -> str:
+        """Content hash of a video, remembered while the file is unchanged"""
+        stat = os.stat(video_path)
+        key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime)
+        if key not in self.hashes:
+            self.hashes[key] = file_hash(video_path)
+        return self.hashes[key]
+    
+    def path_for(self, video_path: str, model_complexity: int = 1, with_hands: bool = False) -> str:
+        """Cache file for a video and model configuration"""
+        config = model_config(model_complexity, with_hands)
+        return os.path.join(self.cache_dir, f"{self._video_hash(video_path)}_{config}.npz")
+    
+    def load(self, video_path: str, model_complexity: int = 1, with_hands: bool = False,
+             start_frame: int = 0, end_frame: Optional[int] = None) -> Optional[LandmarkStream]:
+        """
+        Load cached landmarks for a video
+        
+        Landmarks cached with hands also satisfy requests without them.
+        
+        Args:
+            video_path: Video the landmarks were extracted from
+            model_complexity: MediaPipe pose model complexity used
+            with_hands: Whether hand landmarks are needed
+            start_frame: First frame index to return
+            end_frame: Frame index to stop before (end of video if None)
+        
+        Returns:
+            LandmarkStream: The cached frames in range, or None on a cache miss
+        """
+        candidates = [True] if with_hands else [False, True]
+        for hands in candidates:
+            path = self.path_for(video_path, model_complexity, hands)
+            if os.path.exists(path):
+                try:
+                    return self._read(path, start_frame, end_frame)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Ignoring unreadable landmark cache {path}: {e}")
+        return None
+    
+    def _read(self, path: str, start_frame: int, end_frame: Optional[int]) -> LandmarkStream:
+        """Read a cache file and select a frame range"""
+        with np.load(path) as data:
+            info = json.loads(str(data['info']))
+            if info.get('version') != CACHE_VERSION:
+                raise ValueError(f"cache version {info.get('version')}")
+            
+            frame_index = data['frame_index']
+            keep = frame_index >= start_frame
+            if end_frame is not None:
+                keep &= frame_index < end_frame
+            
+            # Landmarks are stored one column per coordinate, rebuild the (N, 33, 4) layout
+            pose = np.stack([data['pose_x'][keep], data['pose_y'][keep],
+                             data['pose_z'][keep], data['pose_visibility'][keep]], axis=-1)
+            hands = data['hands'][keep] if 'hands' in data.files else None
+            first = int(frame_index[keep][0]) if keep.any() else start_frame
+            return LandmarkStream(data['timestamps'][keep], pose, hands, info['fps'], first)
+    
+    def save(self, video_path: str, stream: LandmarkStream, model_complexity: int = 1,
+             with_hands: bool = False) -> str:
+        """
+        Cache the landmarks extracted from a video
+        
+        Returns:
+            str: Path of the cache file
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(video_path, model_complexity, with_hands)
+        info = {
+            'version': CACHE_VERSION,
+            'fps': stream.fps,
+            'source': os.path.basename(video_path),
+            'model_config': model_config(model_complexity, with_hands)
+        }
+        columns = {
+            'info': np.array(json.dumps(info)),
+            'frame_index': np.arange(stream.first_frame, stream.first_frame + len(stream), dtype=np.int32),
+            'timestamps': stream.timestamps,
+            'pose_x': stream.pose[:, :, 0],
+            'pose_y': stream.pose[:, :, 1],
+            'pose_z': stream.pose[:, :, 2],
+            'pose_visibility': stream.pose[:, :, 3]
+        }
+        if with_hands:
+            columns['hands'] = stream.hands
+        
+        # Write to a temporary file first so an interrupted run never leaves a truncated cache
+        temp_path = path + '.tmp.npz'
+        np.savez_compressed(temp_path, **columns)
+        os.replace(temp_path, path)
+        return path
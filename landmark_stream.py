@@ -0,0 +1,174 @@
+"""
+Landmark Streams
+Per-frame pose and hand landmarks extracted from a recorded video, stored as numpy
+arrays so detection can be run (and re-run) without MediaPipe or a display.
+"""
+
+from typing import List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+POSE_LANDMARK_COUNT = 33
+HAND_LANDMARK_COUNT = 21
+MAX_HANDS = 2
+
+# MediaPipe pose landmark indices the assistants read
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+
+class Landmark(NamedTuple):
+    """One landmark, with the attributes the assistants read from MediaPipe results"""
+    x: float
+    y: float
+    z: float
+    visibility: float
+
+class LandmarkList:
+    """Stand-in for a MediaPipe NormalizedLandmarkList (exposes .landmark[i].x/.y/.z)"""
+    
+    def __init__(self, points: np.ndarray):
+        self.landmark: List[Landmark] = [Landmark(*map(float, point)) for point in points]
+
+class LandmarkStream:
+    def __init__(self, timestamps: np.ndarray, pose: np.ndarray, hands: Optional[np.ndarray] = None,
+                 fps: float = 30.0, first_frame: int = 0):
+        """
+        Landmarks for a run of consecutive video frames
+        
+        Args:
+            timestamps: Video time of each frame in seconds, shape (N,)
+            pose: Pose landmarks (x, y, z, visibility), shape (N, 33, 4), NaN where no pose was found
+            hands: Hand landmarks (x, y, z), shape (N, 2, 21, 3), NaN where no hand was found
+            fps: Frame rate of the source video
+            first_frame: Index of the first frame in the source video
+        """
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.pose = np.asarray(pose, dtype=np.float32)
+        if hands is None:
+            hands = np.full((len(self.timestamps), MAX_HANDS, HAND_LANDMARK_COUNT, 3), np.nan, dtype=np.float32)
+        self.hands = np.asarray(hands, dtype=np.float32)
+        self.fps = fps
+        self.first_frame = first_frame
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def has_pose(self, index: int) -> bool:
+        """Whether a pose was found in a frame"""
+        return not np.isnan(self.pose[index, 0, 0])
+    
+    def pose_landmarks(self, index: int) -> Optional[LandmarkList]:
+        """Pose landmarks for a frame in the MediaPipe shape, or None if no pose was found"""
+        if not self.has_pose(index):
+            return None
+        return LandmarkList(self.pose[index])
+    
+    def frames(self):
+        """Iterate (timestamp, pose landmarks or None) over all frames"""
+        for index in range(len(self)):
+            yield float(self.timestamps[index]), self.pose_landmarks(index)
+    
+    def slice(self, start: int, end: int) -> 'LandmarkStream':
+        """Frames [start, end) of this stream"""
+        return LandmarkStream(self.timestamps[start:end], self.pose[start:end], self.hands[start:end],
+                              self.fps, self.first_frame + start)
+    
+    @classmethod
+    def concatenate(cls, streams: List['LandmarkStream']) -> 'LandmarkStream':
+        """Join consecutive streams into one"""
+        return cls(np.concatenate([s.timestamps for s in streams]),
+                   np.concatenate([s.pose for s in streams]),
+                   np.concatenate([s.hands for s in streams]),
+                   streams[0].fps, streams[0].first_frame)
+
+def _pose_array(pose_landmarks) -> np.ndarray:
+    """Convert MediaPipe pose landmarks to an array, NaN if missing"""
+    if pose_landmarks is None:
+        return np.full((POSE_LANDMARK_COUNT, 4), np.nan, dtype=np.float32)
+    return np.array([(p.x, p.y, p.z, p.visibility) for p in pose_landmarks.landmark], dtype=np.float32)
+
+def _hands_array(multi_hand_landmarks) -> np.ndarray:
+    """Convert MediaPipe hand landmarks to an array, NaN for missing hands"""
+    hands = np.full((MAX_HANDS, HAND_LANDMARK_COUNT, 3), np.nan, dtype=np.float32)
+    for i, hand in enumerate((multi_hand_landmarks or [])[:MAX_HANDS]):
+        hands[i] = [(p.x, p.y, p.z) for p in hand.landmark]
+    return hands
+
+def video_info(video_path: str) -> dict:
+    """Frame rate and frame count of a video file"""
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video {video_path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return {'fps': fps, 'frame_count': int(capture.get(cv2.CAP_PROP_FRAME_COUNT))}
+    finally:
+        capture.release()
+
+def extract_landmarks(video_path: str, start_frame: int = 0, end_frame: Optional[int] = None,
+                      model_complexity: int = 1, with_hands: bool = False) -> LandmarkStream:
+    """
+    Run MediaPipe over a video file as fast as it decodes (not in real time)
+    
+    Args:
+        video_path: Video file to analyze
+        start_frame: First frame to process
+        end_frame: Frame to stop before (end of video if None)
+        model_complexity: MediaPipe pose model complexity (0, 1 or 2)
+        with_hands: Also run the hand model (not needed for the compression metrics)
+    
+    Returns:
+        LandmarkStream: Landmarks and video timestamps for every processed frame
+    """
+    import mediapipe as mp
+    
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video {video_path}")
+    
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    if start_frame:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) != start_frame:
+            # Seeking is not frame-accurate for every codec, skip forward from the start instead
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            for _ in range(start_frame):
+                if not capture.grab():
+                    break
+    
+    pose = mp.solutions.pose.Pose(static_image_mode=False, model_complexity=model_complexity,
+                                  enable_segmentation=False, min_detection_confidence=0.5,
+                                  min_tracking_confidence=0.5)
+    hands = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=MAX_HANDS,
+                                     min_detection_confidence=0.5,
+                                     min_tracking_confidence=0.5) if with_hands else None
+    
+    timestamps, pose_frames, hand_frames = [], [], []
+    index = start_frame
+    try:
+        while end_frame is None or index < end_frame:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            pose_results = pose.process(rgb_frame)
+            pose_frames.append(_pose_array(pose_results.pose_landmarks))
+            if hands:
+                hand_frames.append(_hands_array(hands.process(rgb_frame).multi_hand_landmarks))
+            
+            # Video time rather than wall clock, so results do not depend on processing speed
+            timestamps.append(index / fps)
+            index += 1
+    finally:
+        capture.release()
+        pose.close()
+        if hands:
+            hands.close()
+    
+    pose_array = np.array(pose_frames, dtype=np.float32).reshape(-1, POSE_LANDMARK_COUNT, 4)
+    hands_array = np.array(hand_frames, dtype=np.float32).reshape(-1, MAX_HANDS, HAND_LANDMARK_COUNT, 3) if hands else None
+    return LandmarkStream(np.array(timestamps), pose_array, hands_array, fps, start_frame)
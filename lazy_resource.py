@@ -0,0 +1,53 @@
+"""
+Lazy Resources
+Heavy subsystems (MediaPipe graphs, audio, speech, LLM clients) created on first use,
+optionally pre-warmed on a background thread while the user is still choosing a mode.
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+class LazyResource:
+    def __init__(self, factory: Callable[[], Any], name: Optional[str] = None):
+        """
+        Wrap a factory so the resource is only built when first needed
+        
+        Args:
+            factory: Builds the resource
+            name: Used in log messages
+        """
+        self.factory = factory
+        self.name = name or getattr(factory, '__name__', 'resource')
+        self.lock = threading.Lock()
+        self.value = None
+        self.created = False
+        self.error = None
+    
+    def get(self) -> Any:
+        """Get the resource, building it now if nobody has yet"""
+        if self.created:
+            return self.value
+        
+        with self.lock:
+            if not self.created:
+                try:
+                    self.value = self.factory()
+                except Exception as e:
+                    self.error = e
+                    raise
+                self.error = None
+                self.created = True
+        return self.value
+    
+    def prewarm(self):
+        """Build the resource on a background thread so first use does not stall"""
+        def _prewarm():
+            try:
+                self.get()
+            except Exception as e:
+                # Leave it to the first real use to report the failure
+                print(f"Background initialization of {self.name} failed: {e}")
+        
+        prewarm_thread = threading.Thread(target=_prewarm, name=f"prewarm-{self.name}")
+        prewarm_thread.daemon = True
+        prewarm_thread.start()
@@ -3,17 +3,153 @@ LLM-Powered CPR Guidance System
 Integrates with OpenAI API for intelligent CPR Q&A
 """
 
-import openai
 import json
 import os
-from typing import Dict, List, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from feedback_rules import evaluate_feedback
+
+class TokenBucket:
+    """Token bucket rate limiter for LLM API calls"""
+    
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        """Add the tokens earned since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate_per_second)
+        self.last_refill = now
+    
+    def acquire(self, timeout: float = 0) -> bool:
+        """Take one token, waiting up to timeout seconds for one to become available"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate_per_second
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(wait, remaining))
+
+# One rate limiter per API key, shared by every LLMCPRGuide using that key
+_rate_limiters: Dict[str, TokenBucket] = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api_key: str, requests_per_minute: float, burst: int) -> TokenBucket:
+    """Get the shared rate limiter for an API key"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(api_key)
+        if limiter is None:
+            limiter = TokenBucket(requests_per_minute / 60.0, burst)
+            _rate_limiters[api_key] = limiter
+        return limiter
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share one request"""
+    question = re.sub(r'\s+', ' ', question.lower()).strip()
+    return question.rstrip('?!. ')
+
+# A sentence ends at . ! or ? followed by whitespace (so "2.5" or "e.g.x" are not split)
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Abbreviations whose period does not end a sentence
+ABBREVIATIONS = {'dr.', 'mr.', 'mrs.', 'ms.', 'prof.', 'st.', 'e.g.', 'i.e.', 'vs.', 'approx.', 'cf.'}
+
+def _ends_with_abbreviation(text: str) -> bool:
+    """Whether text ends with an abbreviation rather than a full stop"""
+    words = text.split()
+    return bool(words) and words[-1].lower() in ABBREVIATIONS
+
+class SentenceStream:
+    """Splits streamed LLM text into complete sentences as they arrive"""
+    
+    def __init__(self):
+        self.buffer = ""
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return any sentences it completed"""
+        self.buffer += text
+        parts = SENTENCE_END.split(self.buffer)
+        sentences = []
+        sentence = ""
+        for part in parts[:-1]:
+            sentence = f"{sentence} {part}" if sentence else part
+            if not _ends_with_abbreviation(sentence):
+                sentences.append(sentence.strip())
+                sentence = ""
+        self.buffer = f"{sentence} {parts[-1]}" if sentence else parts[-1]
+        return [sentence for sentence in sentences if sentence]
+    
+    def flush(self) -> List[str]:
+        """Return whatever text remains at the end of the stream"""
+        remaining = self.buffer.strip()
+        self.buffer = ""
+        return [remaining] if remaining else []
+
+def split_sentences(text: str) -> List[str]:
+    """Split a complete answer into sentences"""
+    stream = SentenceStream()
+    return stream.feed(text) + stream.flush()
+
+# Questions offered as one-click buttons in the Q&A window, also used as prefetch targets
+QUICK_QUESTIONS = [
+    "What's the correct compression rate?",
+    "How deep should I compress?",
+    "Where do I place my hands?",
+    "When do I give rescue breaths?",
+    "What if I'm alone?"
+]
 
 class LLMCPRGuide:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, max_concurrent_requests: int = 2,
+                 requests_per_minute: float = 30, burst: int = 5, throttle_timeout: float = 5.0,
+                 answer_cache_size: int = 64):
         """Initialize LLM CPR Guide with OpenAI API"""
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if self.api_key:
-            openai.api_key = self.api_key
+            # openai is only imported when there is a key to use it with
+            try:
+                import openai
+                openai.api_key = self.api_key
+            except ImportError:
+                print("openai is not installed, using fallback responses")
+                self.api_key = None
+        
+        # Request scheduling: identical questions in flight share one API call,
+        # calls per API key are rate limited and concurrency is bounded by the pool
+        self.throttle_timeout = throttle_timeout
+        self.rate_limiter = get_rate_limiter(self.api_key, requests_per_minute, burst) if self.api_key else None
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_requests,
+                                           thread_name_prefix='llm-request')
+        self.inflight: Dict[str, Future] = {}
+        self.inflight_lock = threading.Lock()
+        self.metrics = {
+            'requests': 0,
+            'api_calls': 0,
+            'coalesced': 0,
+            'throttled': 0,
+            'errors': 0,
+            'cache_hits': 0,
+            'prefetched': 0
+        }
+        
+        # Answers from the LLM keyed by normalized question (least recently used evicted first)
+        self.answer_cache = OrderedDict()
+        self.answer_cache_size = answer_cache_size
         
         # CPR-specific system prompt
         self.system_prompt = """
@@ -44,10 +180,130 @@ class LLMCPRGuide:
     
     def ask_cpr_question(self, question: str) -> str:
         """Ask a CPR-related question to the LLM"""
+        return self.ask_cpr_question_async(question).result()
+    
+    def ask_cpr_question_async(self, question: str,
+                               on_sentence: Optional[Callable[[str], None]] = None) -> Future:
+        """
+        Ask a CPR-related question without blocking
+        
+        Callers asking the same (normalized) question while it is in flight
+        all receive the same future instead of triggering another API call,
+        and questions answered before (or prefetched) are served from cache.
+        
+        Args:
+            question: The question to ask
+            on_sentence: Called with each sentence of the answer as soon as it is
+                available: from a worker thread while an API answer streams, or
+                before this returns for cached and fallback answers. Not called
+                for callers that join a request already in flight.
+            
+        Returns:
+            Future: Resolves to the answer text
+        """
+        key = normalize_question(question)
+        
+        with self.inflight_lock:
+            self.metrics['requests'] += 1
+            
+            if key in self.inflight:
+                self.metrics['coalesced'] += 1
+                return self.inflight[key]
+            
+            cached = self.answer_cache.get(key)
+            if cached is not None:
+                self.metrics['cache_hits'] += 1
+                self.answer_cache.move_to_end(key)
+            elif self.api_key:
+                return self._start_request(key, question, on_sentence, self.throttle_timeout)
+        
+        future = Future()
+        if cached is not None:
+            if on_sentence:
+                for sentence in split_sentences(cached):
+                    on_sentence(sentence)
+            future.set_result(cached)
+        else:
+            future.set_result(self._emit_fallback(question, on_sentence))
+        return future
+    
+    def prefetch(self, question: str) -> bool:
+        """
+        Fetch an answer into the cache ahead of the question being asked
+        
+        Prefetching never waits for the rate limiter: if no request token is
+        free right now the prefetch is skipped so it cannot delay real questions.
+        
+        Args:
+            question: The question expected to be asked
+            
+        Returns:
+            bool: True if a request was started
+        """
         if not self.api_key:
-            return self._fallback_response(question)
+            return False
+        
+        key = normalize_question(question)
+        
+        with self.inflight_lock:
+            if key in self.inflight or key in self.answer_cache:
+                return False
+            if not self.rate_limiter.acquire(0):
+                return False
+            
+            self.metrics['prefetched'] += 1
+            self._start_request(key, question, None, None)
+        return True
+    
+    def _start_request(self, key: str, question: str, on_sentence: Optional[Callable[[str], None]],
+                       throttle_timeout: Optional[float]) -> Future:
+        """Register an in-flight request and run it on the request pool (caller holds inflight_lock)"""
+        future = Future()
+        self.inflight[key] = future
+        
+        def run_request():
+            try:
+                future.set_result(self._request_answer(question, on_sentence, throttle_timeout))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self.inflight_lock:
+                    self.inflight.pop(key, None)
+        
+        self.executor.submit(run_request)
+        return future
+    
+    def _cache_answer(self, question: str, answer: str):
+        """Remember an answer from the LLM"""
+        with self.inflight_lock:
+            self.answer_cache[normalize_question(question)] = answer
+            while len(self.answer_cache) > self.answer_cache_size:
+                self.answer_cache.popitem(last=False)
+    
+    def get_metrics(self) -> Dict[str, int]:
+        """Get request coalescing and throttling counters"""
+        with self.inflight_lock:
+            metrics = dict(self.metrics)
+            metrics['in_flight'] = len(self.inflight)
+        return metrics
+    
+    def _request_answer(self, question: str, on_sentence: Optional[Callable[[str], None]] = None,
+                        throttle_timeout: Optional[float] = 0) -> str:
+        """Call the LLM API for a question, respecting the per-key rate limit (None if a token is already held)"""
+        if throttle_timeout is not None and not self.rate_limiter.acquire(throttle_timeout):
+            with self.inflight_lock:
+                self.metrics['throttled'] += 1
+            print("LLM API rate limit reached, using fallback response")
+            return self._emit_fallback(question, on_sentence)
+        
+        with self.inflight_lock:
+            self.metrics['api_calls'] += 1
+        
+        if on_sentence:
+            return self._stream_answer(question, on_sentence)
         
         try:
+            import openai
             response = openai.ChatCompletion.create(
                 model="gpt-3.5-turbo",
                 messages=[
@@ -58,14 +314,68 @@ class LLMCPRGuide:
                 temperature=0.3
             )
             
-            return response.choices[0].message.content.strip()
+            answer = response.choices[0].message.content.strip()
+            self._cache_answer(question, answer)
+            return answer
+        
+        except Exception as e:
+            print(f"LLM API error: {e}")
+            with self.inflight_lock:
+                self.metrics['errors'] += 1
+            return self.fallback_response(question)
+    
+    def _stream_answer(self, question: str, on_sentence: Callable[[str], None]) -> str:
+        """Stream an answer from the LLM, handing over each sentence as it completes"""
+        sentences = []
+        stream = SentenceStream()
+        
+        try:
+            import openai
+            response = openai.ChatCompletion.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": question}
+                ],
+                max_tokens=200,
+                temperature=0.3,
+                stream=True
+            )
+            
+            for chunk in response:
+                text = chunk.choices[0].delta.get("content", "")
+                for sentence in stream.feed(text):
+                    sentences.append(sentence)
+                    on_sentence(sentence)
+            
+            for sentence in stream.flush():
+                sentences.append(sentence)
+                on_sentence(sentence)
+            
+            answer = " ".join(sentences)
+            self._cache_answer(question, answer)
+            return answer
         
         except Exception as e:
             print(f"LLM API error: {e}")
-            return self._fallback_response(question)
+            with self.inflight_lock:
+                self.metrics['errors'] += 1
+            
+            # Keep what has already been spoken rather than starting over
+            if sentences:
+                return " ".join(sentences)
+            return self._emit_fallback(question, on_sentence)
     
-    def _fallback_response(self, question: str) -> str:
-        """Fallback responses when LLM is not available"""
+    def _emit_fallback(self, question: str, on_sentence: Optional[Callable[[str], None]] = None) -> str:
+        """Get the fallback response, handing it over sentence by sentence if requested"""
+        response = self.fallback_response(question)
+        if on_sentence:
+            for sentence in split_sentences(response):
+                on_sentence(sentence)
+        return response
+    
+    def fallback_response(self, question: str) -> str:
+        """Built-in answer to a question, used when the LLM is not available"""
         question_lower = question.lower()
         
         if "rate" in question_lower or "speed" in question_lower or "bpm" in question_lower:
@@ -91,44 +401,7 @@ class LLMCPRGuide:
     
     def get_compression_feedback(self, bpm: float, depth: float, hand_placement: float) -> Dict[str, str]:
         """Get specific feedback based on CPR performance"""
-        feedback = {
-            "bpm_feedback": "",
-            "depth_feedback": "",
-            "placement_feedback": "",
-            "overall_feedback": ""
-        }
-        
-        # BPM feedback
-        if 100 <= bpm <= 120:
-            feedback["bpm_feedback"] = "Excellent rhythm! Keep going at this pace."
-        elif bpm < 100:
-            feedback["bpm_feedback"] = f"Too slow at {bpm:.0f} BPM. Speed up to 100-120 BPM."
-        else:
-            feedback["bpm_feedback"] = f"Too fast at {bpm:.0f} BPM. Slow down to 100-120 BPM."
-        
-        # Depth feedback
-        if depth >= 0.7:  # Assuming normalized depth
-            feedback["depth_feedback"] = "Good compression depth!"
-        else:
-            feedback["depth_feedback"] = "Push harder! Compress at least 2 inches deep."
-        
-        # Hand placement feedback
-        if hand_placement >= 0.8:
-            feedback["placement_feedback"] = "Perfect hand placement!"
-        elif hand_placement >= 0.6:
-            feedback["placement_feedback"] = "Good placement, try to center hands more."
-        else:
-            feedback["placement_feedback"] = "Move hands to center of chest, between nipples."
-        
-        # Overall feedback
-        if bpm >= 100 and bpm <= 120 and depth >= 0.7 and hand_placement >= 0.8:
-            feedback["overall_feedback"] = "Excellent CPR technique! Keep it up!"
-        elif bpm < 100 or depth < 0.7 or hand_placement < 0.6:
-            feedback["overall_feedback"] = "Focus on: proper hand placement, adequate depth, and correct rhythm."
-        else:
-            feedback["overall_feedback"] = "Good effort! Continue with minor adjustments."
-        
-        return feedback
+        return evaluate_feedback(bpm, depth, hand_placement).as_dict()
     
     def get_step_guidance(self, step: int) -> str:
         """Get guidance for specific CPR steps"""
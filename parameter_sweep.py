@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Compression Detection Parameter Sweep
+Evaluates grids of detection parameters against cached landmark streams with known
+compression counts, across a process pool, and reports count and BPM accuracy and
+runtime for every configuration.
+
+The labels file lists the recordings and their true counts, either as JSON
+([{"video": "a.mp4", "compressions": 60, "bpm": 110}, ...]) or CSV with the same
+columns; bpm is optional. Videos must already be in the landmark cache (run
+batch_analyzer.py on them first).
+
+Usage:
+    python parameter_sweep.py labels.json --depth-threshold 0.1 0.2 0.3 --smoothing 0.5 0.7 1.0
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from batch_analyzer import analyze_landmarks, create_detector, write_csv
+from landmark_cache import LandmarkCache
+from landmark_stream import LandmarkStream
+
+# Detector attribute for each swept parameter
+PARAMETERS = {
+    'depth_threshold': 'depth_threshold',
+    'min_duration': 'min_compression_duration',
+    'interval_window': 'compression_interval_window',
+    'smoothing': 'bpm_smoothing'
+}
+
+def load_labels(path: str) -> List[Dict]:
+    """Read recordings and their true compression counts (and optionally BPM)"""
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+    
+    base_dir = os.path.dirname(os.path.abspath(path))
+    labels = []
+    for row in rows:
+        bpm = row.get('bpm')
+        labels.append({
+            'video': os.path.join(base_dir, row['video']),
+            'compressions': int(row['compressions']),
+            'bpm': float(bpm) if bpm not in (None, '') else None
+        })
+    return labels
+
+def parse_window(value: str) -> Optional[Tuple[float, float]]:
+    """Parse an interval window like '0.3:1.0', or 'none' to disable it"""
+    if value.lower() == 'none':
+        return None
+    low, high = value.split(':')
+    return float(low), float(high)
+
+def build_grid(options: Dict[str, List]) -> List[Dict]:
+    """Every combination of the swept parameter values"""
+    names = list(options)
+    return [dict(zip(names, values)) for values in itertools.product(*(options[name] for name in names))]
+
+def evaluate_config(config: Dict, streams: List[LandmarkStream], labels: List[Dict]) -> Dict:
+    """
+    Run detection with one parameter configuration over every labeled stream
+    
+    Returns:
+        Dict: The configuration with its count/BPM errors and runtime
+    """
+    start = time.perf_counter()
+    count_errors, relative_errors, bpm_errors = [], [], []
+    
+    for stream, label in zip(streams, labels):
+        detector = create_detector()
+        for name, value in config.items():
+            setattr(detector, PARAMETERS[name], value)
+        
+        summary = analyze_landmarks(stream, detector)['summary']
+        count_error = summary['compressions'] - label['compressions']
+        count_errors.append(abs(count_error))
+        relative_errors.append(abs(count_error) / max(label['compressions'], 1))
+        if label['bpm'] is not None:
+            bpm_errors.append(abs(summary['mean_bpm'] - label['bpm']))
+    
+    result = {name: (f"{value[0]}:{value[1]}" if isinstance(value, tuple) else value)
+              for name, value in config.items()}
+    result.update({
+        'count_mae': round(float(np.mean(count_errors)), 3),
+        'count_mape': round(float(np.mean(relative_errors)), 4),
+        'count_max_error': int(max(count_errors)),
+        'bpm_mae': round(float(np.mean(bpm_errors)), 3) if bpm_errors else None,
+        'runtime_seconds': round(time.perf_counter() - start, 4)
+    })
+    return result
+
+# Landmark streams loaded once per worker process rather than pickled with every task
+_worker_streams: List[LandmarkStream] = []
+_worker_labels: List[Dict] = []
+
+def _init_worker(cache_dir: str, labels: List[Dict], model_complexity: int):
+    """Load the cached streams in a worker process"""
+    global _worker_streams, _worker_labels
+    _worker_labels = labels
+    _worker_streams = load_streams(LandmarkCache(cache_dir), labels, model_complexity)
+
+def _evaluate_in_worker(config: Dict) -> Dict:
+    """Evaluate a configuration against the worker's streams"""
+    return evaluate_config(config, _worker_streams, _worker_labels)
+
+def load_streams(cache: LandmarkCache, labels: List[Dict], model_complexity: int) -> List[LandmarkStream]:
+    """
+    Load the cached landmarks for every labeled video
+    
+    Raises:
+        FileNotFoundError: If a video has not been analyzed yet
+    """
+    streams = []
+    for label in labels:
+        stream = cache.load(label['video'], model_complexity)
+        if stream is None:
+            raise FileNotFoundError(f"No cached landmarks for {label['video']}, run batch_analyzer.py on it first")
+        streams.append(stream)
+    return streams
+
+def run_sweep(labels: List[Dict], grid: List[Dict], cache_dir: str, model_complexity: int = 1,
+              workers: int = 1) -> List[Dict]:
+    """
+    Evaluate every configuration in a grid
+    
+    Returns:
+        List: Results sorted by count error, then BPM error
+    
+    Raises:
+        FileNotFoundError: If a video has not been analyzed yet
+    """
+    # Loaded here first even with workers, so a cache miss is raised here rather
+    # than breaking the pool in its initializer
+    streams = load_streams(LandmarkCache(cache_dir), labels, model_complexity)
+    if workers > 1:
+        del streams
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(cache_dir, labels, model_complexity)) as executor:
+            results = list(executor.map(_evaluate_in_worker, grid, chunksize=max(1, len(grid) // (workers * 4))))
+    else:
+        results = [evaluate_config(config, streams, labels) for config in grid]
+    
+    return sorted(results, key=lambda r: (r['count_mae'], r['bpm_mae'] if r['bpm_mae'] is not None else 0))
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Tune compression detection against labeled recordings")
+    parser.add_argument('labels', help="JSON or CSV file of videos with true compression counts")
+    parser.add_argument('--depth-threshold', type=float, nargs='+', default=[0.1, 0.2, 0.3])
+    parser.add_argument('--min-duration', type=float, nargs='+', default=[0.1, 0.2, 0.3])
+    parser.add_argument('--interval-window', type=parse_window, nargs='+', default=[None, (0.3, 1.0)],
+                        help="min:max seconds between compressions, or 'none'")
+    parser.add_argument('--smoothing', type=float, nargs='+', default=[0.5, 0.7, 1.0],
+                        help="Weight of the newest BPM against the previous one")
+    parser.add_argument('--cache-dir', default='.landmark_cache')
+    parser.add_argument('--model-complexity', type=int, default=1, choices=[0, 1, 2])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default='sweep_results.csv')
+    args = parser.parse_args(argv)
+    
+    labels = load_labels(args.labels)
+    grid = build_grid({
+        'depth_threshold': args.depth_threshold,
+        'min_duration': args.min_duration,
+        'interval_window': args.interval_window,
+        'smoothing': args.smoothing
+    })
+    print(f"Evaluating {len(grid)} configurations on {len(labels)} recordings with {args.workers} workers")
+    
+    start = time.perf_counter()
+    try:
+        results = run_sweep(labels, grid, args.cache_dir, args.model_complexity, args.workers)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+    
+    write_csv(args.output, results)
+    print(f"Done in {elapsed:.1f} s, results in {args.output}")
+    print("\nBest configurations:")
+    for result in results[:10]:
+        print("  " + ", ".join(f"{key}={value}" for key, value in result.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Camera-Free Pipeline Harness
+Feeds synthetic landmark streams through the compression detection, BPM and feedback
+code of every CPR Assistant variant, with no camera, display or pose model, and
+compares the results with the compressions the stream was generated from.
+
+Usage:
+    python pipeline_harness.py --rate 110 --depth 0.4 --noise 0.005 --pause 10:2
+    python pipeline_harness.py --variants simple improved --dropout 0.1 --json results.json
+"""
+
+import argparse
+import collections
+import importlib
+import json
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from landmark_stream import LandmarkStream
+from synthetic_landmarks import SyntheticSession, generate_session
+
+# Variant name -> (module, class)
+VARIANTS = {
+    'simple': ('simple_cpr_assistant', 'SimpleCPRAssistant'),
+    'improved': ('improved_cpr_assistant', 'ImprovedCPRAssistant'),
+    'enhanced': ('enhanced_cpr_assistant', 'EnhancedCPRAssistant'),
+    'cpr': ('cpr_assistant', 'CPRAssistant')
+}
+
+def create_assistant(variant: str):
+    """Create an assistant of one variant (no camera is opened)"""
+    module_name, class_name = VARIANTS[variant]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)()
+
+def close_assistant(assistant):
+    """Close the session files an assistant holds (e.g. its compression spill file), which outlive the process otherwise"""
+    for records in getattr(assistant, 'session_data', {}).values():
+        if hasattr(records, 'close'):
+            records.close()
+
+def run_pipeline(assistant, stream: LandmarkStream) -> Dict:
+    """
+    Run every frame of a landmark stream through an assistant's non-vision pipeline
+    
+    Args:
+        assistant: Any CPR Assistant variant
+        stream: Landmarks to feed, timed by their stream timestamps
+    
+    Returns:
+        Dict: Detected compression times, the final and mean BPM, the share of frames
+            in each feedback state and the time spent per frame
+    """
+    compression_times = []
+    bpms = []
+    states = collections.Counter()
+    frame_seconds = 0.0
+    
+    for timestamp, landmarks in stream.frames():
+        start = time.perf_counter()
+        counted = assistant.update_from_landmarks(landmarks, timestamp)
+        feedback = assistant.feedback_tracker.update(assistant.current_bpm, assistant.compression_depth,
+                                                     assistant.hand_placement_score)
+        frame_seconds += time.perf_counter() - start
+        
+        if counted:
+            compression_times.append(timestamp)
+            bpms.append(assistant.current_bpm)
+        states[feedback.state] += 1
+    
+    frames = max(len(stream), 1)
+    return {
+        'compression_times': compression_times,
+        'final_bpm': float(assistant.current_bpm),
+        'mean_bpm': float(np.mean(bpms)) if bpms else 0.0,
+        'feedback_states': {'/'.join(state): count / frames for state, count in states.most_common()},
+        'us_per_frame': frame_seconds / frames * 1e6
+    }
+
+def compare(session: SyntheticSession, result: Dict) -> Dict:
+    """Score a pipeline run against the compressions the session was generated with"""
+    detected = len(result['compression_times'])
+    return {
+        'expected': session.compressions,
+        'detected': detected,
+        'count_error': detected - session.compressions,
+        'expected_bpm': round(session.rate_bpm, 2),
+        'mean_bpm': round(result['mean_bpm'], 2),
+        'bpm_error': round(result['mean_bpm'] - session.rate_bpm, 2) if detected else None,
+        'final_bpm': round(result['final_bpm'], 2),
+        'feedback_states': {state: round(share, 4) for state, share in result['feedback_states'].items()},
+        'us_per_frame': round(result['us_per_frame'], 2)
+    }
+
+def run_variants(session: SyntheticSession, variants: List[str]) -> Dict[str, Dict]:
+    """
+    Run a synthetic session through several variants
+    
+    Variants whose dependencies cannot be loaded here (e.g. no audio device for
+    CPRAssistant, or models some variants only load on the first frame) are
+    reported with the error instead of a result.
+    """
+    results = {}
+    for variant in variants:
+        assistant = None
+        try:
+            assistant = create_assistant(variant)
+            results[variant] = compare(session, run_pipeline(assistant, session.stream))
+        except Exception as e:
+            results[variant] = {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            if assistant is not None:
+                close_assistant(assistant)
+    return results
+
+def parse_pause(value: str) -> Tuple[float, float]:
+    """Parse a pause like '10:2' (start and length in seconds)"""
+    start, length = value.split(':')
+    return float(start), float(length)
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run synthetic compressions through every assistant variant")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--duration', type=float, default=30.0, help="Session length in seconds")
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--rate', type=float, default=110.0, help="Compression rate in BPM")
+    parser.add_argument('--rate-jitter', type=float, default=0.0,
+                        help="Variation of each compression's length, as a fraction")
+    parser.add_argument('--depth', type=float, default=0.3, help="Wrist travel in normalized image height")
+    parser.add_argument('--noise', type=float, default=0.0, help="Landmark jitter in normalized image units")
+    parser.add_argument('--dropout', type=float, default=0.0, help="Probability a frame has no pose")
+    parser.add_argument('--pause', type=parse_pause, action='append', default=[],
+                        help="start:seconds break in compressions (repeatable)")
+    parser.add_argument('--hand-drift', type=float, default=0.0,
+                        help="Sideways wrist drift in normalized image width per second")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args(argv)
+    
+    session = generate_session(args.duration, args.fps, args.rate, args.depth, args.noise, args.dropout,
+                               args.pause, args.hand_drift, args.rate_jitter, args.seed)
+    print(f"Synthetic session: {len(session.stream)} frames, {session.compressions} compressions "
+          f"at {session.rate_bpm:.1f} BPM")
+    
+    results = run_variants(session, args.variants)
+    for variant, result in results.items():
+        if 'error' in result:
+            print(f"  {variant:<9} skipped ({result['error']})")
+            continue
+        bpm_error = f"{result['bpm_error']:+.1f}" if result['bpm_error'] is not None else "n/a"
+        top_state = next(iter(result['feedback_states']), 'none')
+        print(f"  {variant:<9} {result['detected']:>4}/{result['expected']} compressions "
+              f"({result['count_error']:+d}), mean {result['mean_bpm']:.1f} BPM ({bpm_error}), "
+              f"mostly {top_state}, {result['us_per_frame']:.1f} µs/frame")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'session': vars(args), 'results': results}, f, indent=2)
+    return 0 if any('error' not in result for result in results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,15 @@ CPR Assistant Launcher
 Simple launcher script for the CPR Assistant application
 """
 
+import importlib.util
 import sys
 import os
 import subprocess
 import tkinter as tk
 from tkinter import messagebox
+from startup_profile import StartupProfiler, profile_startup_requested
+from stage_timing import latency_report_requested
+from glass_to_glass import load_event_times, measurement_requested
 
 def check_dependencies():
     """Check if required dependencies are installed"""
@@ -17,24 +21,9 @@ def check_dependencies():
         'speech_recognition', 'pyttsx3'
     ]
     
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            if package == 'cv2':
-                import cv2
-            elif package == 'mediapipe':
-                import mediapipe
-            elif package == 'numpy':
-                import numpy
-            elif package == 'pygame':
-                import pygame
-            elif package == 'speech_recognition':
-                import speech_recognition
-            elif package == 'pyttsx3':
-                import pyttsx3
-        except ImportError:
-            missing_packages.append(package)
+    # Look the packages up without importing them, which is slow for mediapipe and pygame
+    missing_packages = [package for package in required_packages
+                        if importlib.util.find_spec(package) is None]
     
     return missing_packages
 
@@ -48,6 +37,11 @@ def install_dependencies():
 
 def main():
     """Main launcher function"""
+    profiler = None
+    if profile_startup_requested():
+        profiler = StartupProfiler()
+        profiler.install()
+    
     print("CPR Assistant Launcher")
     print("=" * 30)
     
@@ -78,10 +72,22 @@ def main():
     try:
         from enhanced_cpr_assistant import EnhancedCPRAssistant
         app = EnhancedCPRAssistant()
+        app.latency_report_path = latency_report_requested()
+        measurement = measurement_requested()
+        if measurement:
+            events = load_event_times(measurement['events']) if measurement['events'] else None
+            app.enable_latency_measurement(measurement['replay'], events)
+        if profiler:
+            profiler.mark("Application constructed")
+            app.startup_profiler = profiler
         app.run()
     except Exception as e:
         print(f"Error starting application: {e}")
         messagebox.showerror("Error", f"Failed to start CPR Assistant: {e}")
+    finally:
+        if profiler:
+            # Reported when the mode selection window appeared, unless it never did
+            profiler.finish("Exited before a window was shown")
 
 if __name__ == "__main__":
     main()
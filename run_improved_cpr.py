@@ -9,9 +9,17 @@ import os
 import subprocess
 import tkinter as tk
 from tkinter import messagebox
+from startup_profile import StartupProfiler, profile_startup_requested
+from stage_timing import latency_report_requested
+from session_recording import recording_requested
 
 def main():
     """Main launcher function"""
+    profiler = None
+    if profile_startup_requested():
+        profiler = StartupProfiler()
+        profiler.install()
+    
     print("Improved CPR Assistant Launcher")
     print("=" * 40)
     print("Features:")
@@ -27,6 +35,14 @@ def main():
         print("✓ Dependencies found!")
         print("Starting Improved CPR Assistant...")
         app = ImprovedCPRAssistant()
+        app.latency_report_path = latency_report_requested()
+        recording = recording_requested()
+        if recording:
+            app.start_recording(recording)
+            print(f"Recording landmarks and compressions to {recording}")
+        if profiler:
+            profiler.mark("Application constructed")
+            app.startup_profiler = profiler
         app.run()
         
     except ImportError as e:
@@ -41,6 +57,10 @@ def main():
     except Exception as e:
         print(f"✗ Error starting application: {e}")
         print("Please check your camera connection and try again.")
+    finally:
+        if profiler:
+            # Reported when the mode selection window appeared, unless it never did
+            profiler.finish("Exited before a window was shown")
 
 if __name__ == "__main__":
     main()
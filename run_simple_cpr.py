@@ -4,28 +4,22 @@ Simple CPR Assistant Launcher
 Launcher for the simplified CPR Assistant (no audio, no LLM)
 """
 
+import importlib.util
 import sys
 import os
 import subprocess
 import tkinter as tk
 from tkinter import messagebox
+from startup_profile import StartupProfiler, profile_startup_requested
+from stage_timing import latency_report_requested
 
 def check_dependencies():
     """Check if required dependencies are installed"""
     required_packages = ['cv2', 'mediapipe', 'numpy']
     
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            if package == 'cv2':
-                import cv2
-            elif package == 'mediapipe':
-                import mediapipe
-            elif package == 'numpy':
-                import numpy
-        except ImportError:
-            missing_packages.append(package)
+    # Look the packages up without importing them, which is slow for mediapipe
+    missing_packages = [package for package in required_packages
+                        if importlib.util.find_spec(package) is None]
     
     return missing_packages
 
@@ -39,6 +33,11 @@ def install_dependencies():
 
 def main():
     """Main launcher function"""
+    profiler = None
+    if profile_startup_requested():
+        profiler = StartupProfiler()
+        profiler.install()
+    
     print("Simple CPR Assistant Launcher")
     print("=" * 35)
     
@@ -69,10 +68,18 @@ def main():
     try:
         from simple_cpr_assistant import SimpleCPRAssistant
         app = SimpleCPRAssistant()
+        app.latency_report_path = latency_report_requested()
+        if profiler:
+            profiler.mark("Application constructed")
+            app.startup_profiler = profiler
         app.run()
     except Exception as e:
         print(f"Error starting application: {e}")
         messagebox.showerror("Error", f"Failed to start Simple CPR Assistant: {e}")
+    finally:
+        if profiler:
+            # Reported when the mode selection window appeared, unless it never did
+            profiler.finish("Exited before a window was shown")
 
 if __name__ == "__main__":
     main()
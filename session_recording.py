@@ -0,0 +1,289 @@
+"""
+Session Recording
+An append-only, memory-mapped file of per-frame pose landmarks and per-compression
+events. Records are fixed size and written straight into mapped chunks, so recording
+at frame rate costs a memory copy per frame; a small index header lists the chunks,
+so a recording opens instantly and any frame or event can be read without parsing
+the rest of the file.
+
+Layout:
+    Header (64 KiB): magic, version, flags, frame rate, clock offset, chunk sizes,
+        record counts, then the chunk table of (stream, file offset) entries
+    Chunks: each holds a fixed number of frame or event records, in order per stream
+"""
+
+import mmap
+import os
+import struct
+import sys
+from typing import Optional, Sequence
+
+import numpy as np
+
+from compression_log import compression_dtype, quality_flags
+from landmark_stream import (HAND_LANDMARK_COUNT, MAX_HANDS, POSE_LANDMARK_COUNT, LandmarkStream,
+                             _hands_array, _pose_array)
+
+MAGIC = b'CPRREC01'
+VERSION = 2
+HEADER_SIZE = 1 << 16
+FLAG_HANDS = 1
+
+FRAMES = 0
+EVENTS = 1
+
+# magic, version, flags, fps, clock offset, frames per chunk, events per chunk,
+# chunk table capacity, chunks used, frame count, event count
+_HEADER = struct.Struct('<8sIIddIIIIQQ')
+_CHUNK = struct.Struct('<IIQ')  # stream, reserved, file offset
+_TABLE_START = 128
+MAX_CHUNKS = (HEADER_SIZE - _TABLE_START) // _CHUNK.size
+
+EVENT_DTYPE = compression_dtype('time')
+
+# Event layout by format version (version 1 stored the metrics as float32)
+EVENT_DTYPES = {1: compression_dtype('time', '<f4'), 2: EVENT_DTYPE}
+
+def frame_dtype(with_hands: bool = False) -> np.dtype:
+    """Frame record: capture time, pose landmarks (x, y, z, visibility) and optionally hand landmarks"""
+    fields = [('timestamp', '<f8'), ('pose', '<f4', (POSE_LANDMARK_COUNT, 4))]
+    if with_hands:
+        fields.append(('hands', '<f4', (MAX_HANDS, HAND_LANDMARK_COUNT, 3)))
+    return np.dtype(fields)
+
+def _chunk_bytes(records: int, itemsize: int) -> int:
+    """Bytes of a chunk, rounded up so every chunk starts on an mmap boundary"""
+    granularity = mmap.ALLOCATIONGRANULARITY
+    return -(-records * itemsize // granularity) * granularity
+
+class SessionRecorder:
+    def __init__(self, path: str, fps: float = 30.0, clock_offset: float = 0.0, with_hands: bool = False,
+                 chunk_frames: int = 8192, chunk_events: int = 4096):
+        """
+        Start a recording (an existing file at path is replaced)
+        
+        Args:
+            path: Recording file
+            fps: Camera frame rate, for readers (see set_fps() if it is not known yet)
+            clock_offset: Wall-clock time minus capture clock time, so readers can
+                convert the capture timestamps
+            with_hands: Also record hand landmarks (almost doubles the frame size)
+            chunk_frames: Frame records per chunk (8192 is about 4.5 minutes at 30 FPS)
+            chunk_events: Compression events per chunk
+        """
+        self.path = path
+        self.frame_dtype = frame_dtype(with_hands)
+        self.with_hands = with_hands
+        self.chunk_records = {FRAMES: chunk_frames, EVENTS: chunk_events}
+        self.itemsize = {FRAMES: self.frame_dtype.itemsize, EVENTS: EVENT_DTYPE.itemsize}
+        self.counts = {FRAMES: 0, EVENTS: 0}
+        self.maps = {FRAMES: None, EVENTS: None}
+        self.chunks = []  # (stream, offset) in file order
+        self.frame = np.zeros(1, dtype=self.frame_dtype)
+        self.event = np.zeros(1, dtype=EVENT_DTYPE)
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'w+b')
+        self.file.truncate(HEADER_SIZE)
+        self.header = mmap.mmap(self.file.fileno(), HEADER_SIZE)
+        self.fps = fps
+        self.clock_offset = clock_offset
+        self._write_header()
+    
+    def _write_header(self):
+        """Write the fixed header fields (counts included)"""
+        _HEADER.pack_into(self.header, 0, MAGIC, VERSION, FLAG_HANDS if self.with_hands else 0, self.fps,
+                          self.clock_offset, self.chunk_records[FRAMES], self.chunk_records[EVENTS], MAX_CHUNKS,
+                          len(self.chunks), self.counts[FRAMES], self.counts[EVENTS])
+    
+    def _new_chunk(self, stream: int):
+        """Extend the file by one chunk for a stream and map it"""
+        if len(self.chunks) >= MAX_CHUNKS:
+            raise IOError(f"Recording {self.path} is full ({MAX_CHUNKS} chunks)")
+        if self.maps[stream] is not None:
+            self.maps[stream].close()
+        offset = os.fstat(self.file.fileno()).st_size
+        size = _chunk_bytes(self.chunk_records[stream], self.itemsize[stream])
+        self.file.truncate(offset + size)
+        self.maps[stream] = mmap.mmap(self.file.fileno(), size, offset=offset)
+        _CHUNK.pack_into(self.header, _TABLE_START + len(self.chunks) * _CHUNK.size, stream, 0, offset)
+        self.chunks.append((stream, offset))
+    
+    def _append(self, stream: int, record: bytes):
+        """Copy a record into its stream's current chunk, then count it in the header"""
+        index = self.counts[stream] % self.chunk_records[stream]
+        if index == 0:
+            self._new_chunk(stream)
+        position = index * self.itemsize[stream]
+        self.maps[stream][position:position + len(record)] = record
+        self.counts[stream] += 1
+        # The count is written last, so a crash never exposes a half-written record
+        self._write_header()
+    
+    def set_fps(self, fps: float):
+        """Update the frame rate in the header, e.g. once the camera has negotiated it"""
+        self.fps = fps
+        self._write_header()
+    
+    def add_frame(self, capture_time: float, pose_landmarks, hand_landmarks=None):
+        """
+        Record one frame
+        
+        Args:
+            capture_time: Capture time of the frame in seconds
+            pose_landmarks: MediaPipe pose landmarks, a (33, 4) array, or None if no pose was found
+            hand_landmarks: MediaPipe multi_hand_landmarks (only kept when recording hands)
+        """
+        frame = self.frame[0]
+        frame['timestamp'] = capture_time
+        frame['pose'] = pose_landmarks if isinstance(pose_landmarks, np.ndarray) else _pose_array(pose_landmarks)
+        if self.with_hands:
+            frame['hands'] = _hands_array(hand_landmarks)
+        self._append(FRAMES, self.frame.tobytes())
+    
+    def add_event(self, capture_time: float, bpm: float, depth: float, hand_placement: float):
+        """Record a compression"""
+        self.event[0] = (capture_time, bpm, depth, hand_placement, quality_flags(bpm, depth, hand_placement))
+        self._append(EVENTS, self.event.tobytes())
+    
+    @property
+    def frame_count(self) -> int:
+        return self.counts[FRAMES]
+    
+    @property
+    def event_count(self) -> int:
+        return self.counts[EVENTS]
+    
+    def close(self):
+        """Flush and close the recording, trimming the unused end of the last chunk"""
+        if self.file is None:
+            return
+        for stream, mapped in self.maps.items():
+            if mapped is not None:
+                mapped.flush()
+                mapped.close()
+        self.header.flush()
+        self.header.close()
+        if self.chunks:
+            stream, offset = self.chunks[-1]
+            used = self.counts[stream] - self.chunk_records[stream] * (sum(1 for s, _ in self.chunks if s == stream) - 1)
+            self.file.truncate(offset + used * self.itemsize[stream])
+        self.file.close()
+        self.file = None
+
+class SessionRecording:
+    def __init__(self, path: str):
+        """
+        Open a recording for random access (only the header is read up front)
+        
+        A recording left open by a crash can be read too; it holds every record
+        counted in its header.
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+        
+        (magic, version, flags, self.fps, self.clock_offset, chunk_frames, chunk_events, _,
+         chunk_count, frame_count, event_count) = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        if version > VERSION:
+            raise ValueError(f"{path} was written by a newer version (format {version})")
+        
+        self.with_hands = bool(flags & FLAG_HANDS)
+        self.frame_dtype = frame_dtype(self.with_hands)
+        self.event_dtype = EVENT_DTYPES[version]
+        self.frame_count = frame_count
+        self.event_count = event_count
+        self.chunk_records = {FRAMES: chunk_frames, EVENTS: chunk_events}
+        
+        # Views of each stream's chunks, limited to the counted records
+        self.chunks = {FRAMES: [], EVENTS: []}
+        remaining = {FRAMES: frame_count, EVENTS: event_count}
+        dtypes = {FRAMES: self.frame_dtype, EVENTS: self.event_dtype}
+        for i in range(chunk_count):
+            stream, _, offset = _CHUNK.unpack_from(self.map, _TABLE_START + i * _CHUNK.size)
+            records = min(self.chunk_records[stream], remaining[stream])
+            remaining[stream] -= records
+            self.chunks[stream].append(np.ndarray(records, dtype=dtypes[stream], buffer=self.map, offset=offset))
+    
+    def __len__(self) -> int:
+        return self.frame_count
+    
+    def _record(self, stream: int, index: int):
+        """One record of a stream by index (negative indices count from the end)"""
+        count = self.frame_count if stream == FRAMES else self.event_count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"Record {index} out of range ({count} records)")
+        return self.chunks[stream][index // self.chunk_records[stream]][index % self.chunk_records[stream]]
+    
+    def frame(self, index: int):
+        """One frame record (fields timestamp, pose and, if recorded, hands)"""
+        return self._record(FRAMES, index)
+    
+    def event(self, index: int):
+        """One compression event (fields time, bpm, depth, hand_placement, flags)"""
+        return self._record(EVENTS, index)
+    
+    def frame_index_at(self, timestamp: float) -> int:
+        """Index of the first frame captured at or after timestamp"""
+        index = 0
+        for chunk in self.chunks[FRAMES]:
+            if len(chunk) and chunk['timestamp'][-1] >= timestamp:
+                return index + int(np.searchsorted(chunk['timestamp'], timestamp))
+            index += len(chunk)
+        return index
+    
+    def _concatenate(self, stream: int, start: int, end: int) -> np.ndarray:
+        """Copy records [start, end) of a stream, touching only the chunks they are in"""
+        per_chunk = self.chunk_records[stream]
+        parts = []
+        for number in range(start // per_chunk, -(-end // per_chunk)):
+            chunk = self.chunks[stream][number]
+            first = number * per_chunk
+            parts.append(chunk[max(start - first, 0):end - first])
+        dtype = self.frame_dtype if stream == FRAMES else self.event_dtype
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+    
+    def frames(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Frames [start, end) as one array (a copy)"""
+        end = self.frame_count if end is None else min(end, self.frame_count)
+        return self._concatenate(FRAMES, start, max(start, end))
+    
+    def events(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Compression events [start, end) as one array (a copy)"""
+        end = self.event_count if end is None else min(end, self.event_count)
+        return self._concatenate(EVENTS, start, max(start, end))
+    
+    def events_between(self, start_time: float, end_time: float) -> np.ndarray:
+        """Compression events with start_time <= time < end_time"""
+        events = self.events()
+        times = events['time']
+        return events[np.searchsorted(times, start_time):np.searchsorted(times, end_time)]
+    
+    def to_landmark_stream(self, start: int = 0, end: Optional[int] = None) -> LandmarkStream:
+        """Frames [start, end) as a LandmarkStream, e.g. to re-run detection with batch_analyzer"""
+        frames = self.frames(start, end)
+        hands = frames['hands'] if self.with_hands else None
+        return LandmarkStream(frames['timestamp'], frames['pose'], hands, self.fps, start)
+    
+    def close(self):
+        """Release the mapping (deferred while arrays returned by frame() or event() are alive)"""
+        self.chunks = {FRAMES: [], EVENTS: []}
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+def recording_requested(argv: Optional[Sequence[str]] = None) -> Optional[str]:
+    """The path given with --record on the command line, if any"""
+    argv = sys.argv if argv is None else argv
+    if '--record' in argv and argv.index('--record') + 1 < len(argv):
+        return argv[argv.index('--record') + 1]
+    return None
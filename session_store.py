@@ -0,0 +1,227 @@
+"""
+Session Store
+Appends session records (e.g. compressions) to a compact binary spill file in small
+batches, so a crash loses at most the last batch and the records no longer need to
+be kept in memory. Reads (len, iteration) cover the spilled and pending records
+alike, like the lists it replaces.
+"""
+
+import json
+import os
+import struct
+import tempfile
+import threading
+import weakref
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b'CPRSESS1'
+
+# Field types: 'd' float64, 'f' float32, 'i' int32, '?' bool, 's' length-prefixed UTF-8 string
+def compression_fields(time_field: str = 'time') -> Tuple[Tuple[str, str], ...]:
+    """Fields of a compression record, timed by time_field"""
+    return ((time_field, 'd'), ('bpm', 'd'), ('depth', 'd'), ('hand_placement', 'd'))
+
+COMPRESSION_FIELDS = compression_fields()
+
+_LENGTH = struct.Struct('<I')
+
+class RecordCodec:
+    def __init__(self, fields: Sequence[Tuple[str, str]]):
+        """
+        Pack records (dicts) with fixed fields into bytes and back
+        
+        Numeric fields are packed first, then each string as a 4-byte length and its
+        UTF-8 bytes.
+        """
+        self.fields = [tuple(field) for field in fields]
+        self.numeric = [name for name, kind in self.fields if kind != 's']
+        self.strings = [name for name, kind in self.fields if kind == 's']
+        self.fixed = struct.Struct('<' + ''.join(kind for _, kind in self.fields if kind != 's'))
+    
+    def encode(self, record: Dict) -> bytes:
+        """Pack one record (extra keys are dropped)"""
+        data = self.fixed.pack(*(record[name] for name in self.numeric))
+        for name in self.strings:
+            value = record[name].encode('utf-8')
+            data += _LENGTH.pack(len(value)) + value
+        return data
+    
+    def decode(self, buffer, offset: int) -> Optional[Tuple[Dict, int]]:
+        """
+        Unpack the record at offset
+        
+        Returns:
+            Tuple: The record and the offset after it, or None if the buffer ends first
+        """
+        end = offset + self.fixed.size
+        if end > len(buffer):
+            return None
+        record = dict(zip(self.numeric, self.fixed.unpack_from(buffer, offset)))
+        for name in self.strings:
+            if end + _LENGTH.size > len(buffer):
+                return None
+            length, = _LENGTH.unpack_from(buffer, end)
+            end += _LENGTH.size
+            if end + length > len(buffer):
+                return None
+            record[name] = bytes(buffer[end:end + length]).decode('utf-8')
+            end += length
+        return record, end
+    
+    def header(self) -> bytes:
+        """File header: magic, then the field list as length-prefixed JSON"""
+        fields = json.dumps(self.fields).encode('utf-8')
+        return MAGIC + _LENGTH.pack(len(fields)) + fields
+
+def _read_header(f) -> Tuple[RecordCodec, int]:
+    """Read a spill file header, returning the codec and where the records start"""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a session store file")
+    length, = _LENGTH.unpack(f.read(_LENGTH.size))
+    return RecordCodec(json.loads(f.read(length).decode('utf-8'))), len(MAGIC) + _LENGTH.size + length
+
+def _iter_records(f, codec: RecordCodec, start: int, end: Optional[int] = None,
+                  block_size: int = 1 << 20) -> Iterator[Dict]:
+    """Decode the records between two file offsets, reading a block at a time"""
+    f.seek(start)
+    position = start
+    buffer = b''
+    offset = 0
+    while end is None or position < end:
+        block = f.read(block_size if end is None else min(block_size, end - position))
+        if not block:
+            break
+        position += len(block)
+        buffer = buffer[offset:] + block
+        offset = 0
+        while True:
+            decoded = codec.decode(buffer, offset)
+            if decoded is None:
+                break
+            record, offset = decoded
+            yield record
+
+def read_records(path: str) -> Iterator[Dict]:
+    """
+    Read every record in a spill file, e.g. to recover a session after a crash
+    
+    A record cut short by the crash is skipped.
+    """
+    with open(path, 'rb') as f:
+        codec, start = _read_header(f)
+        yield from _iter_records(f, codec, start)
+
+def _remove(path: str):
+    """Delete a temporary spill file"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class SessionStore:
+    def __init__(self, fields: Sequence[Tuple[str, str]] = COMPRESSION_FIELDS, path: Optional[str] = None,
+                 spill_batch: int = 250):
+        """
+        An append-only store of session records, written to a spill file in batches
+        
+        Args:
+            fields: (name, type) of each record field, see COMPRESSION_FIELDS
+            path: Spill file to keep (None for a temporary file deleted on close)
+            spill_batch: Records written to the spill file at a time
+        """
+        self.codec = RecordCodec(fields)
+        self.path = path
+        self.spill_batch = max(1, spill_batch)
+        self.lock = threading.Lock()
+        self.pending: List[Dict] = []
+        self.spilled = 0
+        self.spilled_bytes = 0
+        self.data_start = 0
+        self.file = None
+        self._finalizer = None
+    
+    def _open_spill_file(self):
+        """Create the spill file on the first spill, so short sessions never touch the disk"""
+        if self.path is None:
+            handle, path = tempfile.mkstemp(prefix='cpr_session_', suffix='.bin')
+            self.file = os.fdopen(handle, 'wb')
+            # Deleted on close or when the store is garbage collected, but left behind
+            # if Python exits without closing it, so a crashed session can be recovered
+            self._finalizer = weakref.finalize(self, _remove, path)
+            self._finalizer.atexit = False
+            self.path = path
+            print(f"Session records are spilled to {path}")
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, 'wb')
+        header = self.codec.header()
+        self.file.write(header)
+        self.data_start = len(header)
+    
+    def _spill(self):
+        """Append the pending records to the spill file"""
+        if self.file is None and self.spilled:
+            # Closed and kept earlier, carry on appending to the same file
+            self.file = open(self.path, 'ab')
+        elif self.file is None:
+            self._open_spill_file()
+        data = b''.join(self.codec.encode(record) for record in self.pending)
+        self.file.write(data)
+        self.file.flush()
+        self.spilled += len(self.pending)
+        self.spilled_bytes += len(data)
+        self.pending = []
+    
+    def append(self, record: Dict):
+        """Add a record"""
+        with self.lock:
+            self.pending.append(record)
+            if len(self.pending) >= self.spill_batch:
+                self._spill()
+    
+    def __len__(self) -> int:
+        return self.spilled + len(self.pending)
+    
+    def __bool__(self) -> bool:
+        return len(self) > 0
+    
+    def __iter__(self) -> Iterator[Dict]:
+        """All records, oldest first (records added while iterating are not included)"""
+        with self.lock:
+            spilled_bytes = self.spilled_bytes
+            pending = list(self.pending)
+            path = self.path if self.spilled else None
+        if path is not None:
+            # A separate handle, so appends can continue while the spilled records are read
+            with open(path, 'rb') as f:
+                yield from _iter_records(f, self.codec, self.data_start, self.data_start + spilled_bytes)
+        yield from pending
+    
+    def to_list(self) -> List[Dict]:
+        """All records as a list (e.g. to serialize for upload)"""
+        return list(self)
+    
+    def close(self, keep: bool = False):
+        """
+        Close the spill file
+        
+        Args:
+            keep: Write the pending records to the spill file too and keep it, so
+                the whole session can be read back with read_records()
+        """
+        with self.lock:
+            if keep and self.pending:
+                self._spill()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if self._finalizer is not None and not keep:
+                # The temporary file is gone, and with it the spilled records
+                self._finalizer()
+                self.path = None
+                self.spilled = self.spilled_bytes = 0
+            elif self._finalizer is not None:
+                self._finalizer.detach()
+            self._finalizer = None
@@ -12,6 +12,10 @@ import threading
 import time
 import math
 from typing import Optional, Tuple, List
+from camera_capture import CameraCapture
+from compression_timing import TimingStats
+from stage_timing import StageTimer, latency_report_requested
+from feedback_rules import FeedbackTracker, evaluate_feedback, feedback_color
 
 class SimpleCPRAssistant:
     def __init__(self):
@@ -44,6 +48,10 @@ class SimpleCPRAssistant:
         self.hand_placement_score = 0
         self.last_compression_time = 0
         self.compression_times = []
+        self.timing_stats = TimingStats()  # Compressions are timed by frame capture time
+        self.stage_timer = StageTimer()  # Per-stage frame latency, 'L' toggles the HUD
+        self.latency_report_path = None  # Only written when asked for (--latency-report), see the launchers
+        self.startup_profiler = None  # Set by the launcher for --profile-startup
         self.metronome_active = False
         self.mode = None  # 'walkthrough' or 'feedback'
         
@@ -69,17 +77,14 @@ class SimpleCPRAssistant:
         self.flash_timer = 0
         self.flash_duration = 0.5  # seconds
         
-    def initialize_camera(self):
-        """Initialize camera capture"""
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
-            raise Exception("Could not open camera")
-        
-        # Set camera properties for better performance
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.camera.set(cv2.CAP_PROP_FPS, 30)
+        # Feedback state: rules are only re-evaluated when the quantized metrics change
+        self.feedback_tracker = FeedbackTracker()
         
+    def initialize_camera(self):
+        """Start opening and warming up the camera in the background"""
+        self.camera = CameraCapture(device=0, width=640, height=480, fps=30)
+        self.camera.open_async()
+    
     def calculate_bpm(self, compression_times):
         """Calculate BPM from compression timing"""
         if len(compression_times) < 2:
@@ -144,7 +149,7 @@ class SimpleCPRAssistant:
     def start_visual_metronome(self):
         """Start visual metronome (flashing)"""
         self.metronome_active = True
-        self.flash_timer = time.time()
+        self.flash_timer = time.monotonic()
     
     def stop_visual_metronome(self):
         """Stop visual metronome"""
@@ -152,63 +157,43 @@ class SimpleCPRAssistant:
     
     def get_feedback_color(self, bpm):
         """Get color based on BPM feedback"""
-        if 100 <= bpm <= 120:
-            return (0, 255, 0)  # Green - good pace
-        elif bpm < 100:
-            return (0, 0, 255)  # Red - too slow
-        else:
-            return (0, 165, 255)  # Orange - too fast
+        return feedback_color(bpm)
     
     def get_visual_feedback(self, bpm, depth, hand_placement):
         """Get visual feedback messages"""
-        feedback = []
-        
-        # BPM feedback
-        if 100 <= bpm <= 120:
-            feedback.append("✓ Good rhythm!")
-        elif bpm < 100:
-            feedback.append("⚠ Too slow - speed up!")
-        else:
-            feedback.append("⚠ Too fast - slow down!")
-        
-        # Depth feedback
-        if depth >= 0.7:
-            feedback.append("✓ Good depth!")
-        else:
-            feedback.append("⚠ Push harder!")
-        
-        # Hand placement feedback
-        if hand_placement >= 0.8:
-            feedback.append("✓ Perfect hand placement!")
-        elif hand_placement >= 0.6:
-            feedback.append("⚠ Center hands more")
-        else:
-            feedback.append("⚠ Move hands to chest center")
-        
-        return feedback
+        return [msg for msg, color in evaluate_feedback(bpm, depth, hand_placement).visual_messages]
+    
+    def get_jitter_stats(self):
+        """Frame, processing and compression timing statistics"""
+        return self.timing_stats.summary()
     
     def process_frame(self, frame):
         """Process a single frame for CPR feedback"""
         # Convert BGR to RGB
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.stage_timer.lap('convert')
         
         # Process pose
         pose_results = self.pose.process(rgb_frame)
+        self.stage_timer.lap('pose')
         
         # Process hands
         hands_results = self.hands.process(rgb_frame)
+        self.stage_timer.lap('hands')
         
         # Draw pose landmarks
         if pose_results.pose_landmarks:
             self.mp_drawing.draw_landmarks(
                 frame, pose_results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS
             )
+            self.stage_timer.lap('draw')
             
             # Analyze hand placement
             self.hand_placement_score = self.detect_hand_placement(pose_results.pose_landmarks)
             
             # Analyze compression depth
             self.compression_depth = self.detect_compression_depth(pose_results.pose_landmarks)
+            self.stage_timer.lap('detect')
         
         # Draw hand landmarks
         if hands_results.multi_hand_landmarks:
@@ -216,18 +201,64 @@ class SimpleCPRAssistant:
                 self.mp_drawing.draw_landmarks(
                     frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
                 )
+            self.stage_timer.lap('draw')
         
         return frame, pose_results, hands_results
     
-    def add_visual_overlay(self, frame):
+    def update_from_landmarks(self, landmarks, capture_time):
+        """
+        Update placement, depth, compression count and rate from one frame's pose landmarks
+        
+        This is what the feedback loop does after pose estimation, so recorded or
+        synthetic landmarks can be run through the same detection without a camera.
+        
+        Args:
+            landmarks: Pose landmarks (anything exposing .landmark[i].x/.y), or None
+                if no pose was found (the last placement and depth are kept)
+            capture_time: Capture time of the frame in seconds
+        
+        Returns:
+            bool: Whether a compression was counted in this frame
+        """
+        if landmarks:
+            self.hand_placement_score = self.detect_hand_placement(landmarks)
+            self.compression_depth = self.detect_compression_depth(landmarks)
+        return self.update_compression_timing(capture_time)
+    
+    def update_compression_timing(self, capture_time):
+        """Count a compression from the current depth and update the rate from capture timestamps"""
+        counted = False
+        if self.compression_depth > 0.5:  # Detected compression
+            if self.last_compression_time > 0:
+                interval = capture_time - self.last_compression_time
+                if 0.3 < interval < 1.0:  # Reasonable compression interval
+                    self.compression_times.append(capture_time)
+                    self.timing_stats.observe_compression(capture_time)
+                    self.compression_count += 1
+                    counted = True
+                    
+                    # Keep only recent compression times
+                    if len(self.compression_times) > 10:
+                        self.compression_times.pop(0)
+                    
+                    # Calculate BPM
+                    self.current_bpm = self.calculate_bpm(self.compression_times)
+            
+            self.last_compression_time = capture_time
+        return counted
+    
+    def add_visual_overlay(self, frame, capture_time=None):
         """Add visual CPR feedback overlay"""
         height, width = frame.shape[:2]
         
         # Background for text areas
         overlay = frame.copy()
         
+        feedback = self.feedback_tracker.update(self.current_bpm, self.compression_depth,
+                                                self.hand_placement_score)
+        
         # Current BPM with color coding
-        bpm_color = self.get_feedback_color(self.current_bpm)
+        bpm_color = feedback.bpm_color
         cv2.rectangle(overlay, (10, 10), (250, 80), (0, 0, 0), -1)
         cv2.putText(frame, f"BPM: {int(self.current_bpm)}", (20, 40), 
                    cv2.FONT_HERSHEY_SIMPLEX, 1, bpm_color, 2)
@@ -238,13 +269,13 @@ class SimpleCPRAssistant:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         # Hand placement score
-        placement_color = (0, 255, 0) if self.hand_placement_score > 0.7 else (0, 0, 255)
+        placement_color = feedback.placement_color
         cv2.rectangle(overlay, (10, 140), (250, 180), (0, 0, 0), -1)
         cv2.putText(frame, f"Hands: {int(self.hand_placement_score*100)}%", (20, 170), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, placement_color, 2)
         
         # Compression depth
-        depth_color = (0, 255, 0) if self.compression_depth > 0.7 else (0, 0, 255)
+        depth_color = feedback.depth_color
         cv2.rectangle(overlay, (10, 190), (250, 230), (0, 0, 0), -1)
         cv2.putText(frame, f"Depth: {int(self.compression_depth*100)}%", (20, 220), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, depth_color, 2)
@@ -261,17 +292,15 @@ class SimpleCPRAssistant:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         
         # Visual feedback messages
-        feedback = self.get_visual_feedback(self.current_bpm, self.compression_depth, self.hand_placement_score)
         y_offset = 250
-        for i, msg in enumerate(feedback[:3]):  # Show up to 3 messages
-            color = (0, 255, 0) if msg.startswith("✓") else (0, 165, 255)
+        for i, (msg, color) in enumerate(feedback.visual_messages[:3]):  # Show up to 3 messages
             cv2.rectangle(overlay, (10, y_offset + i*30), (400, y_offset + i*30 + 25), (0, 0, 0), -1)
             cv2.putText(frame, msg, (20, y_offset + i*30 + 20), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
         
         # Visual metronome (flashing indicator)
         if self.metronome_active and self.current_bpm > 0:
-            current_time = time.time()
+            current_time = capture_time if capture_time is not None else time.monotonic()
             interval = 60.0 / self.target_bpm
             if (current_time - self.flash_timer) % interval < 0.1:  # Flash for 0.1 seconds
                 # Flash the screen border
@@ -290,15 +319,19 @@ class SimpleCPRAssistant:
         step_text = f"Step {self.current_step + 1}: {self.walkthrough_steps[self.current_step]}"
         
         while self.running and self.current_step < len(self.walkthrough_steps):
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
+            frame = captured.image
             
             # Process frame
             processed_frame, pose_results, hands_results = self.process_frame(frame)
+            self.timing_stats.observe_frame(captured.timestamp)
             
             # Add overlay
-            frame_with_overlay = self.add_visual_overlay(processed_frame)
+            frame_with_overlay = self.add_visual_overlay(processed_frame, captured.timestamp)
             
             # Show current step
             height, width = frame_with_overlay.shape[:2]
@@ -311,12 +344,19 @@ class SimpleCPRAssistant:
             cv2.putText(frame_with_overlay, "Skip to Compressions", (width-190, height-45), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
             
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
+            
             cv2.imshow('Simple CPR Assistant - Walkthrough Mode', frame_with_overlay)
             
             # Handle key presses
             key = cv2.waitKey(1) & 0xFF
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
             elif key == ord('n'):  # Next step
                 self.current_step += 1
                 if self.current_step < len(self.walkthrough_steps):
@@ -331,40 +371,38 @@ class SimpleCPRAssistant:
         self.start_visual_metronome()
         
         while self.running:
-            ret, frame = self.camera.read()
-            if not ret:
+            self.stage_timer.start_frame()
+            captured = self.camera.read_frame()
+            if captured is None:
                 break
+            self.stage_timer.lap('capture')
+            frame = captured.image
             
             # Process frame
             processed_frame, pose_results, hands_results = self.process_frame(frame)
+            self.timing_stats.observe_frame(captured.timestamp)
             
-            # Update BPM calculation
-            current_time = time.time()
-            if self.compression_depth > 0.5:  # Detected compression
-                if self.last_compression_time > 0:
-                    interval = current_time - self.last_compression_time
-                    if 0.3 < interval < 1.0:  # Reasonable compression interval
-                        self.compression_times.append(current_time)
-                        self.compression_count += 1
-                        
-                        # Keep only recent compression times
-                        if len(self.compression_times) > 10:
-                            self.compression_times.pop(0)
-                        
-                        # Calculate BPM
-                        self.current_bpm = self.calculate_bpm(self.compression_times)
-                
-                self.last_compression_time = current_time
+            # Update BPM calculation from the frame's capture time, so processing latency does not skew the rate
+            current_time = captured.timestamp
+            self.update_compression_timing(current_time)
+            self.stage_timer.lap('detect')
             
             # Add overlay
-            frame_with_overlay = self.add_visual_overlay(processed_frame)
+            frame_with_overlay = self.add_visual_overlay(processed_frame, captured.timestamp)
+            
+            frame_with_overlay = self.stage_timer.draw_hud(frame_with_overlay)
+            self.stage_timer.lap('overlay')
             
             cv2.imshow('Simple CPR Assistant - Feedback Mode', frame_with_overlay)
             
             # Handle key presses
             key = cv2.waitKey(1) & 0xFF
+            self.stage_timer.lap('display')
+            self.stage_timer.end_frame()
             if key == ord('q'):
                 break
+            elif key == ord('l'):  # Latency HUD
+                self.stage_timer.toggle_hud()
     
     def show_mode_selection(self):
         """Show mode selection window"""
@@ -410,11 +448,13 @@ class SimpleCPRAssistant:
         
         # Instructions
         instructions = tk.Label(root, 
-                               text="Controls:\n• 'Q' to quit\n• 'N' for next step (Walkthrough)\n• 'S' to skip to compressions", 
+                               text="Controls:\n• 'Q' to quit\n• 'N' for next step (Walkthrough)\n• 'S' to skip to compressions\n• 'L' for latency HUD", 
                                font=('Arial', 10), 
                                fg='white', bg='#2c3e50')
         instructions.pack(pady=10)
         
+        if self.startup_profiler:
+            self.startup_profiler.finish_when_shown(root)
         root.mainloop()
     
     def start_mode(self, mode, root):
@@ -422,6 +462,14 @@ class SimpleCPRAssistant:
         self.mode = mode
         root.destroy()
         
+        # The camera has been warming up while the mode selection window was open
+        try:
+            self.camera.wait_until_open()
+        except Exception as e:
+            print(f"Error: {e}")
+            messagebox.showerror("Error", f"Failed to initialize: {e}")
+            return
+        
         if mode == "walkthrough":
             self.run_walkthrough_mode()
         else:
@@ -445,10 +493,17 @@ class SimpleCPRAssistant:
         self.running = False
         self.stop_visual_metronome()
         
+        if self.timing_stats.frame_intervals:
+            print(self.timing_stats.format_summary())
+        report = self.stage_timer.dump_json(self.latency_report_path)
+        if report:
+            print(f"Frame stage latency written to {report}")
+        
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     app = SimpleCPRAssistant()
+    app.latency_report_path = latency_report_requested()
     app.run()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+CPR Assistant Soak Test
+Drives the camera-free pipeline through hours of simulated compressions (as fast as
+it runs), sampling process memory, tracemalloc and per-frame latency along the way,
+and fails if memory or latency keeps growing. Long resuscitations and all-day kiosk
+use must not slowly run out of memory or slow down.
+
+Usage:
+    python soak_test.py --hours 2 --variants improved enhanced
+    python soak_test.py --hours 8 --variants improved --set depth_threshold=0.03 --json soak.json
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from compression_log import CompressionLog
+from pipeline_harness import VARIANTS, close_assistant, create_assistant
+from stage_timing import LatencyHistogram
+from synthetic_landmarks import generate_session
+
+# Improved's default thresholds count almost none of the smooth synthetic strokes, which
+# would leave its session records empty; these make it count them like real ones
+DEFAULT_OVERRIDES = {
+    'improved': {'depth_threshold': 0.02, 'depth_return_threshold': 0.01}
+}
+
+# Frames kept per allocation, so growth is reported where this code made it
+TRACEBACK_FRAMES = 10
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where it cannot be read"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS; ru_maxrss is in bytes on macOS and KiB elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def frame_data_sample() -> str:
+    """A small blurred, JPEG and base64 encoded frame like the ones collected for upload"""
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8), (15, 15), 0)
+    ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return base64.b64encode(jpeg.tobytes()).decode('ascii')
+
+def create_collector():
+    """A cloud data collector, or None if its dependencies are missing here"""
+    try:
+        from cloud_service import CPRDataCollector
+    except ImportError:
+        return None
+    return CPRDataCollector()
+
+def in_memory(records) -> int:
+    """Records held in memory (a compression log keeps only its recent rows once it spills)"""
+    return len(records.rows) if isinstance(records, CompressionLog) else len(records)
+
+def tracked_sizes(assistant, collector) -> Dict[str, int]:
+    """Lengths of the per-session containers known to grow with session length"""
+    sizes = {}
+    session_data = getattr(assistant, 'session_data', None)
+    if session_data is not None:
+        sizes['session_data.compressions'] = in_memory(session_data['compressions'])
+    if hasattr(assistant, 'performance_history'):
+        sizes['performance_history'] = len(assistant.performance_history)
+    sizes['compression_times'] = len(assistant.compression_times)
+    if collector is not None:
+        sizes['collector.compressions'] = in_memory(collector.session_data['compressions'])
+        sizes['collector.frames'] = len(collector.session_data['frames'])
+    return sizes
+
+def allocation_site(traceback) -> str:
+    """The innermost frame of a traceback in the assistant code (or the innermost frame)"""
+    frames = [frame for frame in reversed(traceback)
+              if frame.filename.startswith(REPO_DIR) and frame.filename != os.path.abspath(__file__)]
+    frame = frames[0] if frames else traceback[-1]
+    filename = os.path.relpath(frame.filename, REPO_DIR) if frame.filename.startswith(REPO_DIR) else frame.filename
+    return f"{filename}:{frame.lineno}"
+
+def growth_per_hour(samples: List[Dict], key: str) -> Optional[float]:
+    """Least-squares slope of a sampled quantity in MB per simulated hour"""
+    points = [(s['sim_seconds'], s[key]) for s in samples if s[key] is not None]
+    if len(points) < 2:
+        return None
+    seconds, values = np.array(points, dtype=np.float64).T
+    return float(np.polyfit(seconds / 3600.0, values / 1e6, 1)[0])
+
+def soak(variant: str, hours: float, sample_seconds: float = 300.0, warmup_seconds: float = 120.0,
+         overrides: Optional[Dict[str, float]] = None, frame_data_interval: float = 1.0,
+         chunk_seconds: float = 60.0, seed: int = 0, verbose: bool = True) -> Dict:
+    """
+    Run one variant for hours of simulated time
+    
+    A minute of synthetic compressions (with a pause for rescue breaths) is generated
+    once and replayed back to back with advancing timestamps.
+    
+    Args:
+        variant: Assistant variant (see pipeline_harness.VARIANTS)
+        hours: Simulated session length
+        sample_seconds: Simulated time between memory and latency samples
+        warmup_seconds: Simulated time before the first sample, so start-up
+            allocations and caches are not counted as growth
+        overrides: Assistant attributes to set first (e.g. detection thresholds), on
+            top of DEFAULT_OVERRIDES
+        frame_data_interval: Simulated seconds between frames added to the cloud data
+            collector (0 to not use a collector)
+        chunk_seconds: Length of the replayed synthetic session
+        seed: Seed of the synthetic session
+        verbose: Print each sample as it is taken
+    
+    Returns:
+        Dict: The samples, the top tracemalloc growth sites and the growth rates
+    """
+    assistant = create_assistant(variant)
+    for name, value in {**DEFAULT_OVERRIDES.get(variant, {}), **(overrides or {})}.items():
+        setattr(assistant, name, value)
+    collector = create_collector() if frame_data_interval > 0 else None
+    frame_data = frame_data_sample() if collector is not None else None
+    
+    session = generate_session(duration=chunk_seconds, depth=0.4, noise=0.005,
+                               pauses=[(chunk_seconds - 6.0, 4.0)], seed=seed)
+    chunk = list(session.stream.frames())
+    
+    total_seconds = hours * 3600.0
+    samples = []
+    latency = LatencyHistogram()
+    first_snapshot = None
+    next_sample = warmup_seconds
+    next_frame_data = 0.0
+    frames = 0
+    offset = 0.0
+    sim_time = 0.0
+    started = time.perf_counter()
+    
+    tracemalloc.start(TRACEBACK_FRAMES)
+    try:
+        while sim_time < total_seconds:
+            for timestamp, landmarks in chunk:
+                sim_time = offset + timestamp
+                if sim_time >= total_seconds:
+                    break
+                
+                start = time.perf_counter()
+                assistant.stage_timer.start_frame()
+                counted = assistant.update_from_landmarks(landmarks, sim_time)
+                assistant.feedback_tracker.update(assistant.current_bpm, assistant.compression_depth,
+                                                  assistant.hand_placement_score)
+                assistant.stage_timer.lap('detect')
+                if collector is not None:
+                    if counted:
+                        collector.add_compression_data(assistant.current_bpm, assistant.compression_depth,
+                                                       assistant.hand_placement_score, sim_time)
+                    if sim_time >= next_frame_data:
+                        collector.add_frame_data(frame_data, sim_time)
+                        next_frame_data += frame_data_interval
+                assistant.stage_timer.end_frame()
+                latency.record(time.perf_counter() - start)
+                frames += 1
+                
+                if sim_time >= next_sample:
+                    traced, _ = tracemalloc.get_traced_memory()
+                    sample = {
+                        'sim_seconds': round(sim_time, 1),
+                        'wall_seconds': round(time.perf_counter() - started, 1),
+                        'frames': frames,
+                        'rss': rss_bytes(),
+                        'traced': traced,
+                        'frame_latency': latency.summary(),
+                        'sizes': tracked_sizes(assistant, collector)
+                    }
+                    samples.append(sample)
+                    if first_snapshot is None:
+                        first_snapshot = tracemalloc.take_snapshot()
+                    if verbose:
+                        print_sample(variant, sample)
+                    latency = LatencyHistogram()
+                    next_sample += sample_seconds
+            offset += chunk_seconds
+        
+        top_growth = []
+        if first_snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen *>')]
+            stats = snapshot.filter_traces(filters).compare_to(first_snapshot.filter_traces(filters), 'traceback')
+            top_growth = [{'site': allocation_site(stat.traceback), 'size_diff': stat.size_diff,
+                           'count_diff': stat.count_diff}
+                          for stat in stats[:10] if stat.size_diff > 0]
+    finally:
+        tracemalloc.stop()
+        close_assistant(assistant)
+        if collector is not None:
+            collector.close()
+    
+    return {
+        'variant': variant,
+        'simulated_hours': hours,
+        'frames': frames,
+        'wall_seconds': round(time.perf_counter() - started, 1),
+        'samples': samples,
+        'rss_growth_mb_per_hour': growth_per_hour(samples, 'rss'),
+        'traced_growth_mb_per_hour': growth_per_hour(samples, 'traced'),
+        'top_growth': top_growth
+    }
+
+def evaluate(result: Dict, max_memory_growth: float, max_latency_growth: float) -> List[str]:
+    """
+    Check a soak run against the growth limits
+    
+    Args:
+        result: Result of soak()
+        max_memory_growth: Allowed RSS or traced memory growth in MB per simulated hour
+        max_latency_growth: Allowed increase of p95 frame latency from the first to the
+            last sample, as a fraction
+    
+    Returns:
+        List: A message per exceeded limit (empty if the run passed)
+    """
+    failures = []
+    for key, label in (('rss_growth_mb_per_hour', 'RSS'), ('traced_growth_mb_per_hour', 'Python heap')):
+        growth = result[key]
+        if growth is not None and growth > max_memory_growth:
+            failures.append(f"{label} grows {growth:.2f} MB/hour (limit {max_memory_growth:.2f})")
+    
+    samples = result['samples']
+    if len(samples) >= 2:
+        first = samples[0]['frame_latency']['p95_ms']
+        last = samples[-1]['frame_latency']['p95_ms']
+        if first > 0 and last / first - 1 > max_latency_growth:
+            failures.append(f"p95 frame latency grew from {first * 1000:.1f} to {last * 1000:.1f} µs "
+                            f"(limit +{max_latency_growth:.0%})")
+    
+    grown = [name for name, size in samples[-1]['sizes'].items()
+             if size > samples[0]['sizes'][name]] if len(samples) >= 2 else []
+    if failures and grown:
+        failures.append(f"Growing containers: {', '.join(grown)}")
+    return failures
+
+def print_sample(variant: str, sample: Dict):
+    """Print one sample as a console line"""
+    rss = f"{sample['rss'] / 1e6:7.1f} MB" if sample['rss'] is not None else "    n/a"
+    latency = sample['frame_latency']
+    sizes = ", ".join(f"{name} {size}" for name, size in sample['sizes'].items())
+    print(f"  {variant:<9} {sample['sim_seconds'] / 3600:5.2f} h  RSS {rss}  heap {sample['traced'] / 1e6:7.2f} MB  "
+          f"frame p50 {latency['p50_ms'] * 1000:6.1f} µs p95 {latency['p95_ms'] * 1000:6.1f} µs  [{sizes}]")
+
+def parse_override(value: str) -> Tuple[str, float]:
+    """Parse an attribute override like 'depth_threshold=0.05'"""
+    name, number = value.split('=')
+    return name, float(number)
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Soak test the CPR Assistant pipeline for memory and latency growth")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=['improved', 'enhanced'])
+    parser.add_argument('--hours', type=float, default=2.0, help="Simulated session length")
+    parser.add_argument('--sample-every', type=float, default=300.0, help="Simulated seconds between samples")
+    parser.add_argument('--warmup', type=float, default=120.0, help="Simulated seconds before the first sample")
+    parser.add_argument('--set', type=parse_override, action='append', default=[], dest='overrides',
+                        help="attribute=value to set on the assistant (repeatable)")
+    parser.add_argument('--frame-data-interval', type=float, default=1.0,
+                        help="Simulated seconds between frames given to the cloud data collector (0 for none)")
+    parser.add_argument('--max-memory-growth', type=float, default=1.0,
+                        help="Allowed memory growth in MB per simulated hour")
+    parser.add_argument('--max-latency-growth', type=float, default=0.5,
+                        help="Allowed p95 frame latency increase, as a fraction of the first sample")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the samples and results to this file")
+    args = parser.parse_args(argv)
+    
+    results = {}
+    failed = False
+    for variant in args.variants:
+        print(f"Soaking {variant} for {args.hours:g} simulated hours...")
+        try:
+            result = soak(variant, args.hours, args.sample_every, args.warmup, dict(args.overrides),
+                          args.frame_data_interval, seed=args.seed)
+        except Exception as e:
+            print(f"  FAIL {variant} raised {type(e).__name__}: {e}")
+            results[variant] = {'error': f"{type(e).__name__}: {e}"}
+            failed = True
+            continue
+        
+        result['failures'] = evaluate(result, args.max_memory_growth, args.max_latency_growth)
+        results[variant] = result
+        speedup = args.hours * 3600 / max(result['wall_seconds'], 1e-9)
+        print(f"  {result['frames']} frames in {result['wall_seconds']:.0f} s ({speedup:.0f}x real time)")
+        for growth in result['top_growth'][:5]:
+            print(f"    +{growth['size_diff'] / 1e3:9.1f} kB  {growth['site']}")
+        if result['failures']:
+            failed = True
+            for failure in result['failures']:
+                print(f"  FAIL {failure}")
+        else:
+            print("  PASS")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'options': vars(args), 'results': results}, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Frame Stage Timing
+Records how long each stage of the frame loop takes (capture, color conversion, pose
+and hand models, drawing, detection, overlay, display) into fixed-size histograms,
+draws an optional FPS/latency HUD on the video and writes percentiles to JSON.
+"""
+
+import collections
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+# Environment variable naming a file for the frame stage latency report
+LATENCY_REPORT_ENV = 'CPR_LATENCY_REPORT'
+
+def latency_report_requested(argv: Optional[Sequence[str]] = None) -> Optional[str]:
+    """Where to write the frame stage latency report: --latency-report PATH, else $CPR_LATENCY_REPORT, else None"""
+    argv = sys.argv if argv is None else argv
+    if '--latency-report' in argv and argv.index('--latency-report') + 1 < len(argv):
+        return argv[argv.index('--latency-report') + 1]
+    return os.getenv(LATENCY_REPORT_ENV) or None
+
+class LatencyHistogram:
+    """Durations counted in fixed log-spaced bins, so memory and cost per sample stay constant"""
+    
+    # 40 bins per decade from 10 µs to 10 s (about 6% resolution)
+    EDGES = np.geomspace(1e-5, 10.0, 241)
+    
+    def __init__(self):
+        self.counts = np.zeros(len(self.EDGES) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+    
+    def record(self, seconds: float):
+        """Count one duration"""
+        self.counts[np.searchsorted(self.EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, percent: float) -> float:
+        """Approximate percentile in seconds (the upper edge of the bin it falls in)"""
+        if not self.count:
+            return 0.0
+        rank = np.searchsorted(np.cumsum(self.counts), self.count * percent / 100.0)
+        if rank >= len(self.EDGES):
+            return self.max
+        return min(float(self.EDGES[rank]), self.max)
+    
+    def summary(self) -> Dict[str, float]:
+        """Count, mean, p50/p95/p99 and max in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': round(float(self.total) / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(float(self.max) * 1000, 3)
+        }
+
+class StageTimer:
+    def __init__(self):
+        """
+        Time the stages of each frame
+        
+        Call start_frame() at the top of the loop, lap(stage) after each stage and
+        end_frame() at the bottom. A stage lapped several times in one frame counts
+        as one sample of their total.
+        """
+        self.histograms: Dict[str, LatencyHistogram] = collections.defaultdict(LatencyHistogram)
+        self.current = collections.defaultdict(float)
+        self.frame_start = None
+        self.last = None
+        self.frame_starts = collections.deque(maxlen=30)
+        self.frames = 0
+        self.show_hud = False
+    
+    def start_frame(self):
+        """Start timing a frame"""
+        self.frame_start = self.last = time.perf_counter()
+        self.frame_starts.append(self.frame_start)
+    
+    def lap(self, stage: str):
+        """Charge the time since the previous lap to a stage"""
+        if self.last is None:
+            return
+        now = time.perf_counter()
+        self.current[stage] += now - self.last
+        self.last = now
+    
+    def end_frame(self):
+        """Record the frame's stage durations and its total"""
+        if self.frame_start is None:
+            return
+        for stage, seconds in self.current.items():
+            self.histograms[stage].record(seconds)
+        self.histograms['frame'].record(time.perf_counter() - self.frame_start)
+        self.current.clear()
+        self.frame_start = self.last = None
+        self.frames += 1
+    
+    def toggle_hud(self):
+        """Show or hide the latency HUD"""
+        self.show_hud = not self.show_hud
+    
+    def fps(self) -> float:
+        """Frame rate over the last 30 frames"""
+        if len(self.frame_starts) < 2:
+            return 0.0
+        elapsed = self.frame_starts[-1] - self.frame_starts[0]
+        return (len(self.frame_starts) - 1) / elapsed if elapsed > 0 else 0.0
+    
+    def draw_hud(self, frame):
+        """Draw FPS and the last and p95 duration of each stage, if the HUD is on"""
+        if not self.show_hud:
+            return frame
+        
+        height, width = frame.shape[:2]
+        lines = [f"FPS {self.fps():.1f}"]
+        for stage, histogram in self.histograms.items():
+            lines.append(f"{stage:<9}{histogram.last * 1000:6.1f} ms  p95 {histogram.percentile(95) * 1000:6.1f}")
+        
+        x, y = width - 300, 110
+        cv2.rectangle(frame, (x - 10, y), (width - 10, y + 18 * len(lines) + 10), (0, 0, 0), -1)
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x, y + 20 + 18 * i), cv2.FONT_HERSHEY_PLAIN, 1.0, (255, 255, 255), 1)
+        return frame
+    
+    def summary(self) -> Dict:
+        """Frame count, FPS and percentiles per stage"""
+        return {
+            'frames': self.frames,
+            'fps': round(self.fps(), 2),
+            'stages': {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+        }
+    
+    def dump_json(self, path: Optional[str]) -> Optional[str]:
+        """
+        Write the stage percentiles to a JSON file
+        
+        Returns:
+            str: The path written, or None if no path was given or no frames were timed
+        """
+        if not path or not self.frames:
+            return None
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
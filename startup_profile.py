@@ -0,0 +1,93 @@
+"""
+Startup Profiling
+Per-module import timing for the launchers' --profile-startup flag, to see which
+dependencies dominate cold start on the kiosks.
+"""
+
+import builtins
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+class StartupProfiler:
+    def __init__(self):
+        """Initialize the profiler (call install() before the imports to be measured)"""
+        self.records: List[Tuple[str, float, float, int]] = []  # (module, total, self, nesting depth)
+        self.marks: List[Tuple[str, float]] = []
+        self.local = threading.local()
+        self.original_import = None
+        self.start_time = None
+        self.finished = False
+    
+    def install(self):
+        """Start timing imports of modules that are not loaded yet"""
+        if self.original_import:
+            return
+        self.original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        self.start_time = time.perf_counter()
+    
+    def uninstall(self):
+        """Stop timing imports"""
+        if self.original_import:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+    
+    def mark(self, label: str):
+        """Record a startup milestone, e.g. the first window being shown"""
+        self.marks.append((label, time.perf_counter() - self.start_time))
+    
+    def finish(self, label: str):
+        """Mark the end of startup, report and stop timing imports (later calls do nothing)"""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark(label)
+        self.report()
+        self.uninstall()
+    
+    def finish_when_shown(self, root, label: str = "First window shown"):
+        """Finish once a Tk window's event loop is running, so imports made later in the session are not counted"""
+        root.after(0, self.finish, label)
+    
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """builtins.__import__ replacement that times first-time imports"""
+        if level or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+        
+        # Time spent in nested imports is subtracted to get each module's own cost
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        
+        start = time.perf_counter()
+        stack.append(0.0)
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.records.append((name, elapsed, elapsed - nested, len(stack)))
+    
+    def report(self, top: int = 20):
+        """Print the slowest imports and the startup milestones"""
+        elapsed = time.perf_counter() - self.start_time
+        top_level = sum(total for _, total, _, depth in self.records if depth == 0)
+        
+        print("\nStartup profile")
+        print("=" * 60)
+        print(f"{'module':<36}{'total ms':>12}{'self ms':>12}")
+        for name, total, own, _ in sorted(self.records, key=lambda r: r[2], reverse=True)[:top]:
+            print(f"{name:<36}{total * 1000:>12.1f}{own * 1000:>12.1f}")
+        print("-" * 60)
+        print(f"{len(self.records)} modules imported in {top_level * 1000:.1f} ms")
+        for label, at in self.marks:
+            print(f"{label}: {at * 1000:.1f} ms")
+        print(f"Startup so far: {elapsed * 1000:.1f} ms\n")
+
+def profile_startup_requested(argv=None) -> bool:
+    """Whether --profile-startup was passed on the command line"""
+    return '--profile-startup' in (sys.argv if argv is None else argv)
@@ -0,0 +1,116 @@
+"""
+Synthetic Landmark Streams
+Deterministic pose landmark sequences of a rescuer doing chest compressions, with
+configurable rate, depth, noise, pose dropouts, pauses and hand drift, so detection,
+BPM and feedback can be exercised without a camera or MediaPipe.
+"""
+
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from landmark_stream import (LEFT_SHOULDER, LEFT_WRIST, POSE_LANDMARK_COUNT, RIGHT_SHOULDER, RIGHT_WRIST,
+                             LandmarkStream)
+
+class SyntheticSession(NamedTuple):
+    """A generated landmark stream and the compressions it was generated with"""
+    stream: LandmarkStream
+    compression_times: np.ndarray  # Time of the bottom of each compression, in seconds
+    rate_bpm: float  # Mean rate of the generated compressions
+    
+    @property
+    def compressions(self) -> int:
+        return len(self.compression_times)
+
+def compression_schedule(duration: float, rate_bpm: float, rate_jitter: float = 0.0,
+                         pauses: Sequence[Tuple[float, float]] = (),
+                         rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Plan when each compression starts and how long it lasts
+    
+    Args:
+        duration: Session length in seconds
+        rate_bpm: Compression rate
+        rate_jitter: Standard deviation of each compression's length, as a fraction of the mean
+        pauses: (start, length) in seconds of breaks with no compressions (e.g. rescue breaths)
+        rng: Random generator for the jitter
+    
+    Returns:
+        Tuple: Start times and lengths of the compressions that finish within the session
+    """
+    rng = rng or np.random.default_rng(0)
+    period = 60.0 / rate_bpm
+    starts, lengths = [], []
+    t = 0.0
+    while True:
+        length = max(period * (1 + rate_jitter * rng.standard_normal()), period * 0.25)
+        # A compression that would overlap a pause starts after it instead
+        for pause_start, pause_length in sorted(pauses):
+            if t < pause_start + pause_length and t + length > pause_start:
+                t = pause_start + pause_length
+        if t + length > duration:
+            break
+        starts.append(t)
+        lengths.append(length)
+        t += length
+    return np.array(starts), np.array(lengths)
+
+def generate_session(duration: float = 30.0, fps: float = 30.0, rate_bpm: float = 110.0,
+                     depth: float = 0.3, noise: float = 0.0, dropout: float = 0.0,
+                     pauses: Sequence[Tuple[float, float]] = (), hand_drift: float = 0.0,
+                     rate_jitter: float = 0.0, seed: int = 0) -> SyntheticSession:
+    """
+    Generate the pose landmarks of a compression session
+    
+    The rescuer's shoulders are fixed and both wrists move up and down over the
+    chest center; each compression is one raised-cosine stroke. The same seed
+    always produces the same stream.
+    
+    Args:
+        duration: Session length in seconds
+        fps: Frame rate of the simulated camera
+        rate_bpm: Compression rate
+        depth: Wrist travel per compression, in normalized image height
+        noise: Standard deviation of the landmark jitter, in normalized image units
+        dropout: Probability that no pose is found in a frame
+        pauses: (start, length) in seconds of breaks with no compressions
+        hand_drift: Sideways drift of the wrists from the chest center, in normalized
+            image width per second
+        rate_jitter: Standard deviation of each compression's length, as a fraction of the mean
+        seed: Random seed
+    
+    Returns:
+        SyntheticSession: The landmark stream and the true compression times
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(int(round(duration * fps))) / fps
+    starts, lengths = compression_schedule(duration, rate_bpm, rate_jitter, pauses, rng)
+    
+    # Stroke position of every frame: 0 with the hands up, 1 at the bottom of a compression
+    stroke = np.zeros(len(timestamps))
+    index = np.searchsorted(starts, timestamps, side='right') - 1
+    in_compression = index >= 0
+    in_compression[in_compression] = timestamps[in_compression] < (starts + lengths)[index[in_compression]]
+    phase = (timestamps[in_compression] - starts[index[in_compression]]) / lengths[index[in_compression]]
+    stroke[in_compression] = 0.5 - 0.5 * np.cos(2 * np.pi * phase)
+    
+    # Chest center between the shoulders at (0.5, 0.5), wrists centered on it mid-stroke
+    pose = np.zeros((len(timestamps), POSE_LANDMARK_COUNT, 4), dtype=np.float32)
+    pose[:, :, :2] = 0.5
+    pose[:, :, 3] = 1.0
+    pose[:, LEFT_SHOULDER, :2] = (0.4, 0.5)
+    pose[:, RIGHT_SHOULDER, :2] = (0.6, 0.5)
+    wrist_x = 0.5 + hand_drift * timestamps
+    wrist_y = 0.5 - depth / 2 + depth * stroke
+    for wrist, offset in ((LEFT_WRIST, -0.01), (RIGHT_WRIST, 0.01)):
+        pose[:, wrist, 0] = wrist_x + offset
+        pose[:, wrist, 1] = wrist_y
+    
+    if noise:
+        pose[:, :, :2] += rng.normal(0.0, noise, size=pose[:, :, :2].shape)
+    if dropout:
+        pose[rng.random(len(timestamps)) < dropout] = np.nan
+    
+    compression_times = starts + lengths / 2
+    rate = 60.0 / lengths.mean() if len(lengths) else 0.0
+    return SyntheticSession(LandmarkStream(timestamps, pose, fps=fps), compression_times, rate)
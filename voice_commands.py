@@ -0,0 +1,140 @@
+"""
+Hands-Free Voice Commands
+Offline keyword spotting on the background microphone stream, so a rescuer can
+say "next", "skip" or "upload" instead of reaching for the keyboard.
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import speech_recognition as sr
+
+from voice_input import (RecognizerBackend, SphinxRecognizerBackend, StreamingVoiceInput,
+                         VoskRecognizerBackend)
+
+# Spoken command -> key handled by the assistants' walkthrough and feedback loops
+VOICE_COMMANDS = {
+    "next": "n",
+    "skip": "s",
+    "upload": "u",
+    "question": "a",
+    "quit": "q"
+}
+
+def create_keyword_spotter(keywords) -> Optional[RecognizerBackend]:
+    """Create an offline recognizer restricted to the command words, if one is installed"""
+    try:
+        return VoskRecognizerBackend(grammar=list(keywords))
+    except Exception:
+        pass
+    
+    try:
+        import pocketsphinx
+        return SphinxRecognizerBackend(keywords=list(keywords))
+    except ImportError:
+        return None
+
+class VoiceCommandChannel:
+    def __init__(self, voice_stream: Optional[StreamingVoiceInput] = None,
+                 commands: Optional[Dict[str, str]] = None,
+                 spotter: Optional[RecognizerBackend] = None,
+                 max_command_seconds: float = 1.5, cpu_budget: float = 0.05):
+        """
+        Initialize the voice command channel
+        
+        Args:
+            voice_stream: Shared microphone stream (a new one is created if not given)
+            commands: Spoken word -> key mapping, defaults to VOICE_COMMANDS
+            spotter: Offline recognizer for the command words
+            max_command_seconds: Longer utterances are speech, not commands, and are skipped
+            cpu_budget: Fraction of one core the spotter may use on average
+        """
+        self.commands = commands or VOICE_COMMANDS
+        self.spotter = spotter or create_keyword_spotter(self.commands)
+        self.voice_stream = voice_stream or StreamingVoiceInput(backend=self.spotter)
+        self.max_command_seconds = max_command_seconds
+        self.cpu_budget = cpu_budget
+        
+        self.utterances = queue.Queue(maxsize=2)
+        self.keys = queue.Queue()
+        self.thread = None
+        
+        # Exponentially decayed spotter CPU time, compared against the budget
+        self.cpu_used = 0.0
+        self.cpu_window = 10.0
+        self.last_decay = time.monotonic()
+        self.skipped = 0
+    
+    @property
+    def available(self) -> bool:
+        """Whether an offline keyword spotter is installed"""
+        return self.spotter is not None
+    
+    def start(self):
+        """Start listening for commands"""
+        if not self.available:
+            print("Voice commands disabled: install vosk or pocketsphinx for offline keyword spotting")
+            return
+        if self.thread:
+            return
+        
+        try:
+            self.voice_stream.start()
+        except Exception as e:
+            print(f"Voice commands disabled: could not open microphone ({e})")
+            return
+        
+        self.voice_stream.add_utterance_listener(self._on_utterance)
+        self.thread = threading.Thread(target=self._spotter_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def poll_key(self) -> int:
+        """Get the key for the next spoken command, or 255 if there is none (like cv2.waitKey & 0xFF)"""
+        try:
+            return ord(self.keys.get_nowait())
+        except queue.Empty:
+            return 0xFF
+    
+    def _on_utterance(self, audio: sr.AudioData, is_question: bool):
+        """Queue short utterances for keyword spotting"""
+        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        if is_question or duration > self.max_command_seconds:
+            return
+        
+        try:
+            self.utterances.put_nowait(audio)
+        except queue.Full:
+            self.skipped += 1
+    
+    def _over_budget(self) -> bool:
+        """Check the spotter's recent CPU use against its budget"""
+        now = time.monotonic()
+        self.cpu_used *= 0.5 ** ((now - self.last_decay) / self.cpu_window)
+        self.last_decay = now
+        return self.cpu_used > self.cpu_budget * self.cpu_window
+    
+    def _spotter_loop(self):
+        """Decode queued utterances and translate command words into keys"""
+        while True:
+            audio = self.utterances.get()
+            if self._over_budget():
+                self.skipped += 1
+                continue
+            
+            start = time.thread_time()
+            try:
+                text = self.spotter.recognize(audio).lower()
+            except sr.UnknownValueError:
+                text = ""
+            except Exception as e:
+                print(f"Voice command error: {e}")
+                text = ""
+            self.cpu_used += time.thread_time() - start
+            
+            for word in text.split():
+                if word in self.commands:
+                    self.keys.put(self.commands[word])
+                    break
@@ -0,0 +1,356 @@
+"""
+Streaming Voice Input
+Keeps one microphone stream open in the background with an incrementally calibrated
+noise floor and voice-activity detection, and hands finished utterances to a
+pluggable speech recognizer (online or offline) as soon as the speaker stops.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import speech_recognition as sr
+
+class RecognizerBackend(ABC):
+    """Base class for speech-to-text backends"""
+    name = "base"
+    offline = False
+    
+    @abstractmethod
+    def recognize(self, audio: sr.AudioData) -> str:
+        """
+        Convert an utterance to text
+        
+        Args:
+            audio: Recorded utterance
+        
+        Returns:
+            str: Recognized text
+        
+        Raises:
+            sr.UnknownValueError: If the speech could not be understood
+        """
+
+class GoogleRecognizerBackend(RecognizerBackend):
+    """Google Web Speech API (requires network access)"""
+    name = "google"
+    
+    def __init__(self, language: str = "en-US"):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+class SphinxRecognizerBackend(RecognizerBackend):
+    """CMU Sphinx, runs locally (requires pocketsphinx)"""
+    name = "sphinx"
+    offline = True
+    
+    def __init__(self, language: str = "en-US", keywords: Optional[List[str]] = None,
+                 sensitivity: float = 0.8):
+        """
+        Args:
+            language: Recognition language
+            keywords: Words to spot (keyword spotting mode), or None to transcribe everything
+            sensitivity: Keyword sensitivity from 0 to 1; speech_recognition turns it
+                into the pocketsphinx threshold 1e(100 * sensitivity - 110), so higher
+                values spot more words and more false alarms
+        """
+        self.language = language
+        self.recognizer = sr.Recognizer()
+        # Keyword spotting mode: only listen for these words
+        self.keyword_entries = [(keyword, sensitivity) for keyword in keywords] if keywords else None
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        return self.recognizer.recognize_sphinx(audio, language=self.language,
+                                                keyword_entries=self.keyword_entries)
+
+class VoskRecognizerBackend(RecognizerBackend):
+    """Vosk/Kaldi, runs locally (requires vosk and a downloaded model)"""
+    name = "vosk"
+    offline = True
+    sample_rate = 16000
+    
+    def __init__(self, model_path: Optional[str] = None, grammar: Optional[List[str]] = None):
+        import vosk
+        
+        model_path = model_path or os.getenv('VOSK_MODEL_PATH', 'vosk-model-small-en-us')
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        # Restricting the vocabulary makes decoding much cheaper and more reliable
+        self.grammar = json.dumps(grammar + ["[unk]"]) if grammar else None
+        self.lock = threading.Lock()
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        pcm = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        
+        with self.lock:
+            if self.grammar:
+                recognizer = self.vosk.KaldiRecognizer(self.model, self.sample_rate, self.grammar)
+            else:
+                recognizer = self.vosk.KaldiRecognizer(self.model, self.sample_rate)
+            recognizer.AcceptWaveform(pcm)
+            text = json.loads(recognizer.FinalResult()).get("text", "")
+        
+        text = text.replace("[unk]", "").strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+RECOGNIZER_BACKENDS = {
+    GoogleRecognizerBackend.name: GoogleRecognizerBackend,
+    SphinxRecognizerBackend.name: SphinxRecognizerBackend,
+    VoskRecognizerBackend.name: VoskRecognizerBackend
+}
+
+def create_recognizer_backend(name: Optional[str] = None, **kwargs) -> RecognizerBackend:
+    """Create a recognizer backend by name (defaults to $CPR_SPEECH_BACKEND or google)"""
+    name = name or os.getenv('CPR_SPEECH_BACKEND', GoogleRecognizerBackend.name)
+    if name not in RECOGNIZER_BACKENDS:
+        raise ValueError(f"Unknown speech backend '{name}', choose from {sorted(RECOGNIZER_BACKENDS)}")
+    return RECOGNIZER_BACKENDS[name](**kwargs)
+
+class StreamingVoiceInput:
+    def __init__(self, backend: Optional[RecognizerBackend] = None,
+                 calibration_seconds: float = 0.5, speech_ratio: float = 3.0,
+                 min_energy: float = 150, speech_start_seconds: float = 0.1,
+                 silence_seconds: float = 0.6, pre_roll_seconds: float = 0.3,
+                 max_utterance_seconds: float = 10.0, noise_adaptation: float = 0.05):
+        """
+        Initialize the background microphone stream (call start() to open it)
+        
+        Args:
+            backend: Speech recognizer, created from $CPR_SPEECH_BACKEND if not given
+            calibration_seconds: Audio used for the initial noise floor estimate
+            speech_ratio: Energy above the noise floor that counts as speech
+            min_energy: Energy that always counts as silence, however quiet the room
+            speech_start_seconds: Continuous speech needed to start an utterance
+            silence_seconds: Silence that ends an utterance
+            pre_roll_seconds: Audio kept from before speech was detected
+            max_utterance_seconds: Longest utterance before it is cut off
+            noise_adaptation: Weight of each silent chunk in the running noise floor
+        """
+        self.backend = backend or create_recognizer_backend()
+        self.calibration_seconds = calibration_seconds
+        self.speech_ratio = speech_ratio
+        self.min_energy = min_energy
+        self.speech_start_seconds = speech_start_seconds
+        self.silence_seconds = silence_seconds
+        self.pre_roll_seconds = pre_roll_seconds
+        self.max_utterance_seconds = max_utterance_seconds
+        self.noise_adaptation = noise_adaptation
+        
+        self.microphone = None
+        self.thread = None
+        self.running = False
+        self.noise_floor = None
+        self.in_speech = False
+        
+        self.lock = threading.Lock()
+        self.pending: List[Dict] = []  # One-shot listen requests
+        self.utterance_listeners: List[Callable[[sr.AudioData, bool], None]] = []
+        self.chunk_listeners: List[Callable[[bytes, float], None]] = []
+    
+    def start(self):
+        """Open the microphone and start listening in the background"""
+        with self.lock:
+            if self.running:
+                return
+            
+            self.microphone = sr.Microphone()
+            self.microphone.__enter__()
+            self.running = True
+        
+        self.thread = threading.Thread(target=self._stream_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def stop(self):
+        """Stop listening and close the microphone"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        
+        # The stream thread closes the microphone when it stops, unless it is stuck reading
+        with self.lock:
+            microphone, self.microphone = self.microphone, None
+        if microphone:
+            microphone.__exit__(None, None, None)
+    
+    def listen_once(self, timeout: float = 5.0) -> Future:
+        """
+        Recognize the next utterance
+        
+        Args:
+            timeout: Seconds to wait for speech to start
+        
+        Returns:
+            Future: Resolves to the recognized text, or raises sr.WaitTimeoutError
+                if nobody spoke in time or sr.UnknownValueError if the speech was
+                not understood
+        """
+        self.start()
+        
+        future = Future()
+        with self.lock:
+            self.pending.append({
+                'future': future,
+                'deadline': time.monotonic() + timeout,
+                'heard': self.in_speech
+            })
+        return future
+    
+    def add_utterance_listener(self, callback: Callable[[sr.AudioData, bool], None]):
+        """
+        Receive every utterance's audio (called from the stream thread, keep it short)
+        
+        The callback also gets whether the utterance was captured for a listen_once
+        request, i.e. it is a spoken question rather than free speech.
+        """
+        self.utterance_listeners.append(callback)
+    
+    def add_chunk_listener(self, callback: Callable[[bytes, float], None]):
+        """Receive every raw audio chunk with its capture time (called from the stream thread)"""
+        self.chunk_listeners.append(callback)
+    
+    def _chunk_energy(self, chunk: bytes) -> float:
+        """RMS energy of a chunk of 16-bit audio"""
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        if not samples.size:
+            return 0.0
+        return float(np.sqrt(np.mean(samples * samples)))
+    
+    def _stream_loop(self):
+        """Run the stream until stopped or the microphone fails, then release it"""
+        source = self.microphone
+        error = None
+        try:
+            self._read_stream(source)
+        except Exception as e:
+            print(f"Microphone read error: {e}")
+            error = e
+        finally:
+            self._close_stream(source, error)
+    
+    def _read_stream(self, source):
+        """Read the microphone continuously, tracking noise and detecting speech"""
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        pre_roll = collections.deque(maxlen=max(1, int(self.pre_roll_seconds / chunk_seconds)))
+        start_chunks = max(1, int(self.speech_start_seconds / chunk_seconds))
+        silence_chunks = max(1, int(self.silence_seconds / chunk_seconds))
+        max_chunks = int(self.max_utterance_seconds / chunk_seconds)
+        
+        calibration = []
+        calibration_chunks = max(1, int(self.calibration_seconds / chunk_seconds))
+        utterance = []
+        speech_run = 0
+        silence_run = 0
+        
+        while self.running:
+            chunk = source.stream.read(source.CHUNK)
+            
+            now = time.monotonic()
+            for listener in self.chunk_listeners:
+                listener(chunk, now)
+            
+            energy = self._chunk_energy(chunk)
+            
+            # Initial noise floor from the first moments of audio, then adapt while silent
+            if self.noise_floor is None:
+                calibration.append(energy)
+                if len(calibration) >= calibration_chunks:
+                    self.noise_floor = float(np.median(calibration))
+                continue
+            
+            threshold = max(self.min_energy, self.noise_floor * self.speech_ratio)
+            is_speech = energy > threshold
+            
+            if not self.in_speech:
+                pre_roll.append(chunk)
+                if is_speech:
+                    speech_run += 1
+                    if speech_run >= start_chunks:
+                        self._begin_utterance()
+                        utterance = list(pre_roll)
+                        silence_run = 0
+                else:
+                    speech_run = 0
+                    self.noise_floor += self.noise_adaptation * (energy - self.noise_floor)
+                self._expire_pending(now)
+                continue
+            
+            utterance.append(chunk)
+            silence_run = 0 if is_speech else silence_run + 1
+            if silence_run >= silence_chunks or len(utterance) >= max_chunks:
+                self.in_speech = False
+                speech_run = 0
+                pre_roll.clear()
+                self._end_utterance(sr.AudioData(b"".join(utterance), source.SAMPLE_RATE, source.SAMPLE_WIDTH))
+                utterance = []
+    
+    def _close_stream(self, source, error: Optional[Exception]):
+        """Close the microphone and fail the listen requests still waiting, so none hang"""
+        with self.lock:
+            self.running = False
+            self.in_speech = False
+            pending, self.pending = self.pending, []
+            microphone = self.microphone if self.microphone is source else None
+            if microphone is not None:
+                self.microphone = None
+        
+        if microphone is not None:
+            microphone.__exit__(None, None, None)
+        
+        error = error or RuntimeError("Voice input stopped")
+        for request in pending:
+            request['future'].set_exception(error)
+    
+    def _begin_utterance(self):
+        """Mark waiting listen requests as having heard speech"""
+        with self.lock:
+            self.in_speech = True
+            for request in self.pending:
+                request['heard'] = True
+    
+    def _expire_pending(self, now: float):
+        """Time out listen requests that never heard speech"""
+        with self.lock:
+            expired = [r for r in self.pending if not r['heard'] and now > r['deadline']]
+            self.pending = [r for r in self.pending if r not in expired]
+        
+        for request in expired:
+            request['future'].set_exception(sr.WaitTimeoutError("listening timed out while waiting for phrase to start"))
+    
+    def _end_utterance(self, audio: sr.AudioData):
+        """Hand a finished utterance to listeners and recognize it for waiting requests"""
+        with self.lock:
+            waiting = [r for r in self.pending if r['heard']]
+            self.pending = [r for r in self.pending if not r['heard']]
+        
+        for listener in self.utterance_listeners:
+            listener(audio, bool(waiting))
+        
+        if waiting:
+            recognize_thread = threading.Thread(target=self._recognize, args=(audio, waiting))
+            recognize_thread.daemon = True
+            recognize_thread.start()
+    
+    def _recognize(self, audio: sr.AudioData, requests: List[Dict]):
+        """Run the recognizer backend and resolve the waiting requests"""
+        try:
+            text = self.backend.recognize(audio)
+        except Exception as e:
+            for request in requests:
+                request['future'].set_exception(e)
+            return
+        
+        for request in requests:
+            request['future'].set_result(text)